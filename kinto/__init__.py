@@ -7,6 +7,7 @@ from pyramid.config import Configurator
 from pyramid.settings import asbool
 from pyramid.security import Authenticated, Everyone
 
+from kinto import authorization
 from kinto.authorization import RouteFactory
 
 
@@ -36,6 +37,7 @@ DEFAULT_SETTINGS = {
     "collection_id_generator": "kinto.views.NameGenerator",
     "group_id_generator": "kinto.views.NameGenerator",
     "record_id_generator": "kinto.views.RelaxedUUID",
+    "record_tombstones_purge_batch_size": 1000,
     "project_name": "kinto",
 }
 
@@ -51,6 +53,9 @@ def main(global_config, config=None, **settings):
 
     kinto.core.initialize(config, version=__version__, default_settings=DEFAULT_SETTINGS)
 
+    # Plugins have registered their resources permissions.
+    authorization.compile_inheritance_tree()
+
     settings = config.get_settings()
 
     # Expose capability
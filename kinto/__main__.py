@@ -32,6 +32,8 @@ def main(args=None):
         "version",
         "rebuild-quotas",
         "create-user",
+        "indexes",
+        "purge-tombstones",
     )
     subparsers = parser.add_subparsers(
         title="subcommands",
@@ -118,6 +120,55 @@ def main(args=None):
                 default=False,
             )
 
+        elif command == "indexes":
+            action = subparser.add_mutually_exclusive_group()
+            action.add_argument(
+                "--create",
+                action="store_true",
+                help="Create the indexes of the most used fields",
+                required=False,
+                default=False,
+            )
+            action.add_argument(
+                "--drop",
+                action="store_true",
+                help="Drop every created index",
+                required=False,
+                default=False,
+            )
+            subparser.add_argument(
+                "--limit",
+                type=int,
+                help="Number of most used fields to show or index",
+                required=False,
+                default=10,
+            )
+            subparser.add_argument(
+                "--dry-run",
+                action="store_true",
+                help="Simulate the operations and show information",
+                dest="dry_run",
+                required=False,
+                default=False,
+            )
+
+        elif command == "purge-tombstones":
+            subparser.add_argument(
+                "--older-than",
+                type=int,
+                help="Purge the tombstones older than this number of days",
+                dest="older_than",
+                required=True,
+            )
+            subparser.add_argument(
+                "--batch-size",
+                type=int,
+                help="Number of tombstones deleted per transaction",
+                dest="batch_size",
+                required=False,
+                default=1000,
+            )
+
         elif command == "start":
             subparser.add_argument(
                 "--reload",
@@ -233,6 +284,22 @@ def main(args=None):
         env = bootstrap(config_file, options={"command": "create-user"})
         return create_user(env, username=username, password=password)
 
+    elif which_command == "indexes":
+        env = bootstrap(config_file, options={"command": "indexes"})
+        return scripts.indexes(
+            env,
+            create=parsed_args["create"],
+            drop=parsed_args["drop"],
+            limit=parsed_args["limit"],
+            dry_run=parsed_args["dry_run"],
+        )
+
+    elif which_command == "purge-tombstones":
+        env = bootstrap(config_file, options={"command": "purge-tombstones"})
+        return scripts.purge_tombstones(
+            env, older_than=parsed_args["older_than"], batch_size=parsed_args["batch_size"]
+        )
+
     elif which_command == "start":
         pserve_argv = ["pserve"]
 
@@ -1,3 +1,5 @@
+import functools
+
 from pyramid.security import IAuthorizationPolicy
 from zope.interface import implementer
 
@@ -78,50 +80,132 @@ def _resource_endpoint(object_uri):
     return resource_name, plural_endpoint
 
 
+def _object_uris_by_resource(object_uri):
+    """Map the name of every resource along the specified `object_uri` to
+    its URI.
+
+    >>> _object_uris_by_resource('/buckets/blog/collections/article')
+    {'': '',
+     'bucket': '/buckets/blog',
+     'collection': '/buckets/blog/collections/article'}
+
+    """
+    obj_parts = object_uri.split("/")
+    uris = {"": ""}
+    # Object URIs have an odd number of parts (e.g. ['', 'buckets', 'bid']).
+    for length in range(3, len(obj_parts) + 1, 2):
+        resource_name = obj_parts[length - 2].rstrip("s")
+        if resource_name not in uris:
+            uris[resource_name] = "/".join(obj_parts[:length])
+    return uris
+
+
 def _relative_object_uri(resource_name, object_uri):
     """Returns object_uri
     """
-    obj_parts = object_uri.split("/")
-    for length in range(len(obj_parts) + 1):
-        parent_uri = "/".join(obj_parts[:length])
-        parent_resource_name, _ = _resource_endpoint(parent_uri)
-        if resource_name == parent_resource_name:
-            return parent_uri
+    try:
+        return _object_uris_by_resource(object_uri)[resource_name]
+    except KeyError:
+        error_msg = f"Cannot get URL of resource '{resource_name}' from parent '{object_uri}'."
+        raise ValueError(error_msg)
 
-    error_msg = f"Cannot get URL of resource '{resource_name}' from parent '{object_uri}'."
-    raise ValueError(error_msg)
 
+_compiled_inheritance_tree = None
 
-def _inherited_permissions(object_uri, permission):
-    """Build the list of all permissions that can grant access to the given
-    object URI and permission.
 
-    >>> _inherited_permissions('/buckets/blog/collections/article', 'read')
-    [('/buckets/blog/collections/article', 'write'),
-     ('/buckets/blog/collections/article', 'read'),
-     ('/buckets/blog', 'write'),
-     ('/buckets/blog', 'read')]
+def compile_inheritance_tree():
+    """Compile ``PERMISSIONS_INHERITANCE_TREE`` into lookup tables, once the
+    plugins have registered their resources (see :func:`kinto.main`).
 
+    The first table gives the granters of each resource permission, on
+    single objects and on plural endpoints, as tuples of (resource name,
+    permission). The second table is the inverted tree, which gives the
+    permissions obtained on each resource from a resource permission.
     """
+    global _compiled_inheritance_tree
+
+    granters = {}
+    descending = {}
+    for resource_name, object_perms_tree in PERMISSIONS_INHERITANCE_TREE.items():
+        by_permission = granters.setdefault(resource_name, {})
+        for permission, inherited_perms in object_perms_tree.items():
+            for plural in (False, True):
+                # On single objects, there can be specific inherited
+                # permissions for the attributes.
+                attributes_permission = f"{permission}:attributes" if not plural else permission
+                inherited = object_perms_tree.get(attributes_permission, inherited_perms)
+                by_permission[(permission, plural)] = tuple(
+                    (related_resource_name, perm)
+                    for related_resource_name, perms in inherited.items()
+                    for perm in perms
+                )
+
+            for from_resource_name, perms in inherited_perms.items():
+                for perm in perms:
+                    obtained = descending.setdefault(from_resource_name, {}).setdefault(perm, {})
+                    obtained.setdefault(resource_name, set()).add(permission)
+
+    _compiled_inheritance_tree = (granters, descending)
+    _cached_inherited_permissions.cache_clear()
+
+
+def _get_compiled_inheritance_tree():
+    if _compiled_inheritance_tree is None:
+        compile_inheritance_tree()
+    return _compiled_inheritance_tree
+
+
+def descending_permissions_tree():
+    """Return the inverted permissions inheritance tree.
+
+    >>> descending_permissions_tree()['bucket']['write']
+    {'bucket': {'write', 'read', ...},
+     'collection': {'write', 'read', ...},
+     ...}
+
+    """
+    _, descending = _get_compiled_inheritance_tree()
+    return descending
+
+
+@functools.lru_cache(maxsize=2048)
+def _cached_inherited_permissions(object_uri, permission):
     resource_name, plural = _resource_endpoint(object_uri)
+    granters, _ = _get_compiled_inheritance_tree()
     try:
-        object_perms_tree = PERMISSIONS_INHERITANCE_TREE[resource_name]
+        object_granters = granters[resource_name]
     except KeyError:
-        return []  # URL that are not resources have no inherited perms.
+        return ()  # URL that are not resources have no inherited perms.
 
-    # When requesting permissions for a single object, we check if they are any
-    # specific inherited permissions for the attributes.
-    attributes_permission = f"{permission}:attributes" if not plural else permission
-    inherited_perms = object_perms_tree.get(attributes_permission, object_perms_tree[permission])
+    try:
+        inherited_perms = object_granters[(permission, plural)]
+    except KeyError:
+        raise KeyError(permission)
 
+    uris = _object_uris_by_resource(object_uri)
     granters = set()
-    for related_resource_name, implicit_permissions in inherited_perms.items():
-        for permission in implicit_permissions:
-            related_uri = _relative_object_uri(related_resource_name, object_uri)
-            granters.add((related_uri, permission))
+    for related_resource_name, permission in inherited_perms:
+        if related_resource_name not in uris:
+            # Raise the explicit error.
+            _relative_object_uri(related_resource_name, object_uri)
+        granters.add((uris[related_resource_name], permission))
 
     # Sort by ascending URLs.
-    return sorted(granters, key=lambda uri_perm: len(uri_perm[0]), reverse=True)
+    return tuple(sorted(granters, key=lambda uri_perm: len(uri_perm[0]), reverse=True))
+
+
+def _inherited_permissions(object_uri, permission):
+    """Build the list of all permissions that can grant access to the given
+    object URI and permission.
+
+    >>> _inherited_permissions('/buckets/blog/collections/article', 'read')
+    [('/buckets/blog/collections/article', 'write'),
+     ('/buckets/blog/collections/article', 'read'),
+     ('/buckets/blog', 'write'),
+     ('/buckets/blog', 'read')]
+
+    """
+    return list(_cached_inherited_permissions(object_uri, permission))
 
 
 @implementer(IAuthorizationPolicy)
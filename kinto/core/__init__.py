@@ -10,6 +10,7 @@ from pyramid.settings import aslist
 
 from kinto.core import errors
 from kinto.core import events
+from kinto.core.authorization import settings_principals
 from kinto.core.initialization import (  # NOQA
     initialize,
     install_middlewares,
@@ -35,12 +36,16 @@ DEFAULT_SETTINGS = {
     "backoff": None,
     "backoff_percentage": None,
     "batch_max_requests": 25,
+    "batch_max_workers": 4,
     "cache_backend": "",
     "cache_hosts": "",
     "cache_url": "",
     "cache_pool_size": 25,
     "cache_prefix": "",
     "cache_max_size_bytes": 524288,
+    "cache_purge_interval_seconds": 60,
+    "cache_tiered_backend": "",
+    "cache_tiered_ttl_seconds": 5,
     "cors_origins": "*",
     "cors_max_age_seconds": 3600,
     "eos": None,
@@ -56,8 +61,8 @@ DEFAULT_SETTINGS = {
         "kinto.core.initialization.setup_json_serializer",
         "kinto.core.initialization.setup_logging",
         "kinto.core.initialization.setup_storage",
-        "kinto.core.initialization.setup_permission",
         "kinto.core.initialization.setup_cache",
+        "kinto.core.initialization.setup_permission",
         "kinto.core.initialization.setup_requests_scheme",
         "kinto.core.initialization.setup_version_redirection",
         "kinto.core.initialization.setup_deprecation",
@@ -75,6 +80,9 @@ DEFAULT_SETTINGS = {
     "pagination_token_validity_seconds": 10 * 60,
     "permission_backend": "",
     "permission_url": "",
+    "permission_replica_urls": "",
+    "permission_cached_backend": "",
+    "permission_cache_ttl_seconds": 3600,
     "permission_pool_size": 25,
     "profiler_dir": tempfile.gettempdir(),
     "profiler_enabled": False,
@@ -88,9 +96,13 @@ DEFAULT_SETTINGS = {
     "statsd_prefix": "kinto.core",
     "statsd_url": None,
     "storage_backend": "",
+    "storage_count_mode": "exact",
     "storage_url": "",
+    "storage_replica_urls": "",
     "storage_max_fetch_size": 10000,
     "storage_pool_size": 25,
+    "storage_index_advisor": False,
+    "storage_statement_cache_size": 0,
     "tm.annotate_user": False,  # Do annotate transactions with the user-id.
     "transaction_per_request": True,
     "userid_hmac_secret": "",
@@ -152,6 +164,9 @@ def includeme(config):
     # Heartbeat registry.
     config.registry.heartbeats = {}
 
+    # Principals allowed from settings, by resource name and permission.
+    config.registry.settings_principals = settings_principals(settings)
+
     # Public settings registry.
     config.registry.public_settings = {"batch_max_requests", "readonly"}
 
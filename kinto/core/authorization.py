@@ -1,12 +1,16 @@
 import functools
 import logging
+import threading
+import types
 
+from pyramid.interfaces import IRootFactory, IRoutesMapper
 from pyramid.settings import aslist
 from pyramid.security import IAuthorizationPolicy, Authenticated
 from zope.interface import implementer
 
 from kinto.core import utils
-from kinto.core.storage import exceptions as storage_exceptions
+from kinto.core.statsd import statsd_count
+from kinto.core.storage import AccessibleBy, exceptions as storage_exceptions
 
 
 logger = logging.getLogger(__name__)
@@ -18,6 +22,28 @@ DYNAMIC = "dynamic"
 PRIVATE = "private"
 
 
+def settings_principals(settings):
+    """Parse the ``<resource>_<permission>_principals`` settings.
+
+    :returns: An immutable mapping of (resource name, permission) to the
+        frozenset of principals allowed from settings.
+    :rtype: types.MappingProxyType
+    """
+    parsed = {}
+    for key, value in settings.items():
+        # Prefixed keys (e.g. ``kinto.bucket_read_principals``) are duplicates.
+        if not key.endswith("_principals") or "." in key:
+            continue
+        name = key[: -len("_principals")]
+        if "_" not in name:
+            continue
+        resource_name, permission = name.rsplit("_", 1)
+        principals = frozenset(aslist(value))
+        if principals:
+            parsed[(resource_name, permission)] = principals
+    return types.MappingProxyType(parsed)
+
+
 def groupfinder(userid, request):
     """Fetch principals from permission backend for the specified `userid`.
 
@@ -32,15 +58,75 @@ def groupfinder(userid, request):
     if request.prefixed_userid:
         userid = request.prefixed_userid
 
-    # Query the permission backend only once per request (e.g. batch).
+    # Query the permission backend only once per request (e.g. batch), even
+    # if its subrequests run concurrently.
     reify_key = userid + "_principals"
-    if reify_key not in request.bound_data:
-        principals = backend.get_user_principals(userid)
-        request.bound_data[reify_key] = principals
+    lock = request.bound_data.setdefault("principals_lock", threading.Lock())
+    with lock:
+        if reify_key not in request.bound_data:
+            principals = backend.get_user_principals(userid)
+            request.bound_data[reify_key] = principals
 
     return request.bound_data[reify_key]
 
 
+def prefetch_permissions(request, subrequests):
+    """Check at once the permissions required by the read-only `subrequests`
+    of `request` (e.g. batch), and cache the decisions for the subrequests.
+
+    Write subrequests are ignored, since any write invalidates the cached
+    decisions (see :meth:`RouteFactory._cached_check_permission`).
+    """
+    registry = request.registry
+    policy = registry.queryUtility(IAuthorizationPolicy)
+    root_factory = registry.queryUtility(IRootFactory)
+    mapper = registry.queryUtility(IRoutesMapper)
+    # Decisions are only cached if the backend counts its writes.
+    is_supported = (
+        getattr(getattr(registry, "permission", None), "writes_count", None) is not None
+        and isinstance(policy, AuthorizationPolicy)
+        and mapper is not None
+    )
+    if not is_supported:
+        return
+
+    principals = None
+    context = None
+    bound_perms_list = []
+    for subrequest in subrequests:
+        # Subrequests with other credentials would have other principals.
+        authorization = subrequest.headers.get("Authorization")
+        if authorization != request.headers.get("Authorization"):
+            continue
+        if subrequest.method not in ("GET", "HEAD"):
+            continue
+        info = mapper(subrequest)
+        route = info["route"]
+        if route is None:
+            continue
+        factory = route.factory or root_factory
+        if not (isinstance(factory, type) and issubclass(factory, RouteFactory)):
+            continue
+        # Matched again when the subrequest is invoked.
+        subrequest.matchdict = info["match"]
+        subrequest.matched_route = route
+
+        context = factory(subrequest)
+        if context.required_permission is None:
+            continue
+        if principals is None:
+            principals = context.get_prefixed_principals()
+        bound_perms = policy._get_bound_permissions(
+            context.permission_object_id, context.required_permission
+        )
+        if bound_perms and not context._is_allowed_from_settings(principals, bound_perms):
+            bound_perms_list.append(bound_perms)
+
+    if bound_perms_list:
+        # The decisions are shared by the contexts of every subrequest.
+        context._cached_check_permissions(principals, bound_perms_list)
+
+
 @implementer(IAuthorizationPolicy)
 class AuthorizationPolicy:
     """Default authorization class, that leverages the permission backend
@@ -137,8 +223,11 @@ class RouteFactory:
     def __init__(self, request):
         # Store some shortcuts.
         permission = request.registry.permission
+        self._permission = permission
         self._check_permission = permission.check_permission
+        self._check_permissions = permission.check_permissions
         self._get_accessible_objects = permission.get_accessible_objects
+        self._storage = getattr(request.registry, "storage", None)
 
         self.get_prefixed_principals = functools.partial(utils.prefixed_principals, request)
 
@@ -167,7 +256,12 @@ class RouteFactory:
             # To obtain shared records on a collection endpoint, use a match:
             self._object_id_match = self.get_permission_object_id(request, "*")
 
-        self._settings = request.registry.settings
+        self._settings_principals = request.registry.settings_principals
+
+        # Permission decisions are cached for the whole request (e.g. batch).
+        bound_data = getattr(request, "bound_data", {})
+        self._decisions = bound_data.setdefault("permission_decisions", {})
+        self._statsd_count = functools.partial(statsd_count, request)
 
     def check_permission(self, principals, bound_perms):
         """Read allowed principals from settings, if not any, query the permission
@@ -175,17 +269,72 @@ class RouteFactory:
         """
         if not bound_perms:
             bound_perms = [(self.resource_name, self.required_permission)]
+        if self._is_allowed_from_settings(principals, bound_perms):
+            return True
+        return self._cached_check_permission(principals, bound_perms)
+
+    def _is_allowed_from_settings(self, principals, bound_perms):
         for (_, permission) in bound_perms:
             # With Kinto inheritance tree, we can have: `permission = "record:create"`
             if self.resource_name and permission.startswith(self.resource_name):
-                setting = f"{permission.replace(':', '_')}_principals"
+                key = tuple(permission.rsplit(":", 1))
             else:
-                setting = f"{self.resource_name}_{permission}_principals"
-            allowed_principals = aslist(self._settings.get(setting, ""))
-            if allowed_principals:
-                if bool(set(allowed_principals) & set(principals)):
-                    return True
-        return self._check_permission(principals, bound_perms)
+                key = (self.resource_name, permission)
+            allowed_principals = self._settings_principals.get(key)
+            if allowed_principals and not allowed_principals.isdisjoint(principals):
+                return True
+        return False
+
+    def _get_decisions(self):
+        """Return the decisions cached during the request, unless some
+        permission was modified in the meantime.
+
+        Return ``None`` if the permission backend does not count its writes,
+        since the cached decisions could not be invalidated.
+        """
+        writes_count = getattr(self._permission, "writes_count", None)
+        if writes_count is None:
+            return None
+        if self._decisions.get("writes_count") != writes_count:
+            self._decisions.clear()
+            self._decisions["writes_count"] = writes_count
+        return self._decisions
+
+    def _cached_check_permission(self, principals, bound_perms):
+        """Query the permission backend only once per request for the same
+        principals and bound permissions, as long as no permission was
+        modified in the meantime.
+        """
+        decisions = self._get_decisions()
+        if decisions is None:
+            return self._check_permission(principals, bound_perms)
+        key = (frozenset(principals), frozenset(bound_perms))
+        if key in decisions:
+            self._statsd_count("authorization.decisions.hits")
+            return decisions[key]
+
+        self._statsd_count("authorization.decisions.misses")
+        allowed = self._check_permission(principals, bound_perms)
+        decisions[key] = allowed
+        return allowed
+
+    def _cached_check_permissions(self, principals, bound_perms_list):
+        """Same as :meth:`_cached_check_permission` for several lists of bound
+        permissions, with a single query for those that are not cached.
+        """
+        decisions = self._get_decisions()
+        if decisions is None:
+            return self._check_permissions(principals, bound_perms_list)
+        principals_key = frozenset(principals)
+        keys = [(principals_key, frozenset(bound_perms)) for bound_perms in bound_perms_list]
+        missing = {}
+        for key, bound_perms in zip(keys, bound_perms_list):
+            if key not in decisions:
+                missing.setdefault(key, bound_perms)
+        if missing:
+            allowed = self._check_permissions(principals, list(missing.values()))
+            decisions.update(zip(missing.keys(), allowed))
+        return [decisions[key] for key in keys]
 
     def fetch_shared_records(self, perm, principals, get_bound_permissions):
         """Fetch records that are readable or writable for the current
@@ -193,7 +342,12 @@ class RouteFactory:
 
         See :meth:`kinto.core.authorization.AuthorizationPolicy.permits`
 
-        If no record is shared, it returns None.
+        If no record is shared, it returns an empty list.
+
+        If the storage backend can filter the records against the permission
+        backend (e.g. same PostgreSQL database), the ids are not fetched and
+        an :class:`kinto.core.storage.AccessibleBy` filter value is returned
+        instead.
 
         .. warning::
             This sets the ``shared_ids`` attribute to the context with the
@@ -204,6 +358,14 @@ class RouteFactory:
             bound_perms = get_bound_permissions(self._object_id_match, perm)
         else:
             bound_perms = [(self._object_id_match, perm)]
+
+        if self._storage is not None and self._storage.supports_accessible_by(self._permission):
+            has_shared = self._permission.has_accessible_objects(
+                principals, bound_perms, with_children=False
+            )
+            self.shared_ids = AccessibleBy(principals, bound_perms) if has_shared else []
+            return self.shared_ids
+
         by_obj_id = self._get_accessible_objects(principals, bound_perms, with_children=False)
         ids = by_obj_id.keys()
         # Store for later use in ``ShareableResource``.
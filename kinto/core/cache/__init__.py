@@ -71,6 +71,35 @@ class CacheBase:
         """
         raise NotImplementedError
 
+    def get_many(self, keys):
+        """Obtain the values of several keys at once.
+
+        :param list keys: keys
+        :returns: the stored values, or None for missing ones, in the same
+            order as `keys`.
+        :rtype: list
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items, ttl):
+        """Store several values at once.
+
+        :param dict items: values to store, by key
+        :param float ttl: expire after number of seconds
+        """
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys):
+        """Delete the values of several keys at once.
+
+        :param list keys: keys
+        :returns: the deleted values, or None for missing ones, in the same
+            order as `keys`.
+        :rtype: list
+        """
+        return [self.delete(key) for key in keys]
+
 
 def heartbeat(backend):
     def ping(request):
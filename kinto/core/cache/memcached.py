@@ -103,6 +103,28 @@ class Cache(CacheBase):
         self._client.delete(self.prefix + key)
         return value
 
+    @wrap_memcached_error
+    def get_many(self, keys):
+        values = self._client.get_multi(keys, key_prefix=self.prefix)
+        return [json.loads(values[key])["value"] if values.get(key) else None for key in keys]
+
+    @wrap_memcached_error
+    def set_many(self, items, ttl):
+        for value in items.values():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+        expires_at = ceil(time() + ttl)
+        mapping = {
+            key: json.dumps({"value": value, "ttl": expires_at}) for key, value in items.items()
+        }
+        self._client.set_multi(mapping, int(ttl), key_prefix=self.prefix)
+
+    @wrap_memcached_error
+    def delete_many(self, keys):
+        values = self.get_many(keys)
+        self._client.delete_multi(keys, key_prefix=self.prefix)
+        return values
+
 
 def load_from_config(config):
     settings = config.get_settings()
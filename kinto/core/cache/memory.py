@@ -1,13 +1,31 @@
+import heapq
 import logging
+import threading
+from collections import OrderedDict
 
 from kinto.core.cache import CacheBase
 from kinto.core.utils import msec_time
-from kinto.core.decorators import synchronized
 
 
 logger = logging.getLogger(__name__)
 
 
+class _Stripe:
+    """A share of the cache entries, guarded by its own lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> value, from the least to the most recently used.
+        self.store = OrderedDict()
+        # key -> size of the entry.
+        self.sizes = {}
+        self.size = 0
+        # key -> expiration timestamp.
+        self.ttl = {}
+        # Heap of (expiration timestamp, key), with outdated items skipped.
+        self.expirations = []
+
+
 class Cache(CacheBase):
     """Cache backend implementation in local process memory.
 
@@ -15,9 +33,17 @@ class Cache(CacheBase):
 
         kinto.cache_backend = kinto.core.cache.memory
 
+    Entries are spread over several stripes, each with its own lock. In each
+    stripe, expired entries are found with a heap of expiration timestamps,
+    and the least recently used entries are evicted once its share of
+    ``cache_max_size_bytes`` is reached.
+
     :noindex:
     """
 
+    stripes = 16
+    """Number of stripes of entries."""
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.flush()
@@ -27,62 +53,116 @@ class Cache(CacheBase):
         pass
 
     def flush(self):
-        self._created_at = {}
-        self._ttl = {}
-        self._store = {}
-        self._quota = 0
+        self._stripes = [_Stripe() for _ in range(self.stripes)]
 
-    def _clean_expired(self):
-        current = msec_time()
-        expired = [k for k, v in self._ttl.items() if current >= v]
-        for expired_item_key in expired:
-            self.delete(expired_item_key[len(self.prefix) :])
+    @property
+    def _quota(self):
+        return sum(stripe.size for stripe in self._stripes)
+
+    def _get_stripe(self, item_key):
+        return self._stripes[hash(item_key) % len(self._stripes)]
+
+    def _group_by_stripe(self, keys):
+        """Return the distinct prefixed `keys` grouped by stripe."""
+        stripes = {}
+        for item_key in set(self.prefix + key for key in keys):
+            stripe = self._get_stripe(item_key)
+            stripes.setdefault(id(stripe), (stripe, []))[1].append(item_key)
+        return stripes.values()
 
-    def _clean_oversized(self):
-        if self._quota < self.max_size_bytes:
+    def _clean_expired(self, stripe):
+        current = msec_time()
+        expirations = stripe.expirations
+        while expirations and expirations[0][0] <= current:
+            expires_at, item_key = heapq.heappop(expirations)
+            # Skip outdated items (i.e. entries deleted or expiration changed).
+            if stripe.ttl.get(item_key) == expires_at:
+                self._remove(stripe, item_key)
+
+    def _clean_oversized(self, stripe):
+        max_size_bytes = self.max_size_bytes / len(self._stripes)
+        if stripe.size < max_size_bytes:
             return
 
-        for key, value in sorted(self._created_at.items(), key=lambda k: k[1]):
-            if self._quota < (self.max_size_bytes * 0.8):
-                break
-            self.delete(key[len(self.prefix) :])
+        while stripe.store and stripe.size >= (max_size_bytes * 0.8):
+            least_recently_used = next(iter(stripe.store))
+            self._remove(stripe, least_recently_used)
+
+    def _set_expiration(self, stripe, item_key, expires_at):
+        stripe.ttl[item_key] = expires_at
+        heapq.heappush(stripe.expirations, (expires_at, item_key))
+        # Drop the outdated items once they outnumber the entries.
+        if len(stripe.expirations) > 2 * len(stripe.ttl) + 64:
+            stripe.expirations = [(v, k) for k, v in stripe.ttl.items()]
+            heapq.heapify(stripe.expirations)
+
+    def _remove(self, stripe, item_key):
+        stripe.ttl.pop(item_key, None)
+        stripe.size -= stripe.sizes.pop(item_key, 0)
+        return stripe.store.pop(item_key, None)
 
-    @synchronized
     def ttl(self, key):
-        ttl = self._ttl.get(self.prefix + key)
+        item_key = self.prefix + key
+        stripe = self._get_stripe(item_key)
+        with stripe.lock:
+            ttl = stripe.ttl.get(item_key)
         if ttl is not None:
             return (ttl - msec_time()) / 1000.0
         return -1
 
-    @synchronized
     def expire(self, key, ttl):
-        self._ttl[self.prefix + key] = msec_time() + int(ttl * 1000.0)
+        item_key = self.prefix + key
+        stripe = self._get_stripe(item_key)
+        with stripe.lock:
+            if item_key in stripe.store:
+                self._set_expiration(stripe, item_key, msec_time() + int(ttl * 1000.0))
 
-    @synchronized
     def set(self, key, value, ttl):
-        if isinstance(value, bytes):
-            raise TypeError("a string-like object is required, not 'bytes'")
-        self._clean_expired()
-        self._clean_oversized()
-        self.expire(key, ttl)
-        item_key = self.prefix + key
-        self._store[item_key] = value
-        self._created_at[item_key] = msec_time()
-        self._quota += size_of(item_key, value)
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl):
+        for value in items.values():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+        expires_at = msec_time() + int(ttl * 1000.0)
+        for stripe, item_keys in self._group_by_stripe(items.keys()):
+            with stripe.lock:
+                for item_key in item_keys:
+                    value = items[item_key[len(self.prefix) :]]
+                    size = size_of(item_key, value)
+                    self._remove(stripe, item_key)
+                    self._clean_expired(stripe)
+                    self._clean_oversized(stripe)
+                    stripe.store[item_key] = value
+                    stripe.sizes[item_key] = size
+                    stripe.size += size
+                    self._set_expiration(stripe, item_key, expires_at)
 
-    @synchronized
     def get(self, key):
-        self._clean_expired()
-        return self._store.get(self.prefix + key)
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        values = {}
+        for stripe, item_keys in self._group_by_stripe(keys):
+            with stripe.lock:
+                self._clean_expired(stripe)
+                for item_key in item_keys:
+                    if item_key in stripe.store:
+                        stripe.store.move_to_end(item_key)
+                        values[item_key] = stripe.store[item_key]
+        return [values.get(self.prefix + key) for key in keys]
 
-    @synchronized
     def delete(self, key):
-        key = self.prefix + key
-        self._ttl.pop(key, None)
-        self._created_at.pop(key, None)
-        value = self._store.pop(key, None)
-        self._quota -= size_of(key, value)
-        return value
+        return self.delete_many([key])[0]
+
+    def delete_many(self, keys):
+        values = {}
+        for stripe, item_keys in self._group_by_stripe(keys):
+            with stripe.lock:
+                self._clean_expired(stripe)
+                for item_key in item_keys:
+                    values[item_key] = self._remove(stripe, item_key)
+        return [values.get(self.prefix + key) for key in keys]
 
 
 def load_from_config(config):
@@ -94,6 +174,6 @@ def load_from_config(config):
 
 
 def size_of(key, value):
-    # Key used for ttl, created_at and store.
-    # Int size is 24 bytes one for ttl and one for created_at values
+    # Key used for ttl, sizes and store.
+    # Int size is 24 bytes one for ttl and one for sizes values
     return len(key) * 3 + len(str(value)) + 24 * 2
@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 
 from kinto.core.cache import CacheBase
 from kinto.core.storage.postgresql.client import create_from_config
@@ -54,6 +55,10 @@ class Cache(CacheBase):
     <http://docs.sqlalchemy.org/en/rel_1_0/core/engines.html>`_
     for default values and behaviour.
 
+    Expired entries are ignored when read, and deleted by batches of
+    :attr:`purge_batch_size` when some entry is written, at most once every
+    ``kinto.cache_purge_interval_seconds`` per process.
+
     .. note::
 
         Using a `dedicated connection pool <http://pgpool.net>`_ is still
@@ -63,9 +68,14 @@ class Cache(CacheBase):
     :noindex:
     """  # NOQA
 
-    def __init__(self, client, *args, **kwargs):
+    purge_batch_size = 1000
+    """Maximum number of expired entries deleted at once."""
+
+    def __init__(self, client, *args, purge_interval=60, **kwargs):
         super().__init__(*args, **kwargs)
         self.client = client
+        self.purge_interval = purge_interval
+        self._next_purge = 0
 
     def initialize_schema(self, dry_run=False):
         # Check if cache table exists.
@@ -109,7 +119,7 @@ class Cache(CacheBase):
         SELECT EXTRACT(SECOND FROM (ttl - now())) AS ttl
           FROM cache
          WHERE key = :key
-           AND ttl IS NOT NULL;
+           AND now() < ttl;
         """
         with self.client.connect(readonly=True) as conn:
             result = conn.execute(query, dict(key=self.prefix + key))
@@ -119,7 +129,7 @@ class Cache(CacheBase):
 
     def expire(self, key, ttl):
         query = """
-        UPDATE cache SET ttl = sec2ttl(:ttl) WHERE key = :key;
+        UPDATE cache SET ttl = sec2ttl(:ttl) WHERE key = :key AND now() < ttl;
         """
         with self.client.connect() as conn:
             conn.execute(query, dict(ttl=ttl, key=self.prefix + key))
@@ -138,37 +148,110 @@ class Cache(CacheBase):
         value = json.dumps(value)
         with self.client.connect() as conn:
             conn.execute(query, dict(key=self.prefix + key, value=value, ttl=ttl))
+            self._maybe_purge_expired(conn)
 
-    def get(self, key):
-        purge = """
-        DELETE FROM cache c
-        USING (
+    def set_many(self, items, ttl):
+        for value in items.values():
+            if isinstance(value, bytes):
+                raise TypeError("a string-like object is required, not 'bytes'")
+        if not items:
+            return
+
+        query = """
+        INSERT INTO cache (key, value, ttl)
+        SELECT key, value, sec2ttl(:ttl)
+          FROM unnest(:keys, :values) AS items (key, value)
+        ON CONFLICT (key) DO UPDATE
+        SET value = EXCLUDED.value,
+            ttl = EXCLUDED.ttl;
+        """
+        keys = [self.prefix + key for key in items.keys()]
+        values = [json.dumps(value) for value in items.values()]
+        with self.client.connect() as conn:
+            conn.execute(query, dict(keys=keys, values=values, ttl=ttl))
+            self._maybe_purge_expired(conn)
+
+    def _maybe_purge_expired(self, conn):
+        if time.time() >= self._next_purge:
+            self._next_purge = time.time() + self.purge_interval
+            self._purge_expired(conn)
+
+    def purge_expired(self):
+        """Delete a batch of expired entries.
+
+        :returns: The number of deleted entries.
+        :rtype: int
+        """
+        with self.client.connect() as conn:
+            return self._purge_expired(conn)
+
+    def _purge_expired(self, conn):
+        # Entries locked by concurrent purges or writes are left for later.
+        query = """
+        DELETE FROM cache
+         WHERE key = ANY(ARRAY(
             SELECT key
-            FROM cache
-            WHERE ttl IS NOT NULL AND now() > ttl
-            ORDER BY key ASC
-            FOR UPDATE
-        ) del
-        WHERE del.key = c.key;"""
+              FROM cache
+             WHERE now() > ttl
+             LIMIT :batch_size
+               FOR UPDATE SKIP LOCKED
+        ));"""
+        result = conn.execute(query, dict(batch_size=self.purge_batch_size))
+        logger.debug(f"Purged {result.rowcount} expired cache entries")
+        return result.rowcount
+
+    def get(self, key):
         query = "SELECT value FROM cache WHERE key = :key AND now() < ttl;"
-        with self.client.connect() as conn:
-            conn.execute(purge)
+        with self.client.connect(readonly=True) as conn:
             result = conn.execute(query, dict(key=self.prefix + key))
             if result.rowcount > 0:
                 value = result.fetchone()["value"]
                 return json.loads(value)
 
+    def get_many(self, keys):
+        if not keys:
+            return []
+        query = "SELECT key, value FROM cache WHERE key = ANY(:keys) AND now() < ttl;"
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, dict(keys=[self.prefix + key for key in keys]))
+            values = {row["key"]: json.loads(row["value"]) for row in result.fetchall()}
+        return [values.get(self.prefix + key) for key in keys]
+
     def delete(self, key):
-        query = "DELETE FROM cache WHERE key = :key RETURNING value;"
+        # Expired entries are deleted, but not returned.
+        query = """
+        DELETE FROM cache WHERE key = :key
+        RETURNING CASE WHEN now() < ttl THEN value END AS value;
+        """
         with self.client.connect() as conn:
             result = conn.execute(query, dict(key=self.prefix + key))
             if result.rowcount > 0:
                 value = result.fetchone()["value"]
-                return json.loads(value)
+                if value is not None:
+                    return json.loads(value)
         return None
 
+    def delete_many(self, keys):
+        if not keys:
+            return []
+        query = """
+        DELETE FROM cache WHERE key = ANY(:keys)
+        RETURNING key, CASE WHEN now() < ttl THEN value END AS value;
+        """
+        with self.client.connect() as conn:
+            result = conn.execute(query, dict(keys=[self.prefix + key for key in keys]))
+            values = {
+                row["key"]: json.loads(row["value"])
+                for row in result.fetchall()
+                if row["value"] is not None
+            }
+        return [values.get(self.prefix + key) for key in keys]
+
 
 def load_from_config(config):
     settings = config.get_settings()
     client = create_from_config(config, prefix="cache_", with_transaction=False)
-    return Cache(client=client, cache_prefix=settings["cache_prefix"])
+    purge_interval = float(settings.get("cache_purge_interval_seconds", 60))
+    return Cache(
+        client=client, cache_prefix=settings["cache_prefix"], purge_interval=purge_interval
+    )
@@ -3,7 +3,8 @@
 --
 SET client_min_messages TO ERROR;
 
-CREATE TABLE IF NOT EXISTS cache (
+-- Entries are not written to the WAL: the cache is emptied after a crash.
+CREATE UNLOGGED TABLE IF NOT EXISTS cache (
     key VARCHAR(256) PRIMARY KEY,
     value TEXT NOT NULL,
     ttl TIMESTAMP DEFAULT NULL
@@ -52,6 +52,9 @@ class CacheTest:
             (self.cache.get, ""),
             (self.cache.set, "", "", 42),
             (self.cache.delete, ""),
+            (self.cache.get_many, [""]),
+            (self.cache.set_many, {"": ""}, 42),
+            (self.cache.delete_many, [""]),
         ]
         for call in calls:
             self.assertRaises(exceptions.BackendError, *call)
@@ -116,6 +119,48 @@ class CacheTest:
         returned = self.cache.delete("foobar")
         self.assertIsNone(returned)
 
+    def test_get_many_returns_values_in_order(self):
+        self.cache.set("foo", "a", 42)
+        self.cache.set("bar", {"b": [1, 2]}, 42)
+        retrieved = self.cache.get_many(["bar", "unknown", "foo"])
+        self.assertEqual(retrieved, [{"b": [1, 2]}, None, "a"])
+
+    def test_get_many_accepts_no_keys(self):
+        self.assertEqual(self.cache.get_many([]), [])
+
+    def test_get_many_ignores_expired_values(self):
+        self.cache.set("foo", "a", 0.01)
+        self.cache.set("bar", "b", 42)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get_many(["foo", "bar"]), [None, "b"])
+
+    def test_set_many_adds_the_records(self):
+        self.cache.set("foo", "old", 42)
+        self.cache.set_many({"foo": "a", "bar": ["b"]}, 42)
+        self.assertEqual(self.cache.get("foo"), "a")
+        self.assertEqual(self.cache.get("bar"), ["b"])
+
+    def test_set_many_with_ttl_expires_the_values(self):
+        self.cache.set_many({"foo": "a", "bar": "b"}, 0.01)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get_many(["foo", "bar"]), [None, None])
+
+    def test_bytes_cannot_be_stored_with_set_many(self):
+        with pytest.raises(TypeError):
+            self.cache.set_many({"test": "foo", "other": b"foo"}, 42)
+
+    def test_delete_many_removes_the_records(self):
+        self.cache.set_many({"foo": "a", "bar": ""}, 42)
+        returned = self.cache.delete_many(["foo", "unknown", "bar"])
+        self.assertEqual(returned, ["a", None, ""])
+        self.assertEqual(self.cache.get_many(["foo", "bar"]), [None, None])
+
+    def test_delete_does_not_return_expired_values(self):
+        self.cache.set("foo", "a", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.delete("foo"))
+        self.assertEqual(self.cache.delete_many(["foo"]), [None])
+
     def test_expire_expires_the_value(self):
         self.cache.set("foobar", "toto", 42)
         self.cache.expire("foobar", 0.01)
@@ -182,6 +227,16 @@ class CacheTest:
         obtained = self.cache.get("prefix_key")
         self.assertEqual(obtained, None)
 
+    def test_prefix_value_used_with_many_methods(self):
+        backend_prefix = self.get_backend_prefix(prefix="prefix_")
+
+        backend_prefix.set_many({"foo": "a", "bar": "b"}, 42)
+        self.assertEqual(self.cache.get_many(["prefix_foo", "prefix_bar"]), ["a", "b"])
+        self.assertEqual(backend_prefix.get_many(["foo", "bar"]), ["a", "b"])
+
+        backend_prefix.delete_many(["foo"])
+        self.assertEqual(self.cache.get_many(["prefix_foo", "prefix_bar"]), [None, "b"])
+
     def test_prefix_value_used_with_ttl(self):
         backend_prefix = self.get_backend_prefix(prefix="prefix_")
 
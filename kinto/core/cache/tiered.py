@@ -0,0 +1,121 @@
+import collections
+import logging
+
+from pyramid.exceptions import ConfigurationError
+
+from kinto.core.cache import CacheBase, memory
+
+
+logger = logging.getLogger(__name__)
+
+
+class Cache(CacheBase):
+    """Cache backend that keeps the most used entries of another backend in
+    local process memory.
+
+    Enable in configuration::
+
+        kinto.cache_backend = kinto.core.cache.tiered
+        kinto.cache_tiered_backend = kinto.core.cache.memcached
+
+    Writes and deletions go through both tiers. Entries are kept in memory
+    for at most ``kinto.cache_tiered_ttl_seconds``, and the least recently
+    used ones are evicted once ``kinto.cache_max_size_bytes`` is reached.
+    Since entries changed by other processes are not invalidated in memory,
+    they can be read with their former value until then.
+
+    The reads served by each tier are counted in :attr:`hits` (and sent to
+    StatsD if enabled).
+
+    :noindex:
+    """
+
+    def __init__(self, local, backend, local_ttl, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.local = local
+        self.backend = backend
+        self.local_ttl = local_ttl
+        self.hits = collections.Counter()
+        self.statsd = None
+
+    def initialize_schema(self, dry_run=False):
+        self.backend.initialize_schema(dry_run=dry_run)
+
+    def flush(self):
+        self.local.flush()
+        self.backend.flush()
+
+    def ttl(self, key):
+        return self.backend.ttl(key)
+
+    def expire(self, key, ttl):
+        self.local.delete(key)
+        self.backend.expire(key, ttl)
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl):
+        self.backend.set_many(items, ttl)
+        self.local.set_many(items, min(ttl, self.local_ttl))
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        values = self.local.get_many(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        self._count("l1", len(keys) - len(missing))
+        if not missing:
+            return values
+
+        fetched = dict(zip(missing, self.backend.get_many(missing)))
+        found = {key: value for key, value in fetched.items() if value is not None}
+        self._count("l2", len([key for key in missing if key in found]))
+        self._count("miss", len([key for key in missing if key not in found]))
+        if found:
+            self.local.set_many(found, self.local_ttl)
+        return [fetched[key] if value is None else value for key, value in zip(keys, values)]
+
+    def delete(self, key):
+        return self.delete_many([key])[0]
+
+    def delete_many(self, keys):
+        self.local.delete_many(keys)
+        return self.backend.delete_many(keys)
+
+    def hit_ratios(self):
+        """Return the ratio of reads served by each tier.
+
+        :rtype: dict
+        """
+        total = sum(self.hits.values())
+        return {tier: self.hits[tier] / total if total else 0.0 for tier in ("l1", "l2")}
+
+    def _count(self, tier, count):
+        if count == 0:
+            return
+        self.hits[tier] += count
+        if self.statsd is not None:
+            for _ in range(count):
+                self.statsd.count(f"cache.tiered.{tier}")
+
+
+def load_from_config(config):
+    settings = config.get_settings()
+    backend_mod = settings["cache_tiered_backend"]
+    if not backend_mod:
+        raise ConfigurationError("The cache_tiered_backend setting is missing.")
+    backend_mod = config.maybe_dotted(backend_mod)
+    if backend_mod.load_from_config is load_from_config:
+        raise ConfigurationError("The tiered cache backend cannot wrap itself.")
+    backend = backend_mod.load_from_config(config)
+    if not isinstance(backend, CacheBase):
+        raise ConfigurationError(f"Invalid cache backend: {backend}")
+
+    prefix = settings["cache_prefix"]
+    local = memory.Cache(
+        cache_prefix=prefix, cache_max_size_bytes=settings["cache_max_size_bytes"]
+    )
+    local_ttl = float(settings["cache_tiered_ttl_seconds"])
+    return Cache(local=local, backend=backend, local_ttl=local_ttl, cache_prefix=prefix)
@@ -27,6 +27,7 @@ except ImportError:  # pragma: no cover
 from kinto.core import errors
 from kinto.core import utils
 from kinto.core import cache
+from kinto.core.cache import tiered as tiered_cache
 from kinto.core import storage
 from kinto.core import permission
 from kinto.core.events import ResourceRead, ResourceChanged, ACTIONS
@@ -267,6 +268,10 @@ def setup_statsd(config):
         client.watch_execution_time(config.registry.storage, prefix="backend")
         client.watch_execution_time(config.registry.permission, prefix="backend")
 
+        if isinstance(config.registry.cache, tiered_cache.Cache):
+            # Count the reads served by each tier of the cache.
+            config.registry.cache.statsd = client
+
         # Commit so that configured policy can be queried.
         config.commit()
         policy = config.registry.queryUtility(IAuthenticationPolicy)
@@ -10,6 +10,13 @@ __HEARTBEAT_KEY__ = "__heartbeat__"
 
 
 class PermissionBase:
+    writes_count = None
+    """Number of calls to the methods that modify the stored permissions.
+    Backends that set it to ``0`` must increment it in every write method
+    (including the ones overridden by subclasses), in order to invalidate the
+    permission decisions cached during requests (see
+    :mod:`kinto.core.authorization`). With ``None``, decisions are not cached."""
+
     def __init__(self, *args, **kwargs):
         pass
 
@@ -43,6 +50,24 @@ class PermissionBase:
         """
         raise NotImplementedError
 
+    def add_user_principals(self, user_ids, principal):
+        """Add an additional principal to several users at once.
+
+        :param list user_ids: The user_ids to add the principal to.
+        :param str principal: The principal to add.
+        """
+        for user_id in user_ids:
+            self.add_user_principal(user_id, principal)
+
+    def remove_user_principals(self, user_ids, principal):
+        """Remove an additional principal from several users at once.
+
+        :param list user_ids: The user_ids to remove the principal from.
+        :param str principal: The principal to remove.
+        """
+        for user_id in user_ids:
+            self.remove_user_principal(user_id, principal)
+
     def remove_principal(self, principal):
         """Remove a principal from every user.
 
@@ -109,6 +134,17 @@ class PermissionBase:
         """
         raise NotImplementedError
 
+    def has_accessible_objects(self, principals, bound_permissions, with_children=True):
+        """Test if the specified `principals` have some permissions on at least
+        one of the objects matching the `bound_permissions`.
+
+        See :meth:`get_accessible_objects`.
+
+        :rtype: bool
+        """
+        accessible = self.get_accessible_objects(principals, bound_permissions, with_children)
+        return len(accessible) > 0
+
     def get_authorized_principals(self, bound_permissions):
         """Return the full set of authorized principals for a list of bound
         permissions (object + permission).
@@ -135,6 +171,22 @@ class PermissionBase:
         authorized = self.get_authorized_principals(bound_permissions)
         return len(authorized & principals) > 0
 
+    def check_permissions(self, principals, bound_permissions_list):
+        """Test if a principal set have got a permission on several objects at
+        once.
+
+        :param set principals:
+            A set of user principals to test the permissions against.
+        :param list bound_permissions_list: A list of lists of tuples
+            (object_id, permission), as for :meth:`check_permission`.
+        :returns: The result of each check, in the same order.
+        :rtype: list
+        """
+        return [
+            self.check_permission(principals, bound_permissions)
+            for bound_permissions in bound_permissions_list
+        ]
+
     def get_object_permissions(self, object_id, permissions=None):
         return self.get_objects_permissions([object_id], permissions)[0]
 
@@ -170,6 +222,31 @@ class PermissionBase:
         """
         raise NotImplementedError
 
+    def replace_objects_permissions(self, objects_permissions):
+        """Update the set of principals allowed to perform some actions on
+        several objects at once.
+
+        See :meth:`replace_object_permissions`.
+
+        :param dict objects_permissions: A dict of object id -> permissions
+            (as a dict of perm -> principals).
+        """
+        for object_id, permissions in objects_permissions.items():
+            self.replace_object_permissions(object_id, permissions)
+
+    def defer_objects_permissions(self, objects_permissions):
+        """Same as :meth:`replace_objects_permissions`, but the backend may
+        write the changes when the current transaction is committed, in order
+        to group those of several objects.
+
+        The pending changes must be taken into account by the other methods
+        of the backend in the meantime.
+
+        :param dict objects_permissions: A dict of object id -> permissions
+            (as a dict of perm -> principals).
+        """
+        self.replace_objects_permissions(objects_permissions)
+
     def delete_object_permissions(self, *object_id_list):
         """Delete all listed object permissions.
 
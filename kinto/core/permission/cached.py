@@ -0,0 +1,348 @@
+import logging
+import uuid
+
+import transaction
+from pyramid.exceptions import ConfigurationError
+from pyramid.security import Authenticated
+
+from kinto.core.permission import PermissionBase
+
+
+logger = logging.getLogger(__name__)
+
+MAX_USERS_INVALIDATIONS = 10
+"""Above this number of users, their principals are invalidated at once."""
+
+
+class _Invalidations:
+    """Transaction data manager that invalidates the keys modified in its
+    transaction again once it is over, whatever its outcome.
+
+    Entries cached while the transaction is open may come from its uncommitted
+    writes, and entries may be cached from other processes until it commits.
+    """
+
+    def __init__(self, permission):
+        self.permission = permission
+        self.transaction_manager = transaction.manager
+        self.keys = {}
+
+    def invalidate(self, *args):
+        for key, bump in self.keys.items():
+            self.permission._invalidate_now(key, bump)
+
+    def abort(self, txn):
+        self.invalidate()
+
+    def tpc_abort(self, txn):
+        self.invalidate()
+
+    def tpc_begin(self, txn):
+        pass
+
+    def commit(self, txn):
+        pass
+
+    def tpc_vote(self, txn):
+        pass
+
+    def tpc_finish(self, txn):
+        # Invalidated from an after commit hook, once every data manager
+        # has committed.
+        pass
+
+    def sortKey(self):
+        return f"kinto.core.permission.cached:{id(self)}"
+
+    def savepoint(self):
+        # Rolling back to a savepoint undoes writes too.
+        return self
+
+    def rollback(self):
+        self.invalidate()
+
+
+class Permission(PermissionBase):
+    """Permission backend that keeps the objects ACLs and the users principals
+    of another backend in the cache backend.
+
+    Enable in configuration::
+
+        kinto.permission_backend = kinto.core.permission.cached
+        kinto.permission_cached_backend = kinto.core.permission.postgresql
+
+    Cached entries are versioned by bucket (i.e. by the first level of the
+    object URI). When some permissions change, the version of their bucket
+    is replaced, which invalidates all its entries at once.
+
+    :noindex:
+    """
+
+    # Incremented by every write method.
+    writes_count = 0
+
+    def __init__(self, backend, cache, ttl, *args, **kwargs):
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+        super().__init__(*args, **kwargs)
+
+    @property
+    def client(self):
+        """Client of the wrapped backend, if any (see
+        :meth:`kinto.core.storage.StorageBase.supports_accessible_by`)."""
+        return getattr(self.backend, "client", None)
+
+    def initialize_schema(self, dry_run=False):
+        self.backend.initialize_schema(dry_run=dry_run)
+
+    def flush(self):
+        self.writes_count += 1
+        self.backend.flush()
+        self._invalidate(self._version_key())
+
+    #
+    # Users principals.
+    #
+
+    def add_user_principal(self, user_id, principal):
+        self.writes_count += 1
+        self.backend.add_user_principal(user_id, principal)
+        self._invalidate_user(user_id)
+
+    def remove_user_principal(self, user_id, principal):
+        self.writes_count += 1
+        self.backend.remove_user_principal(user_id, principal)
+        self._invalidate_user(user_id)
+
+    def add_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        user_ids = list(user_ids)
+        self.backend.add_user_principals(user_ids, principal)
+        self._invalidate_users(user_ids)
+
+    def remove_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        user_ids = list(user_ids)
+        self.backend.remove_user_principals(user_ids, principal)
+        self._invalidate_users(user_ids)
+
+    def remove_principal(self, principal):
+        self.writes_count += 1
+        self.backend.remove_principal(principal)
+        self._invalidate(self._version_key("principals"))
+
+    def get_user_principals(self, user_id):
+        key = self._principals_key(user_id)
+        principals = self.cache.get(key)
+        if principals is None:
+            principals = list(self.backend.get_user_principals(user_id))
+            self.cache.set(key, principals, self.ttl)
+        return set(principals)
+
+    #
+    # Objects ACLs.
+    #
+
+    def add_principal_to_ace(self, object_id, permission, principal):
+        self.writes_count += 1
+        self.backend.add_principal_to_ace(object_id, permission, principal)
+        self._invalidate_objects(object_id)
+
+    def remove_principal_from_ace(self, object_id, permission, principal):
+        self.writes_count += 1
+        self.backend.remove_principal_from_ace(object_id, permission, principal)
+        self._invalidate_objects(object_id)
+
+    def replace_object_permissions(self, object_id, permissions):
+        self.writes_count += 1
+        result = self.backend.replace_object_permissions(object_id, permissions)
+        self._invalidate_objects(object_id)
+        return result
+
+    def replace_objects_permissions(self, objects_permissions):
+        self.writes_count += 1
+        self.backend.replace_objects_permissions(objects_permissions)
+        self._invalidate_objects(*objects_permissions.keys())
+
+    def defer_objects_permissions(self, objects_permissions):
+        self.writes_count += 1
+        self.backend.defer_objects_permissions(objects_permissions)
+        self._invalidate_objects(*objects_permissions.keys())
+
+    def delete_object_permissions(self, *object_id_list):
+        self.writes_count += 1
+        self.backend.delete_object_permissions(*object_id_list)
+        self._invalidate_objects(*object_id_list)
+
+    def get_object_permission_principals(self, object_id, permission):
+        acl = self._get_acls([object_id])[object_id]
+        return acl.get(permission, set())
+
+    def get_authorized_principals(self, bound_permissions):
+        acls = self._get_acls([object_id for object_id, _ in bound_permissions])
+        principals = set()
+        for object_id, permission in bound_permissions:
+            principals |= acls[object_id].get(permission, set())
+        return principals
+
+    def check_permissions(self, principals, bound_permissions_list):
+        principals = set(principals)
+        acls = self._get_acls(
+            [object_id for bound_perms in bound_permissions_list for object_id, _ in bound_perms]
+        )
+        return [
+            any(
+                not principals.isdisjoint(acls[object_id].get(permission, ()))
+                for object_id, permission in bound_permissions
+            )
+            for bound_permissions in bound_permissions_list
+        ]
+
+    def get_objects_permissions(self, objects_ids, permissions=None):
+        acls = self._get_acls(objects_ids)
+        result = []
+        for object_id in objects_ids:
+            acl = acls[object_id]
+            if permissions is not None:
+                acl = {perm: acl[perm] for perm in permissions if perm in acl}
+            result.append(acl)
+        return result
+
+    def get_accessible_objects(self, principals, bound_permissions=None, with_children=True):
+        # Object ids can be patterns here: always query the backend.
+        return self.backend.get_accessible_objects(principals, bound_permissions, with_children)
+
+    def has_accessible_objects(self, principals, bound_permissions, with_children=True):
+        return self.backend.has_accessible_objects(principals, bound_permissions, with_children)
+
+    def _get_acls(self, objects_ids):
+        """Return the ACL of each object, as a dict of permissions and sets of
+        principals, from cache or from the backend if missing.
+        """
+        objects_ids = list(set(objects_ids))
+        versions = self._get_versions(set(self._scope(object_id) for object_id in objects_ids))
+        keys = {
+            object_id: self._acl_key(versions[self._scope(object_id)], object_id)
+            for object_id in objects_ids
+        }
+
+        acls = {}
+        missing = []
+        cached = self.cache.get_many([keys[object_id] for object_id in objects_ids])
+        for object_id, acl in zip(objects_ids, cached):
+            if acl is None:
+                missing.append(object_id)
+            else:
+                acls[object_id] = {perm: set(principals) for perm, principals in acl.items()}
+
+        if missing:
+            fetched = self.backend.get_objects_permissions(missing)
+            serialized = {}
+            for object_id, acl in zip(missing, fetched):
+                serialized[keys[object_id]] = {
+                    perm: list(principals) for perm, principals in acl.items()
+                }
+                acls[object_id] = {perm: set(principals) for perm, principals in acl.items()}
+            self.cache.set_many(serialized, self.ttl)
+        return acls
+
+    #
+    # Versions.
+    #
+
+    @staticmethod
+    def _scope(object_id):
+        """Objects are versioned by their bucket (e.g. ``/buckets/bid``)."""
+        return "/".join(object_id.split("/")[:3])
+
+    def _version_key(self, scope=None):
+        if scope is None:
+            return "permission:version"
+        return f"permission:version:{scope}"
+
+    def _get_versions(self, scopes):
+        """Return the version of each scope, fetched from the cache at once.
+
+        Missing versions (e.g. evicted from the cache) are initialized with
+        a random value, so that entries cached with a previous version are
+        never read again.
+        """
+        scopes = list(scopes)
+        keys = [self._version_key()] + [self._version_key(scope) for scope in scopes]
+        values = self.cache.get_many(keys)
+        missing = {key: self._new_version() for key, value in zip(keys, values) if value is None}
+        if missing:
+            self.cache.set_many(missing, self.ttl)
+        global_version, *versions = [missing.get(key, value) for key, value in zip(keys, values)]
+        return {scope: f"{global_version}.{version}" for scope, version in zip(scopes, versions)}
+
+    @staticmethod
+    def _new_version():
+        return uuid.uuid4().hex[:8]
+
+    def _acl_key(self, version, object_id):
+        return f"permission:acl:{version}:{object_id}"
+
+    def _principals_key(self, user_id):
+        version = self._get_versions(["principals"])["principals"]
+        return f"permission:principals:{version}:{user_id}"
+
+    def _invalidate_user(self, user_id):
+        if user_id == Authenticated:
+            # Principals of ``system.Authenticated`` are given to every user.
+            self._invalidate(self._version_key("principals"))
+        else:
+            self._invalidate(self._principals_key(user_id), bump=False)
+
+    def _invalidate_users(self, user_ids):
+        if len(user_ids) > MAX_USERS_INVALIDATIONS:
+            # Replace the version of every user rather than deleting each key.
+            self._invalidate(self._version_key("principals"))
+        else:
+            for user_id in user_ids:
+                self._invalidate_user(user_id)
+
+    def _invalidate_objects(self, *object_id_list):
+        for scope in set(self._scope(object_id) for object_id in object_id_list):
+            # Patterns like ``/buckets/*`` can match objects of any bucket.
+            key = self._version_key(None if "*" in scope else scope)
+            self._invalidate(key)
+
+    def _invalidate(self, key, bump=True):
+        """Replace the version stored in `key` (or delete `key` if `bump` is
+        False), now and once the current transaction is over.
+        """
+        self._invalidate_now(key, bump)
+        current = transaction.get()
+        try:
+            invalidations = current.data(self)
+        except KeyError:
+            invalidations = _Invalidations(self)
+            current.set_data(self, invalidations)
+            current.join(invalidations)
+            current.addAfterCommitHook(invalidations.invalidate)
+        invalidations.keys[key] = bump
+
+    def _invalidate_now(self, key, bump):
+        if bump:
+            self.cache.set(key, self._new_version(), self.ttl)
+        else:
+            self.cache.delete(key)
+
+
+def load_from_config(config):
+    settings = config.get_settings()
+    cache = getattr(config.registry, "cache", None)
+    if cache is None:
+        raise ConfigurationError("The cached permission backend requires a cache backend.")
+
+    backend_mod = settings["permission_cached_backend"]
+    if not backend_mod:
+        raise ConfigurationError("The permission_cached_backend setting is missing.")
+    backend = config.maybe_dotted(backend_mod).load_from_config(config)
+    if not isinstance(backend, PermissionBase):
+        raise ConfigurationError(f"Invalid permission backend: {backend}")
+
+    ttl = int(settings["permission_cache_ttl_seconds"])
+    return Permission(backend=backend, cache=cache, ttl=ttl)
@@ -1,9 +1,19 @@
+import bisect
+import functools
 import re
+import sys
 
 from kinto.core.decorators import synchronized
 from kinto.core.permission import PermissionBase
 
 
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern, with_children=True):
+    """Compile an object id pattern (e.g. ``/buckets/*``) into a regexp."""
+    id_match = ".*" if with_children else "[^/]+"
+    return re.compile("^" + id_match.join(re.escape(part) for part in pattern.split("*")) + "$")
+
+
 class Permission(PermissionBase):
     """Permission backend implementation in local process memory.
 
@@ -11,9 +21,15 @@ class Permission(PermissionBase):
 
         kinto.permission_backend = kinto.core.permission.memory
 
+    Access Control Entries are indexed by object id and by principal, and
+    object ids are kept sorted in order to look up patterns by prefix.
+
     :noindex:
     """
 
+    # Incremented by every write method.
+    writes_count = 0
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.flush()
@@ -23,95 +39,136 @@ class Permission(PermissionBase):
         pass
 
     def flush(self):
-        self._store = {}
+        self.writes_count += 1
+        # user_id -> set of principals
+        self._users = {}
+        # object_id -> permission -> set of principals
+        self._aces = {}
+        # principal -> set of (object_id, permission)
+        self._principals_aces = {}
+        # Sorted list of the object ids with some ACEs.
+        self._object_ids = []
 
     @synchronized
     def add_user_principal(self, user_id, principal):
-        user_key = f"user:{user_id}"
-        user_principals = self._store.get(user_key, set())
-        user_principals.add(principal)
-        self._store[user_key] = user_principals
+        self.writes_count += 1
+        self._users.setdefault(user_id, set()).add(principal)
 
     @synchronized
     def remove_user_principal(self, user_id, principal):
-        user_key = f"user:{user_id}"
-        user_principals = self._store.get(user_key, set())
-        try:
-            user_principals.remove(principal)
-        except KeyError:
-            pass
+        self.writes_count += 1
+        self._remove_user_principal(user_id, principal)
+
+    @synchronized
+    def add_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        for user_id in user_ids:
+            self._users.setdefault(user_id, set()).add(principal)
+
+    @synchronized
+    def remove_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        for user_id in user_ids:
+            self._remove_user_principal(user_id, principal)
+
+    def _remove_user_principal(self, user_id, principal):
+        user_principals = self._users.get(user_id, set())
+        user_principals.discard(principal)
         if len(user_principals) == 0:
-            if user_key in self._store:
-                del self._store[user_key]
-        else:
-            self._store[user_key] = user_principals
+            self._users.pop(user_id, None)
 
     @synchronized
     def remove_principal(self, principal):
-        for user_principals in self._store.values():
-            try:
-                user_principals.remove(principal)
-            except KeyError:
-                pass
+        self.writes_count += 1
+        for user_id in list(self._users.keys()):
+            self._remove_user_principal(user_id, principal)
+        for object_id, permission in list(self._principals_aces.get(principal, [])):
+            self._remove_ace(object_id, permission, principal)
 
     @synchronized
     def get_user_principals(self, user_id):
         # Fetch the groups the user is in.
-        user_key = f"user:{user_id}"
-        members = self._store.get(user_key, set())
+        members = self._users.get(user_id, set())
         # Fetch the groups system.Authenticated is in.
-        group_authenticated = self._store.get("user:system.Authenticated", set())
+        group_authenticated = self._users.get("system.Authenticated", set())
         return members | group_authenticated
 
     @synchronized
     def add_principal_to_ace(self, object_id, permission, principal):
-        permission_key = f"permission:{object_id}:{permission}"
-        object_permission_principals = self._store.get(permission_key, set())
-        object_permission_principals.add(principal)
-        self._store[permission_key] = object_permission_principals
+        self.writes_count += 1
+        self._add_ace(object_id, permission, principal)
+
+    def _add_ace(self, object_id, permission, principal):
+        if object_id not in self._aces:
+            self._aces[object_id] = {}
+            bisect.insort(self._object_ids, object_id)
+        self._aces[object_id].setdefault(permission, set()).add(principal)
+        self._principals_aces.setdefault(principal, set()).add((object_id, permission))
 
     @synchronized
     def remove_principal_from_ace(self, object_id, permission, principal):
-        permission_key = f"permission:{object_id}:{permission}"
-        object_permission_principals = self._store.get(permission_key, set())
-        try:
-            object_permission_principals.remove(principal)
-        except KeyError:
-            pass
-        if len(object_permission_principals) == 0:
-            if permission_key in self._store:
-                del self._store[permission_key]
-        else:
-            self._store[permission_key] = object_permission_principals
+        self.writes_count += 1
+        self._remove_ace(object_id, permission, principal)
+
+    def _remove_ace(self, object_id, permission, principal):
+        object_aces = self._aces.get(object_id, {})
+        principals = object_aces.get(permission, set())
+        if principal not in principals:
+            return
+        principals.remove(principal)
+        if len(principals) == 0:
+            del object_aces[permission]
+        if len(object_aces) == 0:
+            self._remove_object(object_id)
+
+        principal_aces = self._principals_aces[principal]
+        principal_aces.discard((object_id, permission))
+        if len(principal_aces) == 0:
+            del self._principals_aces[principal]
 
     @synchronized
     def get_object_permission_principals(self, object_id, permission):
-        permission_key = f"permission:{object_id}:{permission}"
-        members = self._store.get(permission_key, set())
-        return members
+        return set(self._aces.get(object_id, {}).get(permission, set()))
 
     @synchronized
     def get_accessible_objects(self, principals, bound_permissions=None, with_children=True):
         principals = set(principals)
-        candidates = []
+        perms_by_object_id = {}
+
         if bound_permissions is None:
-            for key, value in self._store.items():
-                _, object_id, permission = key.split(":", 2)
-                candidates.append((object_id, permission, value))
-        else:
-            for pattern, perm in bound_permissions:
-                id_match = ".*" if with_children else "[^/]+"
-                regexp = re.compile(f"^{pattern.replace('*', id_match)}$")
-                for key, value in self._store.items():
-                    if key.endswith(perm):
-                        object_id = key.split(":")[1]
-                        if regexp.match(object_id):
-                            candidates.append((object_id, perm, value))
+            for principal in principals:
+                for object_id, perm in self._principals_aces.get(principal, []):
+                    perms_by_object_id.setdefault(object_id, set()).add(perm)
+            return perms_by_object_id
 
-        perms_by_object_id = {}
-        for (object_id, perm, value) in candidates:
-            if len(principals & value) > 0:
-                perms_by_object_id.setdefault(object_id, set()).add(perm)
+        principals_aces_count = sum(len(self._principals_aces.get(p, [])) for p in principals)
+        for pattern, perm in bound_permissions:
+            if "*" not in pattern:
+                candidates = [pattern] if pattern in self._aces else []
+            else:
+                regexp = _compile_pattern(pattern, with_children)
+                prefix = pattern.split("*", 1)[0]
+                start, end = self._prefix_range(prefix)
+                if end - start <= principals_aces_count:
+                    # Scan the object ids starting with the pattern prefix.
+                    candidates = (
+                        object_id
+                        for object_id in self._object_ids[start:end]
+                        if regexp.match(object_id)
+                    )
+                else:
+                    # Scan the ACEs of the principals.
+                    candidates = set(
+                        object_id
+                        for principal in principals
+                        for object_id, p in self._principals_aces.get(principal, [])
+                        if p == perm and regexp.match(object_id)
+                    )
+
+            for object_id in candidates:
+                allowed = self._aces[object_id].get(perm, set())
+                if len(principals & allowed) > 0:
+                    perms_by_object_id.setdefault(object_id, set()).add(perm)
         return perms_by_object_id
 
     @synchronized
@@ -121,43 +178,94 @@ class Permission(PermissionBase):
             principals |= self.get_object_permission_principals(obj_id, perm)
         return principals
 
+    @synchronized
+    def check_permissions(self, principals, bound_permissions_list):
+        principals = set(principals)
+        return [
+            any(
+                not principals.isdisjoint(self._aces.get(object_id, {}).get(permission, ()))
+                for object_id, permission in bound_permissions
+            )
+            for bound_permissions in bound_permissions_list
+        ]
+
     @synchronized
     def get_objects_permissions(self, objects_ids, permissions=None):
         result = []
         for object_id in objects_ids:
-            if permissions is None:
-                aces = [k for k in self._store.keys() if k.startswith(f"permission:{object_id}:")]
-            else:
-                aces = [f"permission:{object_id}:{permission}" for permission in permissions]
-            perms = {}
-            for ace in aces:
-                # Should work with 'permission:/url/id:record:create'.
-                permission = ace.split(":", 2)[2]
-                perms[permission] = set(self._store[ace])
-            result.append(perms)
+            object_aces = self._aces.get(object_id, {})
+            if permissions is not None:
+                object_aces = {p: object_aces[p] for p in permissions if p in object_aces}
+            result.append({perm: set(principals) for perm, principals in object_aces.items()})
         return result
 
     @synchronized
     def replace_object_permissions(self, object_id, permissions):
+        self.writes_count += 1
+        return self._replace_object_permissions(object_id, permissions)
+
+    @synchronized
+    def replace_objects_permissions(self, objects_permissions):
+        self.writes_count += 1
+        for object_id, permissions in objects_permissions.items():
+            self._replace_object_permissions(object_id, permissions)
+
+    def _replace_object_permissions(self, object_id, permissions):
         for permission, principals in permissions.items():
-            permission_key = f"permission:{object_id}:{permission}"
-            if permission_key in self._store and len(principals) == 0:
-                del self._store[permission_key]
-            elif principals:
-                self._store[permission_key] = set(principals)
+            principals = set(principals)
+            existing = self._aces.get(object_id, {}).get(permission, set())
+            for principal in existing - principals:
+                self._remove_ace(object_id, permission, principal)
+            for principal in principals - existing:
+                self._add_ace(object_id, permission, principal)
         return permissions
 
     @synchronized
     def delete_object_permissions(self, *object_id_list):
-        to_delete = []
-        for key in self._store.keys():
-            object_id = key.split(":")[1]
-            for pattern in object_id_list:
-                regexp = re.compile(f"^{pattern.replace('*', '.*')}$")
-                if regexp.match(object_id):
-                    to_delete.append(key)
-        for k in to_delete:
-            del self._store[k]
+        self.writes_count += 1
+        to_delete = set()
+        for pattern in object_id_list:
+            if "*" not in pattern:
+                if pattern in self._aces:
+                    to_delete.add(pattern)
+                continue
+            regexp = _compile_pattern(pattern)
+            start, end = self._prefix_range(pattern.split("*", 1)[0])
+            to_delete.update(o for o in self._object_ids[start:end] if regexp.match(o))
+
+        for object_id in to_delete:
+            for permission, principals in self._aces[object_id].items():
+                for principal in principals:
+                    principal_aces = self._principals_aces[principal]
+                    principal_aces.discard((object_id, permission))
+                    if len(principal_aces) == 0:
+                        del self._principals_aces[principal]
+            del self._aces[object_id]
+
+        if len(to_delete) < 32:
+            for object_id in to_delete:
+                del self._object_ids[bisect.bisect_left(self._object_ids, object_id)]
+        else:
+            # Rebuild the list at once, rather than shifting it for each object.
+            self._object_ids = [o for o in self._object_ids if o in self._aces]
+
+    def _prefix_range(self, prefix):
+        """Return the bounds of the object ids starting with `prefix` in the
+        sorted list of object ids.
+        """
+        if not prefix or ord(prefix[-1]) == sys.maxunicode:
+            start = bisect.bisect_left(self._object_ids, prefix)
+            return start, len(self._object_ids)
+        # Object ids starting with ``/abc`` are between ``/abc`` and ``/abd``.
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        start = bisect.bisect_left(self._object_ids, prefix)
+        end = bisect.bisect_left(self._object_ids, upper, lo=start)
+        return start, end
+
+    def _remove_object(self, object_id):
+        del self._aces[object_id]
+        index = bisect.bisect_left(self._object_ids, object_id)
+        del self._object_ids[index]
 
 
 def load_from_config(config):
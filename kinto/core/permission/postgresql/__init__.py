@@ -3,6 +3,8 @@ import os
 
 from collections import OrderedDict
 
+import transaction
+
 from kinto.core.permission import PermissionBase
 from kinto.core.storage.postgresql.client import create_from_config
 from kinto.core.storage.postgresql.migrator import MigratorMixin
@@ -72,6 +74,9 @@ class Permission(PermissionBase, MigratorMixin):
     schema_file = os.path.join(HERE, "schema.sql")
     migrations_directory = os.path.join(HERE, "migrations")
 
+    # Incremented by every write method.
+    writes_count = 0
+
     def __init__(self, client, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.client = client
@@ -144,16 +149,19 @@ class Permission(PermissionBase, MigratorMixin):
         return None
 
     def flush(self):
+        self.writes_count += 1
         query = """
         DELETE FROM user_principals;
         DELETE FROM access_control_entries;
         """
+        self._set_deferred({})
         # Since called outside request (e.g. tests), force commit.
         with self.client.connect(force_commit=True) as conn:
             conn.execute(query)
         logger.debug("Flushed PostgreSQL permission tables")
 
     def add_user_principal(self, user_id, principal):
+        self.writes_count += 1
         query = """
         INSERT INTO user_principals (user_id, principal)
         SELECT :user_id, :principal
@@ -167,6 +175,7 @@ class Permission(PermissionBase, MigratorMixin):
             conn.execute(query, dict(user_id=user_id, principal=principal))
 
     def remove_user_principal(self, user_id, principal):
+        self.writes_count += 1
         query = """
         DELETE FROM user_principals
          WHERE user_id = :user_id
@@ -174,7 +183,33 @@ class Permission(PermissionBase, MigratorMixin):
         with self.client.connect() as conn:
             conn.execute(query, dict(user_id=user_id, principal=principal))
 
+    def add_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        query = """
+        INSERT INTO user_principals (user_id, principal)
+        SELECT DISTINCT unnest(:user_ids), :principal
+            ON CONFLICT DO NOTHING;"""
+        with self.client.connect() as conn:
+            conn.execute(query, dict(user_ids=user_ids, principal=principal))
+
+    def remove_user_principals(self, user_ids, principal):
+        self.writes_count += 1
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        query = """
+        DELETE FROM user_principals
+         WHERE user_id = ANY(:user_ids)
+           AND principal = :principal;"""
+        with self.client.connect() as conn:
+            conn.execute(query, dict(user_ids=user_ids, principal=principal))
+
     def remove_principal(self, principal):
+        self.writes_count += 1
+        self._flush_deferred_of()
         query = """
         DELETE FROM user_principals
          WHERE principal = :principal;"""
@@ -193,6 +228,8 @@ class Permission(PermissionBase, MigratorMixin):
         return set([r["principal"] for r in results])
 
     def add_principal_to_ace(self, object_id, permission, principal):
+        self.writes_count += 1
+        self._flush_deferred_of([object_id])
         query = """
         INSERT INTO access_control_entries (object_id, permission, principal)
         SELECT :object_id, :permission, :principal
@@ -209,6 +246,8 @@ class Permission(PermissionBase, MigratorMixin):
             )
 
     def remove_principal_from_ace(self, object_id, permission, principal):
+        self.writes_count += 1
+        self._flush_deferred_of([object_id])
         query = """
         DELETE FROM access_control_entries
          WHERE object_id = :object_id
@@ -220,6 +259,7 @@ class Permission(PermissionBase, MigratorMixin):
             )
 
     def get_object_permission_principals(self, object_id, permission):
+        self._flush_deferred_of([object_id])
         query = """
         SELECT principal
           FROM access_control_entries
@@ -235,6 +275,8 @@ class Permission(PermissionBase, MigratorMixin):
         if not bound_permissions:
             return set()
 
+        self._flush_deferred_of(obj for obj, _ in bound_permissions)
+
         placeholders = {}
         perm_values = []
         for i, (obj, perm) in enumerate(bound_permissions):
@@ -256,6 +298,7 @@ class Permission(PermissionBase, MigratorMixin):
         return set([r["principal"] for r in results])
 
     def get_accessible_objects(self, principals, bound_permissions=None, with_children=True):
+        self._flush_deferred_of()
         placeholders = {}
 
         if bound_permissions is None:
@@ -275,42 +318,9 @@ class Permission(PermissionBase, MigratorMixin):
             # (e.g. root object /buckets)
             return {}
         else:
-            principals_values = []
-            for i, principal in enumerate(principals):
-                placeholders[f"principal_{i}"] = principal
-                principals_values.append(f"(:principal_{i})")
-
-            perm_values = []
-            for i, (obj, perm) in enumerate(bound_permissions):
-                placeholders[f"obj_{i}"] = obj.replace("*", "%")
-                placeholders[f"perm_{i}"] = perm
-                perm_values.append("(:obj_{0}, :perm_{0})".format(i))
-
-            if with_children:
-                object_id_condition = "object_id LIKE pattern"
-            else:
-                object_id_condition = (
-                    "object_id LIKE pattern " "AND object_id NOT LIKE pattern || '/%'"
-                )
-            query = f"""
-            WITH required_perms AS (
-              VALUES {','.join(perm_values)}
-            ),
-            user_principals AS (
-              VALUES {','.join(principals_values)}
-            ),
-            potential_objects AS (
-              SELECT object_id, permission, required_perms.column1 AS pattern
-                FROM access_control_entries
-                JOIN user_principals
-                  ON (principal = user_principals.column1)
-                JOIN required_perms
-                  ON (permission = required_perms.column2)
+            query = self._format_accessible_objects(
+                principals, bound_permissions, with_children, placeholders
             )
-            SELECT object_id, permission
-              FROM potential_objects
-             WHERE {object_id_condition};
-            """
 
         with self.client.connect(readonly=True) as conn:
             result = conn.execute(query, placeholders)
@@ -321,10 +331,67 @@ class Permission(PermissionBase, MigratorMixin):
             perms_by_id.setdefault(r["object_id"], set()).add(r["permission"])
         return perms_by_id
 
+    def has_accessible_objects(self, principals, bound_permissions, with_children=True):
+        self._flush_deferred_of()
+        if len(bound_permissions) == 0:
+            return False
+
+        placeholders = {}
+        accessible_objects = self._format_accessible_objects(
+            principals, bound_permissions, with_children, placeholders
+        )
+        query = f"SELECT EXISTS ({accessible_objects}) AS accessible;"
+
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            return result.fetchone()["accessible"]
+
+    def _format_accessible_objects(self, principals, bound_permissions, with_children, holders):
+        """Format the query of the objects matching the `bound_permissions`
+        on which the `principals` have some permissions, and fill `holders`
+        with its placeholders values.
+        """
+        principals_values = []
+        for i, principal in enumerate(principals):
+            holders[f"principal_{i}"] = principal
+            principals_values.append(f"(:principal_{i})")
+
+        perm_values = []
+        for i, (obj, perm) in enumerate(bound_permissions):
+            holders[f"obj_{i}"] = obj.replace("*", "%")
+            holders[f"perm_{i}"] = perm
+            perm_values.append("(:obj_{0}, :perm_{0})".format(i))
+
+        if with_children:
+            object_id_condition = "object_id LIKE pattern"
+        else:
+            object_id_condition = "object_id LIKE pattern AND object_id NOT LIKE pattern || '/%'"
+        return f"""
+        WITH required_perms AS (
+          VALUES {','.join(perm_values)}
+        ),
+        user_principals AS (
+          VALUES {','.join(principals_values)}
+        ),
+        potential_objects AS (
+          SELECT object_id, permission, required_perms.column1 AS pattern
+            FROM access_control_entries
+            JOIN user_principals
+              ON (principal = user_principals.column1)
+            JOIN required_perms
+              ON (permission = required_perms.column2)
+        )
+        SELECT object_id, permission
+          FROM potential_objects
+         WHERE {object_id_condition}
+        """
+
     def check_permission(self, principals, bound_permissions):
         if not bound_permissions:
             return False
 
+        self._flush_deferred_of(obj for obj, _ in bound_permissions)
+
         placeholders = {}
         perms_values = []
         for i, (obj, perm) in enumerate(bound_permissions):
@@ -359,7 +426,38 @@ class Permission(PermissionBase, MigratorMixin):
             total = result.fetchone()
         return total["matched"] > 0
 
+    def check_permissions(self, principals, bound_permissions_list):
+        self._flush_deferred_of(obj for perms in bound_permissions_list for obj, _ in perms)
+        principals = tuple(principals)
+        placeholders = {"principals": principals}
+        perms_values = []
+        for i, bound_permissions in enumerate(bound_permissions_list):
+            for (obj, perm) in bound_permissions:
+                j = len(perms_values)
+                placeholders[f"obj_{j}"] = obj
+                placeholders[f"perm_{j}"] = perm
+                perms_values.append(f"({i}, :obj_{j}, :perm_{j})")
+
+        if not perms_values or not principals:
+            return [False] * len(bound_permissions_list)
+
+        # Return the position of every list of bound permissions with a match.
+        query = f"""
+        WITH required_perms AS (
+          VALUES {','.join(perms_values)}
+        )
+        SELECT DISTINCT column1 AS position
+          FROM required_perms JOIN access_control_entries
+            ON (object_id = column2 AND permission = column3)
+         WHERE principal IN :principals;
+        """
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            allowed = set(r["position"] for r in result.fetchall())
+        return [i in allowed for i in range(len(bound_permissions_list))]
+
     def get_objects_permissions(self, objects_ids, permissions=None):
+        self._flush_deferred_of(objects_ids)
         object_ids_values = []
         placeholders = {}
         for i, obj_id in enumerate(objects_ids):
@@ -401,6 +499,8 @@ class Permission(PermissionBase, MigratorMixin):
         return list(groupby_id.values())
 
     def replace_object_permissions(self, object_id, permissions):
+        self.writes_count += 1
+        self._flush_deferred_of([object_id])
         if not permissions:
             return
 
@@ -452,7 +552,105 @@ class Permission(PermissionBase, MigratorMixin):
         with self.client.connect() as conn:
             conn.execute(query, placeholders)
 
+    def replace_objects_permissions(self, objects_permissions):
+        self.writes_count += 1
+        self._flush_deferred_of(objects_permissions.keys())
+        placeholders = {}
+        new_aces = []
+        specified_perms = []
+        for i, (object_id, permissions) in enumerate(objects_permissions.items()):
+            placeholders[f"object_id_{i}"] = object_id
+            for perm, principals in permissions.items():
+                j = len(specified_perms)
+                placeholders[f"perm_{j}"] = perm
+                specified_perms.append(f"(:object_id_{i}, :perm_{j})")
+                for principal in set(principals):
+                    k = len(new_aces)
+                    placeholders[f"principal_{k}"] = principal
+                    new_aces.append(f"(:object_id_{i}, :perm_{j}, :principal_{k})")
+
+        if not specified_perms:
+            return
+
+        if not new_aces:
+            query = f"""
+            WITH specified_perms AS (
+              VALUES {','.join(specified_perms)}
+            )
+            DELETE FROM access_control_entries
+             USING specified_perms
+             WHERE object_id = column1 AND permission = column2
+            """
+
+        else:
+            # The insertion depends on the deletion, in order to run after it.
+            query = f"""
+            WITH specified_perms AS (
+              VALUES {','.join(specified_perms)}
+            ),
+            delete_specified AS (
+              DELETE FROM access_control_entries
+               USING specified_perms
+               WHERE object_id = column1 AND permission = column2
+               RETURNING object_id
+            ),
+            deleted AS (
+              SELECT COUNT(*) FROM delete_specified
+            ),
+            new_aces AS (
+              VALUES {','.join(new_aces)}
+            )
+            INSERT INTO access_control_entries(object_id, permission, principal)
+              SELECT n.column1, n.column2, n.column3
+                FROM new_aces AS n, deleted;
+            """
+
+        with self.client.connect() as conn:
+            conn.execute(query, placeholders)
+
+    def defer_objects_permissions(self, objects_permissions):
+        self.writes_count += 1
+        if self.client.commit_manually:
+            # Without transaction, nothing would write them eventually.
+            return self.replace_objects_permissions(objects_permissions)
+
+        deferred = self._get_deferred()
+        if not deferred:
+            deferred = {}
+            self._set_deferred(deferred)
+            transaction.get().addBeforeCommitHook(self._flush_deferred)
+        for object_id, permissions in objects_permissions.items():
+            deferred.setdefault(object_id, {}).update(permissions)
+
+    def _get_deferred(self):
+        """Return the permissions deferred in the current transaction."""
+        try:
+            return transaction.get().data(self)
+        except KeyError:
+            return None
+
+    def _set_deferred(self, deferred):
+        transaction.get().set_data(self, deferred)
+
+    def _flush_deferred_of(self, objects_ids=None):
+        """Write the deferred permissions of the current transaction if some
+        of them are about `objects_ids` (or about any object if ``None``),
+        before they are read or written.
+        """
+        deferred = self._get_deferred()
+        if deferred and (objects_ids is None or not deferred.keys().isdisjoint(objects_ids)):
+            self._flush_deferred()
+
+    def _flush_deferred(self):
+        """Write the permissions deferred in the current transaction at once."""
+        deferred = self._get_deferred()
+        if deferred:
+            self._set_deferred({})
+            self.replace_objects_permissions(deferred)
+
     def delete_object_permissions(self, *object_id_list):
+        self.writes_count += 1
+        self._flush_deferred_of()
         if len(object_id_list) == 0:
             return
 
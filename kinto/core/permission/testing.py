@@ -141,6 +141,22 @@ class PermissionTest:
         retrieved = self.permission.get_user_principals(user_id2)
         self.assertEqual(retrieved, {principal2})
 
+    def test_can_add_a_principal_to_several_users(self):
+        self.permission.add_user_principal("foo1", "bar")
+        self.permission.add_user_principals(["foo1", "foo2", "foo2"], "bar")
+        self.permission.add_user_principals([], "bar")
+        self.assertEqual(self.permission.get_user_principals("foo1"), {"bar"})
+        self.assertEqual(self.permission.get_user_principals("foo2"), {"bar"})
+
+    def test_can_remove_a_principal_from_several_users(self):
+        self.permission.add_user_principals(["foo1", "foo2", "foo3"], "bar")
+        self.permission.add_user_principal("foo1", "foobar")
+        self.permission.remove_user_principals(["foo1", "foo2", "unknown"], "bar")
+        self.permission.remove_user_principals([], "bar")
+        self.assertEqual(self.permission.get_user_principals("foo1"), {"foobar"})
+        self.assertEqual(self.permission.get_user_principals("foo2"), set())
+        self.assertEqual(self.permission.get_user_principals("foo3"), {"bar"})
+
     def test_authenticated_is_returned_for_everybody(self):
         user_id = "foo"
         principal = "bar"
@@ -244,6 +260,32 @@ class PermissionTest:
         check_permission = self.permission.check_permission({principal}, [(object_id, permission)])
         self.assertFalse(check_permission)
 
+    #
+    # check_permissions()
+    #
+
+    def test_check_permissions_returns_a_result_per_list_of_permissions(self):
+        self.permission.add_principal_to_ace("/url/a", "write", "user1")
+        self.permission.add_principal_to_ace("/url/b", "read", "group1")
+        self.permission.add_principal_to_ace("/url/c", "write", "user2")
+        results = self.permission.check_permissions(
+            {"user1", "group1"},
+            [
+                [("/url/a", "read"), ("/url/a", "write")],
+                [("/url/b", "read")],
+                [("/url/b", "write"), ("/url/c", "write")],
+                [("/url/d", "read")],
+                [],
+            ],
+        )
+        self.assertEqual(results, [True, True, False, False, False])
+
+    def test_check_permissions_handles_empty_lists(self):
+        self.permission.add_principal_to_ace("/url/a", "write", "user1")
+        self.assertEqual(self.permission.check_permissions({"user1"}, []), [])
+        results = self.permission.check_permissions(set(), [[("/url/a", "write")]])
+        self.assertEqual(results, [False])
+
     #
     # get_authorized_principals()
     #
@@ -334,6 +376,31 @@ class PermissionTest:
         )
         self.assertEqual(sorted(per_object_ids.keys()), ["/url/a", "/url/a/id/1", "/url/a/id/2"])
 
+    #
+    # has_accessible_objects()
+    #
+
+    def test_has_accessible_objects(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1/sub/1", "read", "user2")
+        bound_permissions = [("/url/a/id/*", "read"), ("/url/a/id/*", "write")]
+        self.assertTrue(self.permission.has_accessible_objects(["user1"], bound_permissions))
+        self.assertFalse(self.permission.has_accessible_objects(["user3"], bound_permissions))
+
+    def test_has_accessible_objects_without_children(self):
+        self.permission.add_principal_to_ace("/url/a/id/1/sub/1", "read", "user2")
+        bound_permissions = [("/url/a/id/*", "read")]
+        self.assertTrue(self.permission.has_accessible_objects(["user2"], bound_permissions))
+        self.assertFalse(
+            self.permission.has_accessible_objects(
+                ["user2"], bound_permissions, with_children=False
+            )
+        )
+
+    def test_has_accessible_objects_supports_empty_list(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.assertFalse(self.permission.has_accessible_objects(["user1"], []))
+
     #
     # get_object_permissions()
     #
@@ -370,6 +437,19 @@ class PermissionTest:
     def test_object_permissions_return_empty_dict(self):
         self.assertDictEqual(self.permission.get_object_permissions("abc"), {})
 
+    def test_writes_are_counted(self):
+        before = self.permission.writes_count
+        self.permission.add_user_principal("user1", "group1")
+        self.permission.replace_object_permissions("/url/a/id/1", {"write": ["user1"]})
+        self.permission.delete_object_permissions("/url/a/id/1")
+        self.assertEqual(self.permission.writes_count, before + 3)
+
+    def test_reads_are_not_counted(self):
+        before = self.permission.writes_count
+        self.permission.get_user_principals("user1")
+        self.permission.check_permission(["user1"], [("/url/a/id/1", "write")])
+        self.assertEqual(self.permission.writes_count, before)
+
     def test_replace_object_permission_replace_all_given_sets(self):
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
@@ -438,6 +518,65 @@ class PermissionTest:
         permissions = self.permission.get_object_permissions("/url/a/id/1")
         self.assertEqual(len(permissions), 0)
 
+    def test_replace_objects_permissions_replace_the_given_sets_of_each_object(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.add_principal_to_ace("/url/a/id/1", "read", "user3")
+        self.permission.add_principal_to_ace("/url/a/id/2", "write", "user2")
+
+        self.permission.replace_objects_permissions(
+            {
+                "/url/a/id/1": {"write": ["user2"]},
+                "/url/a/id/2": {"write": [], "read": ["user1", "user1"]},
+                "/url/a/id/3": {"write": ["user3"]},
+                "/url/a/id/4": {},
+            }
+        )
+
+        permissions = self.permission.get_objects_permissions(
+            ["/url/a/id/1", "/url/a/id/2", "/url/a/id/3", "/url/a/id/4"]
+        )
+        self.assertEqual(
+            permissions,
+            [
+                {"write": {"user2"}, "read": {"user3"}},
+                {"read": {"user1"}},
+                {"write": {"user3"}},
+                {},
+            ],
+        )
+
+    def test_replace_objects_permissions_supports_empty_input(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
+        self.permission.replace_objects_permissions({})
+        permissions = self.permission.get_object_permissions("/url/a/id/1")
+        self.assertDictEqual(permissions, {"write": {"user1"}})
+
+    def test_deferred_permissions_are_taken_into_account_by_reads(self):
+        self.permission.add_principal_to_ace("/url/a/id/1", "read", "user3")
+        self.permission.defer_objects_permissions({"/url/a/id/1": {"write": ["user1"]}})
+        self.permission.defer_objects_permissions({"/url/a/id/2": {"write": ["user2"]}})
+
+        self.assertDictEqual(
+            self.permission.get_object_permissions("/url/a/id/1"),
+            {"write": {"user1"}, "read": {"user3"}},
+        )
+        self.assertTrue(self.permission.check_permission({"user2"}, [("/url/a/id/2", "write")]))
+        self.assertEqual(
+            self.permission.get_accessible_objects(["user1", "user2"], [("/url/a/id/*", "write")]),
+            {"/url/a/id/1": {"write"}, "/url/a/id/2": {"write"}},
+        )
+
+    def test_deferred_permissions_are_taken_into_account_by_writes(self):
+        self.permission.defer_objects_permissions({"/url/a/id/1": {"write": ["user1"]}})
+        self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
+        self.permission.defer_objects_permissions({"/url/a/id/2": {"write": ["user2"]}})
+        self.permission.delete_object_permissions("/url/a/id/2")
+
+        self.assertEqual(
+            self.permission.get_objects_permissions(["/url/a/id/1", "/url/a/id/2"]),
+            [{"write": {"user1", "user2"}}, {}],
+        )
+
     def test_delete_object_permissions_remove_all_given_objects_acls(self):
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user1")
         self.permission.add_principal_to_ace("/url/a/id/1", "write", "user2")
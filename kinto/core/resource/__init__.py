@@ -320,7 +320,9 @@ class UserResource:
         )
 
         offset = offset + len(records)
-        if limit and len(records) == limit and offset < total_records:
+        # If the storage backend does not count records, assume there is more.
+        has_more = total_records is None or offset < total_records
+        if limit and len(records) == limit and has_more:
             lastrecord = records[-1]
             next_page = self._next_page_url(sorting, limit, lastrecord, offset)
             headers["Next-Page"] = next_page
@@ -328,7 +330,8 @@ class UserResource:
         if partial_fields:
             records = [dict_subset(record, partial_fields) for record in records]
 
-        headers["Total-Records"] = str(total_records)
+        if total_records is not None:
+            headers["Total-Records"] = str(total_records)
 
         return self.postprocess(records)
 
@@ -408,14 +411,16 @@ class UserResource:
             self._add_timestamp_header(self.request.response, timestamp=timestamp)
 
             # Add pagination header
-            if limit and len(deleted) == limit and total_records > 1:
+            has_more = total_records is None or total_records > 1
+            if limit and len(deleted) == limit and has_more:
                 next_page = self._next_page_url(sorting, limit, lastrecord, offset)
                 self.request.response.headers["Next-Page"] = next_page
         else:
             self._add_timestamp_header(self.request.response)
 
-        headers = self.request.response.headers
-        headers["Total-Records"] = str(total_records)
+        if total_records is not None:
+            headers = self.request.response.headers
+            headers["Total-Records"] = str(total_records)
 
         action = len(deleted) > 0 and ACTIONS.DELETE or ACTIONS.READ
         return self.postprocess(deleted, action=action, old=records)
@@ -1193,6 +1198,7 @@ class ShareableResource(UserResource):
         """
         filters = super()._extract_filters()
 
+        # Either a list of ids or a :class:`kinto.core.storage.AccessibleBy`.
         ids = self.context.shared_ids
         if ids is not None:
             filter_by_id = Filter(self.model.id_field, ids, COMPARISON.IN)
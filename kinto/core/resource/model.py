@@ -285,13 +285,19 @@ class ShareableModel(Model):
         self.current_principal = None
         self.prefixed_principals = None
 
-    def _allow_write(self, perm_object_id):
+    def _allow_write(self, permissions, current=None):
         """Helper to give the ``write`` permission to the current user.
         """
-        self.permission.add_principal_to_ace(perm_object_id, "write", self.current_principal)
+        writers = set(permissions.get("write", (current or {}).get("write", [])))
+        writers.add(self.current_principal)
+        return {**permissions, "write": writers}
 
-    def _annotate(self, record, perm_object_id):
-        permissions = self.permission.get_object_permissions(perm_object_id)
+    def _annotate(self, record, perm_object_id, permissions=None):
+        if permissions is None:
+            permissions = self.permission.get_object_permissions(perm_object_id)
+        else:
+            # Permissions are known already, keep the non-empty ones.
+            permissions = {perm: set(p) for perm, p in permissions.items() if len(p) > 0}
         # Permissions are not returned if user only has read permission.
         writers = permissions.get("write", [])
         principals = self.prefixed_principals + [self.current_principal]
@@ -332,10 +338,11 @@ class ShareableModel(Model):
         record = super().create_record(record, parent_id)
         record_id = record[self.id_field]
         perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
+        permissions = self._allow_write(permissions)
+        # The ACEs of the records of a batch are written at once on commit.
+        self.permission.defer_objects_permissions({perm_object_id: permissions})
 
-        return self._annotate(record, perm_object_id)
+        return self._annotate(record, perm_object_id, permissions)
 
     def update_record(self, record, parent_id=None):
         """Update record and the specified permissions.
@@ -349,10 +356,12 @@ class ShareableModel(Model):
         record = super().update_record(record, parent_id)
         record_id = record[self.id_field]
         perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
+        current = self.permission.get_object_permissions(perm_object_id)
+        permissions = self._allow_write(permissions, current)
+        # The ACEs of the records of a batch are written at once on commit.
+        self.permission.defer_objects_permissions({perm_object_id: permissions})
 
-        return self._annotate(record, perm_object_id)
+        return self._annotate(record, perm_object_id, {**current, **permissions})
 
     def delete_record(self, record_id, parent_id=None, last_modified=None):
         """Delete record and its associated permissions.
@@ -6,6 +6,7 @@ import logging
 import transaction as current_transaction
 from pyramid.settings import asbool
 
+from kinto.core import utils
 from kinto.core.storage import exceptions as storage_exceptions
 from kinto.plugins.quotas import scripts as quotas
 
@@ -115,3 +116,74 @@ def rebuild_quotas(env, dry_run=False):
     quotas.rebuild_quotas(registry.storage, dry_run=dry_run)
     current_transaction.commit()
     return 0
+
+
+def indexes(env, create=False, drop=False, limit=10, dry_run=False):
+    """Administrative command to manage the expression indexes of the JSON
+    fields most used in listings filters and sorting.
+
+    Fields usage is counted by the PostgreSQL storage backend when the
+    ``storage_index_advisor`` setting is enabled.
+    """
+    registry = env["registry"]
+    settings = registry.settings
+    readonly_mode = asbool(settings.get("readonly", False))
+
+    if readonly_mode and (create or drop):
+        message = "Cannot manage indexes while in readonly mode."
+        logger.error(message)
+        return 51
+
+    storage = registry.storage
+    if not hasattr(storage, "get_fields_stats"):
+        message = "Indexes can only be managed with the PostgreSQL storage backend."
+        logger.error(message)
+        return 52
+
+    if create:
+        for name in storage.create_fields_indexes(limit=limit, dry_run=dry_run):
+            logger.info(f"Index {name} created.")
+    elif drop:
+        for name in storage.drop_fields_indexes(dry_run=dry_run):
+            logger.info(f"Index {name} dropped.")
+    else:
+        for stat in storage.get_fields_stats(limit=limit):
+            index = stat["index"] or "not indexed"
+            logger.info(
+                f"{stat['parent_id']}/{stat['collection_id']} {stat['field']}: "
+                f"{stat['hits']} hits ({index})"
+            )
+    return 0
+
+
+def purge_tombstones(env, older_than, batch_size=1000):
+    """Administrative command to delete the tombstones older than the
+    specified number of days.
+
+    Tombstones are deleted by chunks of ``batch_size``, each in its own
+    transaction, in order to keep locks and transactions short on large
+    databases.
+    """
+    registry = env["registry"]
+    settings = registry.settings
+    readonly_mode = asbool(settings.get("readonly", False))
+
+    if readonly_mode:
+        message = "Cannot purge tombstones while in readonly mode."
+        logger.error(message)
+        return 61
+
+    before = utils.msec_time() - older_than * 24 * 3600 * 1000
+    total = 0
+    while True:
+        deleted = registry.storage.purge_deleted(
+            collection_id=None, parent_id="*", before=before, limit=batch_size
+        )
+        current_transaction.commit()
+        total += deleted
+        logger.debug(f"{deleted} tombstone(s) purged.")
+        if deleted < batch_size:
+            break
+
+    logger.info(f"{total} tombstone(s) older than {older_than} day(s) were purged.")
+    return 0
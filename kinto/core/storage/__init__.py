@@ -30,10 +30,23 @@ Filter = namedtuple("Filter", ["field", "value", "operator"])
 Sort = namedtuple("Sort", ["field", "direction"])
 """Sorting properties."""
 
+AccessibleBy = namedtuple("AccessibleBy", ["principals", "bound_permissions"])
+"""Value of a ``IN`` filter on the id field, that matches the records on which
+the principals have one of the bound permissions. The ``*`` of the object ids
+patterns stands for the record id (see :meth:`StorageBase.supports_accessible_by`).
+"""
+
 DEFAULT_ID_FIELD = "id"
 DEFAULT_MODIFIED_FIELD = "last_modified"
 DEFAULT_DELETED_FIELD = "deleted"
 
+COUNT_EXACT = "exact"
+"""Count the records matching the filters."""
+COUNT_ESTIMATED = "estimated"
+"""Count the records of the whole collection, ignoring filters."""
+COUNT_DISABLED = "disabled"
+"""Do not count records."""
+
 _HEARTBEAT_DELETE_RATE = 0.6
 _HEARTBEAT_COLLECTION_ID = "__heartbeat__"
 _HEART_PARENT_ID = _HEARTBEAT_COLLECTION_ID
@@ -78,6 +91,17 @@ class StorageBase:
         """
         raise NotImplementedError
 
+    def supports_accessible_by(self, permission_backend):
+        """Return whether the filters with :class:`AccessibleBy` values can be
+        evaluated against the Access Control Entries of `permission_backend`.
+
+        If not, the ids of the accessible records have to be filtered with
+        an ``IN`` list instead.
+
+        :rtype: bool
+        """
+        return False
+
     def collection_timestamp(self, collection_id, parent_id, auth=None):
         """Get the highest timestamp of every objects in this `collection_id` for
         this `parent_id`.
@@ -176,6 +200,45 @@ class StorageBase:
         """
         raise NotImplementedError
 
+    def update_many(
+        self,
+        collection_id,
+        parent_id,
+        records,
+        id_field=DEFAULT_ID_FIELD,
+        modified_field=DEFAULT_MODIFIED_FIELD,
+        auth=None,
+    ):
+        """Overwrite (or create) every object of the specified list, using
+        their `id_field` attribute as object id.
+
+        Backends can override this method in order to write all objects in a
+        single operation. By default, it calls :meth:`update` for each of them.
+
+        .. note::
+
+            This will update the collection timestamp.
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+        :param list records: the objects to update or create.
+
+        :returns: the updated objects, in the same order.
+        :rtype: list
+        """
+        return [
+            self.update(
+                collection_id,
+                parent_id,
+                record[id_field],
+                record,
+                id_field=id_field,
+                modified_field=modified_field,
+                auth=auth,
+            )
+            for record in records
+        ]
+
     def delete(
         self,
         collection_id,
@@ -264,6 +327,8 @@ class StorageBase:
         id_field=DEFAULT_ID_FIELD,
         modified_field=DEFAULT_MODIFIED_FIELD,
         auth=None,
+        limit=None,
+        with_live=False,
     ):
         """Delete all deleted object tombstones in this `collection_id`
         for this `parent_id`.
@@ -272,6 +337,10 @@ class StorageBase:
         :param str parent_id: the collection parent.
 
         :param int before: Optionnal timestamp to limit deletion (exclusive)
+        :param int limit: Optional maximum number of tombstones to delete, in
+            order to purge large collections by chunks.
+        :param bool with_live: Delete the live objects too (e.g. when their
+            parent was deleted).
 
         :returns: The number of deleted objects.
         :rtype: int
@@ -328,7 +397,8 @@ class StorageBase:
             that match the filters.
 
         :returns: the limited list of objects, and the total number of
-            matching objects in the collection (deleted ones excluded).
+            matching objects in the collection (deleted ones excluded), or
+            ``None`` if the backend was configured not to count them.
         :rtype: tuple
         """
         raise NotImplementedError
@@ -13,6 +13,9 @@ from kinto.core.storage import (
     DEFAULT_MODIFIED_FIELD,
     DEFAULT_DELETED_FIELD,
     MISSING,
+    COUNT_EXACT,
+    COUNT_ESTIMATED,
+    COUNT_DISABLED,
 )
 from kinto.core.utils import COMPARISON, find_nested_value
 
@@ -142,11 +145,16 @@ class Storage(MemoryBasedStorage):
     ujson, see #1238)::
 
         kinto.storage_strict_json = true
+
+    Counting of records in listings can be disabled::
+
+        kinto.storage_count_mode = disabled
     """
 
-    def __init__(self, *args, readonly=False, **kwargs):
+    def __init__(self, *args, readonly=False, count_mode=COUNT_EXACT, **kwargs):
         super().__init__(*args, **kwargs)
         self.readonly = readonly
+        self.count_mode = count_mode
         self.flush()
 
     def flush(self, auth=None):
@@ -243,6 +251,26 @@ class Storage(MemoryBasedStorage):
         self._cemetery[parent_id][collection_id].pop(object_id, None)
         return record
 
+    @synchronized
+    def update_many(
+        self,
+        collection_id,
+        parent_id,
+        records,
+        id_field=DEFAULT_ID_FIELD,
+        modified_field=DEFAULT_MODIFIED_FIELD,
+        auth=None,
+    ):
+        # Write all records while holding the lock.
+        return super().update_many(
+            collection_id,
+            parent_id,
+            records,
+            id_field=id_field,
+            modified_field=modified_field,
+            auth=auth,
+        )
+
     @synchronized
     def delete(
         self,
@@ -285,28 +313,30 @@ class Storage(MemoryBasedStorage):
         id_field=DEFAULT_ID_FIELD,
         modified_field=DEFAULT_MODIFIED_FIELD,
         auth=None,
+        limit=None,
+        with_live=False,
     ):
-        parent_id_match = re.compile(parent_id.replace("*", ".*"))
-        by_parent_id = {
-            pid: collections
-            for pid, collections in self._cemetery.items()
-            if parent_id_match.match(pid)
-        }
+        parent_id_match = re.compile(f"^{parent_id.replace('*', '.*')}$")
+        stores = [self._cemetery, self._store] if with_live else [self._cemetery]
         num_deleted = 0
-        for pid, collections in by_parent_id.items():
-            if collection_id is not None:
-                collections = {collection_id: collections[collection_id]}
-            for collection, colrecords in collections.items():
-                if before is None:
+        for store in stores:
+            by_parent_id = {
+                pid: collections
+                for pid, collections in store.items()
+                if parent_id_match.match(pid)
+            }
+            for pid, collections in by_parent_id.items():
+                if collection_id is not None:
+                    collections = {collection_id: collections[collection_id]}
+                for collection, colrecords in collections.items():
                     kept = {}
-                else:
-                    kept = {
-                        key: value
-                        for key, value in colrecords.items()
-                        if value[modified_field] >= before
-                    }
-                self._cemetery[pid][collection] = kept
-                num_deleted += len(colrecords) - len(kept)
+                    for key, value in colrecords.items():
+                        expired = before is None or value[modified_field] < before
+                        if expired and (limit is None or num_deleted < limit):
+                            num_deleted += 1
+                        else:
+                            kept[key] = value
+                    store[pid][collection] = kept
         return num_deleted
 
     @synchronized
@@ -347,6 +377,8 @@ class Storage(MemoryBasedStorage):
             pagination_rules=pagination_rules,
             limit=limit,
         )
+        if self.count_mode == COUNT_DISABLED:
+            count = None
         return records, count
 
     @synchronized
@@ -575,4 +607,7 @@ def _get_objects_by_parent_id(store, parent_id, collection_id, with_meta=False):
 def load_from_config(config):
     settings = {**config.get_settings()}
     strict = settings.get("storage_strict_json", False)
-    return Storage(strict_json=strict)
+    count_mode = settings.get("storage_count_mode", COUNT_EXACT)
+    if count_mode not in (COUNT_EXACT, COUNT_ESTIMATED, COUNT_DISABLED):
+        raise ValueError(f"Unknown storage count mode {count_mode!r}")
+    return Storage(strict_json=strict, count_mode=count_mode)
@@ -1,7 +1,11 @@
+import hashlib
 import logging
 import os
+import threading
 import warnings
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+from pyramid.settings import asbool
 
 from kinto.core.storage import (
     StorageBase,
@@ -10,10 +14,15 @@ from kinto.core.storage import (
     DEFAULT_MODIFIED_FIELD,
     DEFAULT_DELETED_FIELD,
     MISSING,
+    AccessibleBy,
+    Filter,
+    COUNT_EXACT,
+    COUNT_ESTIMATED,
+    COUNT_DISABLED,
 )
-from kinto.core.storage.postgresql.client import create_from_config
+from kinto.core.storage.postgresql.client import PreparedStatements, create_from_config
 from kinto.core.storage.postgresql.migrator import MigratorMixin
-from kinto.core.utils import COMPARISON
+from kinto.core.utils import COMPARISON, sqlalchemy
 
 
 logger = logging.getLogger(__name__)
@@ -73,19 +82,57 @@ class Storage(StorageBase, MigratorMixin):
         recommended to allow load balancing, replication or limit the number
         of connections used in a multi-process deployment.
 
+    The total number of records returned by listings is read from a counters
+    table maintained by triggers when no filter applies, and counted otherwise.
+    This can be changed to always use the counters table (i.e. ignore filters),
+    or to not count at all::
+
+        kinto.storage_count_mode = exact  # or estimated, disabled
+
+    The JSON fields used in listings filters and sorting can be counted per
+    collection, in order to create expression indexes for the most used ones
+    with the ``kinto indexes`` command::
+
+        kinto.storage_index_advisor = true
+
+    The queries of listings and deletions can be run as server-side prepared
+    statements, keyed by the shape of their filters, sorting and pagination,
+    so that PostgreSQL plans each shape once per connection. The number of
+    statements kept on each connection is set with (``0`` disables them)::
+
+        kinto.storage_statement_cache_size = 128
+
     """  # NOQA
 
     # MigratorMixin attributes.
     name = "storage"
-    schema_version = 20
+    schema_version = 24
     schema_file = os.path.join(HERE, "schema.sql")
     migrations_directory = os.path.join(HERE, "migrations")
 
-    def __init__(self, client, max_fetch_size, *args, readonly=False, **kwargs):
+    fields_stats_flush_size = 100
+    """Number of counted fields kept in memory before being written."""
+
+    def __init__(
+        self,
+        client,
+        max_fetch_size,
+        *args,
+        readonly=False,
+        count_mode=COUNT_EXACT,
+        index_advisor=False,
+        statement_cache_size=0,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         self.client = client
         self._max_fetch_size = max_fetch_size
         self.readonly = readonly
+        self.count_mode = count_mode
+        self.index_advisor = index_advisor
+        self.statements = PreparedStatements(statement_cache_size)
+        self._fields_stats = Counter()
+        self._fields_stats_lock = threading.Lock()
 
     def create_schema(self, dry_run=False):
         """Override create_schema to ensure DB encoding and TZ are OK.
@@ -185,65 +232,53 @@ class Storage(StorageBase, MigratorMixin):
         query = """
         DELETE FROM records;
         DELETE FROM timestamps;
+        DELETE FROM counters;
+        DELETE FROM fields_stats;
         """
         with self.client.connect(force_commit=True) as conn:
             conn.execute(query)
         logger.debug("Flushed PostgreSQL storage tables")
 
+    def supports_accessible_by(self, permission_backend):
+        # Clients are shared by database URL: the Access Control Entries table
+        # can be joined if the permission backend uses the same client.
+        return getattr(permission_backend, "client", None) is self.client
+
     def collection_timestamp(self, collection_id, parent_id, auth=None):
         query_existing = """
-        WITH existing_timestamps AS (
-          -- Timestamp of latest record.
-          (
-            SELECT last_modified, as_epoch(last_modified) AS last_epoch
-            FROM records
-            WHERE parent_id = :parent_id
-              AND collection_id = :collection_id
-            ORDER BY last_modified DESC
-            LIMIT 1
-          )
-          -- Timestamp of empty collection.
-          UNION
-          (
-            SELECT last_modified, as_epoch(last_modified) AS last_epoch
-            FROM timestamps
-            WHERE parent_id = :parent_id
-              AND collection_id = :collection_id
-          )
-        )
-        SELECT MAX(last_modified) AS last_modified, MAX(last_epoch) AS last_epoch
-          FROM existing_timestamps
+        SELECT last_modified
+          FROM timestamps
+         WHERE parent_id = :parent_id
+           AND collection_id = :collection_id;
         """
 
         create_if_missing = """
         INSERT INTO timestamps (parent_id, collection_id, last_modified)
-        VALUES (:parent_id, :collection_id, COALESCE(:last_modified, clock_timestamp()::timestamp))
-        ON CONFLICT (parent_id, collection_id) DO NOTHING
-        RETURNING as_epoch(last_modified) AS last_epoch
+        VALUES (
+            :parent_id,
+            :collection_id,
+            (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT
+        )
+        ON CONFLICT (parent_id, collection_id) DO UPDATE
+        SET last_modified = timestamps.last_modified
+        RETURNING last_modified;
         """
 
         placeholders = dict(parent_id=parent_id, collection_id=collection_id)
-        with self.client.connect(readonly=False) as conn:
-            existing_ts = None
-            ts_result = conn.execute(query_existing, placeholders)
-            row = ts_result.fetchone()  # Will return (None, None) when empty.
-            existing_ts = row["last_modified"]
+        with self.client.connect(readonly=True) as conn:
+            record = conn.execute(query_existing, placeholders).fetchone()
 
+        if record is None:
             # If the backend is readonly, we should not try to create the timestamp.
             if self.readonly:
-                if existing_ts is None:
-                    error_msg = (
-                        "Cannot initialize empty collection timestamp " "when running in readonly."
-                    )
-                    raise exceptions.BackendError(message=error_msg)
-                record = row
-            else:
-                create_result = conn.execute(
-                    create_if_missing, dict(last_modified=existing_ts, **placeholders)
+                error_msg = (
+                    "Cannot initialize empty collection timestamp " "when running in readonly."
                 )
-                record = create_result.fetchone() or row
+                raise exceptions.BackendError(message=error_msg)
+            with self.client.connect() as conn:
+                record = conn.execute(create_if_missing, placeholders).fetchone()
 
-        return record["last_epoch"]
+        return record["last_modified"]
 
     def create(
         self,
@@ -290,19 +325,19 @@ class Storage(StorageBase, MigratorMixin):
             INSERT INTO records (id, parent_id, collection_id, data, last_modified, deleted)
             VALUES (:object_id, :parent_id,
                     :collection_id, (:data)::JSONB,
-                    from_epoch(:last_modified),
+                    :last_modified,
                     FALSE)
             ON CONFLICT (id, parent_id, collection_id) DO UPDATE
-            SET last_modified = from_epoch(:last_modified),
+            SET last_modified = :last_modified,
                 data = (:data)::JSONB,
                 deleted = FALSE
             WHERE records.deleted = TRUE
             RETURNING id, data, last_modified
         )
-        SELECT id, data, as_epoch(last_modified) AS last_modified, TRUE AS inserted
+        SELECT id, data, last_modified, TRUE AS inserted
             FROM create_record
         UNION ALL
-        SELECT id, data, as_epoch(last_modified) AS last_modified, FALSE AS inserted FROM records
+        SELECT id, data, last_modified, FALSE AS inserted FROM records
         WHERE id = :object_id AND parent_id = :parent_id AND collection_id = :collection_id
         LIMIT 1;
         """
@@ -338,7 +373,7 @@ class Storage(StorageBase, MigratorMixin):
         auth=None,
     ):
         query = """
-        SELECT as_epoch(last_modified) AS last_modified, data
+        SELECT last_modified, data
           FROM records
          WHERE id = :object_id
            AND parent_id = :parent_id
@@ -378,14 +413,13 @@ class Storage(StorageBase, MigratorMixin):
         INSERT INTO records (id, parent_id, collection_id, data, last_modified, deleted)
         VALUES (:object_id, :parent_id,
                 :collection_id, (:data)::JSONB,
-                from_epoch(:last_modified),
+                :last_modified,
                 FALSE)
         ON CONFLICT (id, parent_id, collection_id) DO UPDATE
         SET data = (:data)::JSONB,
             deleted = FALSE,
-            last_modified = GREATEST(from_epoch(:last_modified),
-                                     EXCLUDED.last_modified)
-        RETURNING as_epoch(last_modified) AS last_modified;
+            last_modified = GREATEST(:last_modified, EXCLUDED.last_modified)
+        RETURNING last_modified;
         """
         placeholders = dict(
             object_id=object_id,
@@ -403,6 +437,62 @@ class Storage(StorageBase, MigratorMixin):
         record[modified_field] = updated["last_modified"]
         return record
 
+    def update_many(
+        self,
+        collection_id,
+        parent_id,
+        records,
+        id_field=DEFAULT_ID_FIELD,
+        modified_field=DEFAULT_MODIFIED_FIELD,
+        auth=None,
+    ):
+        query = """
+        INSERT INTO records (id, parent_id, collection_id, data, last_modified, deleted)
+        VALUES {values}
+        ON CONFLICT (id, parent_id, collection_id) DO UPDATE
+        SET data = EXCLUDED.data,
+            deleted = FALSE,
+            last_modified = EXCLUDED.last_modified
+        RETURNING id, last_modified;
+        """
+        # A single statement cannot affect the same row twice: split the list
+        # into runs without duplicate ids, written one after the other.
+        runs = []
+        run_ids = set()
+        for record in records:
+            if not runs or record[id_field] in run_ids:
+                runs.append([])
+                run_ids = set()
+            runs[-1].append(record)
+            run_ids.add(record[id_field])
+
+        updated = []
+        with self.client.connect() as conn:
+            for run in runs:
+                values = []
+                placeholders = dict(parent_id=parent_id, collection_id=collection_id)
+                for i, record in enumerate(run):
+                    # Remove redundancy in data field
+                    query_record = {**record}
+                    query_record.pop(id_field, None)
+                    query_record.pop(modified_field, None)
+
+                    values.append(
+                        f"(:object_id_{i}, :parent_id, :collection_id,"
+                        f" (:data_{i})::JSONB, :last_modified_{i}, FALSE)"
+                    )
+                    placeholders[f"object_id_{i}"] = record[id_field]
+                    placeholders[f"data_{i}"] = self.json.dumps(query_record)
+                    placeholders[f"last_modified_{i}"] = record.get(modified_field)
+
+                result = conn.execute(query.format(values=", ".join(values)), placeholders)
+                timestamps = {row["id"]: row["last_modified"] for row in result}
+                for record in run:
+                    record = {**record, modified_field: timestamps[record[id_field]]}
+                    updated.append(record)
+
+        return updated
+
     def delete(
         self,
         collection_id,
@@ -420,12 +510,12 @@ class Storage(StorageBase, MigratorMixin):
             UPDATE records
                SET deleted=TRUE,
                    data=(:deleted_data)::JSONB,
-                   last_modified=from_epoch(:last_modified)
+                   last_modified=:last_modified
              WHERE id = :object_id
                AND parent_id = :parent_id
                AND collection_id = :collection_id
                AND deleted = FALSE
-            RETURNING as_epoch(last_modified) AS last_modified;
+            RETURNING last_modified;
             """
         else:
             query = """
@@ -434,7 +524,7 @@ class Storage(StorageBase, MigratorMixin):
                AND parent_id = :parent_id
                AND collection_id = :collection_id
                AND deleted = FALSE
-            RETURNING as_epoch(last_modified) AS last_modified;
+            RETURNING last_modified;
             """
         deleted_data = self.json.dumps(dict([(deleted_field, True)]))
         placeholders = dict(
@@ -492,7 +582,7 @@ class Storage(StorageBase, MigratorMixin):
              WHERE records.id = matching_records.id
                AND records.parent_id = matching_records.parent_id
                AND records.collection_id = matching_records.collection_id
-            RETURNING records.id, as_epoch(last_modified) AS last_modified;
+            RETURNING records.id, last_modified;
             """
         else:
             query = """
@@ -514,7 +604,7 @@ class Storage(StorageBase, MigratorMixin):
             WHERE records.id = matching_records.id
               AND records.parent_id = matching_records.parent_id
               AND records.collection_id = matching_records.collection_id
-            RETURNING records.id, as_epoch(last_modified) AS last_modified;
+            RETURNING records.id, last_modified;
             """
 
         id_field = id_field or self.id_field
@@ -556,17 +646,15 @@ class Storage(StorageBase, MigratorMixin):
         limit = min(self._max_fetch_size, limit) if limit else self._max_fetch_size
         placeholders["pagination_limit"] = limit
 
-        with self.client.connect() as conn:
-            result = conn.execute(query.format_map(safeholders), placeholders)
-            deleted = result.fetchmany(self._max_fetch_size)
-
         records = []
-        for result in deleted:
-            record = {}
-            record[id_field] = result["id"]
-            record[modified_field] = result["last_modified"]
-            record[deleted_field] = True
-            records.append(record)
+        with self.client.connect() as conn:
+            result = self.statements.execute(conn, query.format_map(safeholders), placeholders)
+            for row in result:
+                record = {}
+                record[id_field] = row["id"]
+                record[modified_field] = row["last_modified"]
+                record[deleted_field] = True
+                records.append(record)
 
         return records
 
@@ -578,14 +666,31 @@ class Storage(StorageBase, MigratorMixin):
         id_field=DEFAULT_ID_FIELD,
         modified_field=DEFAULT_MODIFIED_FIELD,
         auth=None,
+        limit=None,
+        with_live=False,
     ):
         delete_tombstones = """
         DELETE
         FROM records
         WHERE {parent_id_filter}
               {collection_id_filter}
+              {conditions_deleted}
               {conditions_filter}
         """
+        # Delete by chunks, using the physical location of rows.
+        delete_tombstones_chunk = """
+        DELETE
+        FROM records
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid
+              FROM records
+             WHERE {parent_id_filter}
+                   {collection_id_filter}
+                   {conditions_deleted}
+                   {conditions_filter}
+             LIMIT :limit
+        ))
+        """
         id_field = id_field or self.id_field
         modified_field = modified_field or self.modified_field
         placeholders = dict(parent_id=parent_id, collection_id=collection_id)
@@ -603,16 +708,24 @@ class Storage(StorageBase, MigratorMixin):
         else:
             safeholders["collection_id_filter"] = "AND collection_id = :collection_id"  # NOQA
 
+        if not with_live:
+            safeholders["conditions_deleted"] = "AND deleted"
+
         if before is not None:
-            safeholders["conditions_filter"] = "AND as_epoch(last_modified) < :before"
+            safeholders["conditions_filter"] = "AND last_modified < :before"
             placeholders["before"] = before
 
+        if limit is not None:
+            delete_tombstones = delete_tombstones_chunk
+            placeholders["limit"] = limit
+
         with self.client.connect() as conn:
             result = conn.execute(delete_tombstones.format_map(safeholders), placeholders)
             deleted = result.rowcount
 
             # If purging everything from a parent_id, then clear timestamps.
-            if collection_id is None and before is None:
+            purged_all = limit is None or deleted < limit
+            if collection_id is None and before is None and purged_all:
                 delete_timestamps = """
                 DELETE
                 FROM timestamps
@@ -652,13 +765,37 @@ class Storage(StorageBase, MigratorMixin):
              WHERE NOT deleted
         )
          SELECT count_total,
-               a.id, as_epoch(a.last_modified) AS last_modified, a.data
+               a.id, a.last_modified, a.data
           FROM collection_filtered AS a,
                total_filtered
           {pagination_rules}
          LIMIT :pagination_limit;
         """
 
+        # Same query, without counting the filtered set. The total is either
+        # read from the counters table or omitted.
+        query_uncounted = """
+        SELECT {count_total} AS count_total,
+               id, last_modified, data
+          FROM records
+         WHERE {parent_id_filter}
+           AND collection_id = :collection_id
+           {conditions_deleted}
+           {conditions_filter}
+           {pagination_rules}
+         {sorting}
+         LIMIT :pagination_limit;
+        """
+
+        count_from_counters = """
+        (
+            SELECT COALESCE(SUM(total)::BIGINT, 0)
+              FROM counters
+             WHERE {parent_id_filter}
+               AND collection_id = :collection_id
+        )
+        """
+
         # Unsafe strings escaped by PostgreSQL
         placeholders = dict(parent_id=parent_id, collection_id=collection_id)
 
@@ -677,6 +814,11 @@ class Storage(StorageBase, MigratorMixin):
             safeholders["conditions_filter"] = f"AND {safe_sql}"
             placeholders.update(**holders)
 
+        if self.index_advisor and "*" not in parent_id:
+            self._count_fields(
+                collection_id, parent_id, filters, sorting, id_field, modified_field
+            )
+
         if not include_deleted:
             safeholders["conditions_deleted"] = "AND NOT deleted"
 
@@ -685,32 +827,172 @@ class Storage(StorageBase, MigratorMixin):
             safeholders["sorting"] = sql
             placeholders.update(**holders)
 
+        # The counters table only knows about the whole collection.
+        count_exactly = self.count_mode == COUNT_EXACT and filters
+        if not count_exactly:
+            query = query_uncounted
+            if self.count_mode == COUNT_DISABLED:
+                safeholders["count_total"] = "NULL"
+            else:
+                safeholders["count_total"] = count_from_counters.format_map(safeholders)
+
         if pagination_rules:
             sql, holders = self._format_pagination(pagination_rules, id_field, modified_field)
-            safeholders["pagination_rules"] = f"WHERE {sql}"
+            keyword = "WHERE" if count_exactly else "AND"
+            safeholders["pagination_rules"] = f"{keyword} {sql}"
             placeholders.update(**holders)
 
         # Limit the number of results (pagination).
         limit = min(self._max_fetch_size, limit) if limit else self._max_fetch_size
         placeholders["pagination_limit"] = limit
 
+        count_total = None if self.count_mode == COUNT_DISABLED else 0
+        records = []
         with self.client.connect(readonly=True) as conn:
-            result = conn.execute(query.format_map(safeholders), placeholders)
-            retrieved = result.fetchmany(self._max_fetch_size)
+            result = self.statements.execute(conn, query.format_map(safeholders), placeholders)
+            for row in result:
+                count_total = row["count_total"]
+                record = row["data"]
+                record[id_field] = row["id"]
+                record[modified_field] = row["last_modified"]
+                records.append(record)
 
-        if len(retrieved) == 0:
-            return [], 0
+        return records, count_total
 
-        count_total = retrieved[0]["count_total"]
+    def _count_fields(self, collection_id, parent_id, filters, sorting, id_field, modified_field):
+        """Count the JSON fields used in filters and sorting. The counts are
+        kept in memory, and written in the ``fields_stats`` table by chunks,
+        outside the transaction of the current request.
+        """
+        fields = {f.field for f in filters or [] if f.operator in INDEXABLE_OPERATORS}
+        fields.update(s.field for s in sorting or [])
+        fields.difference_update((id_field, modified_field))
+
+        with self._fields_stats_lock:
+            for field in fields:
+                self._fields_stats[(parent_id, collection_id, field)] += 1
+            if sum(self._fields_stats.values()) < self.fields_stats_flush_size:
+                return
+            pending = self._fields_stats
+            self._fields_stats = Counter()
 
-        records = []
-        for result in retrieved:
-            record = result["data"]
-            record[id_field] = result["id"]
-            record[modified_field] = result["last_modified"]
-            records.append(record)
+        if self.readonly:
+            return
 
-        return records, count_total
+        values = []
+        placeholders = {}
+        for i, ((parent_id, collection_id, field), hits) in enumerate(pending.items()):
+            values.append(f"(:parent_id_{i}, :collection_id_{i}, :field_{i}, :hits_{i})")
+            placeholders[f"parent_id_{i}"] = parent_id
+            placeholders[f"collection_id_{i}"] = collection_id
+            placeholders[f"field_{i}"] = field
+            placeholders[f"hits_{i}"] = hits
+
+        query = f"""
+        INSERT INTO fields_stats (parent_id, collection_id, field, hits)
+        VALUES {", ".join(values)}
+        ON CONFLICT (parent_id, collection_id, field) DO UPDATE
+        SET hits = fields_stats.hits + EXCLUDED.hits;
+        """
+        # A write connection would pin read-only requests to the primary.
+        try:
+            with self.client.connect_detached() as conn:
+                conn.execute(sqlalchemy.text(query), placeholders)
+        except exceptions.BackendError as e:
+            logger.warning(f"Could not write fields stats: {e}")
+
+    def get_fields_stats(self, limit=None):
+        """Return the JSON fields most used in listings, with the name of their
+        expression index if it was created.
+
+        :param int limit: the maximum number of fields to return.
+        :rtype: list
+        """
+        query = """
+        SELECT parent_id, collection_id, field, hits
+          FROM fields_stats
+         ORDER BY hits DESC, parent_id, collection_id, field
+         LIMIT :limit;
+        """
+        existing_query = """
+        SELECT indexname
+          FROM pg_indexes
+         WHERE tablename = 'records'
+           AND indexname LIKE 'idx_records_field_%';
+        """
+        with self.client.connect(readonly=True) as conn:
+            rows = conn.execute(query, dict(limit=limit)).fetchall()
+            existing = {row["indexname"] for row in conn.execute(existing_query)}
+
+        stats = []
+        for row in rows:
+            stat = dict(row)
+            name = _field_index_name(row["parent_id"], row["collection_id"], row["field"])
+            stat["index"] = name if name in existing else None
+            stats.append(stat)
+        return stats
+
+    def create_fields_indexes(self, limit=10, dry_run=False):
+        """Create the partial expression indexes of the most used JSON fields
+        in listings, for their collection.
+
+        :param int limit: the number of most used fields to index.
+        :param bool dry_run: only return the indexes that would be created.
+        :returns: the names of the created indexes.
+        :rtype: list
+        """
+        created = []
+        for stat in self.get_fields_stats(limit=limit):
+            if stat["index"] is not None:
+                continue
+            name = _field_index_name(stat["parent_id"], stat["collection_id"], stat["field"])
+            placeholders = dict(parent_id=stat["parent_id"], collection_id=stat["collection_id"])
+            # Same JSON path as the one used for filters and sorting, in order
+            # for the planner to match the index expression.
+            sql_field = "data"
+            for j, subfield in enumerate(stat["field"].split(".")):
+                placeholders[f"field_{j}"] = subfield
+                sql_field += f"->:field_{j}"
+            query = f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+                ON records(({sql_field}))
+             WHERE parent_id = :parent_id
+               AND collection_id = :collection_id;
+            """
+            if not dry_run:
+                self._execute_outside_transaction(query, placeholders)
+            created.append(name)
+        return created
+
+    def drop_fields_indexes(self, dry_run=False):
+        """Drop every expression index created with :meth:`create_fields_indexes`.
+
+        :param bool dry_run: only return the indexes that would be dropped.
+        :returns: the names of the dropped indexes.
+        :rtype: list
+        """
+        query = """
+        SELECT indexname
+          FROM pg_indexes
+         WHERE tablename = 'records'
+           AND indexname LIKE 'idx_records_field_%'
+         ORDER BY indexname;
+        """
+        with self.client.connect(readonly=True) as conn:
+            dropped = [row["indexname"] for row in conn.execute(query)]
+
+        if not dry_run:
+            for name in dropped:
+                self._execute_outside_transaction(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+        return dropped
+
+    def _execute_outside_transaction(self, query, placeholders=None):
+        # Indexes cannot be created or dropped concurrently in a transaction.
+        with self.client.connect() as conn:
+            engine = conn.get_bind()
+        with engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            connection.execute(sqlalchemy.text(query), placeholders or {})
 
     def _format_conditions(self, filters, id_field, modified_field, prefix="filters"):
         """Format the filters list in SQL, with placeholders for safe escaping.
@@ -741,12 +1023,20 @@ class Storage(StorageBase, MigratorMixin):
             value = filtr.value
             is_like_query = filtr.operator == COMPARISON.LIKE
 
+            if isinstance(value, AccessibleBy):
+                cond, accessible_holders = self._format_accessible_by(
+                    value, prefix=f"{prefix}_accessible_{i}"
+                )
+                holders.update(accessible_holders)
+                conditions.append(cond)
+                continue
+
             if filtr.field == id_field:
                 sql_field = "id"
                 if isinstance(value, int):
                     value = str(value)
             elif filtr.field == modified_field:
-                sql_field = "as_epoch(last_modified)"
+                sql_field = "last_modified"
             else:
                 column_name = "data"
                 # Subfields: ``person.name`` becomes ``data->person->>name``
@@ -890,6 +1180,47 @@ class Storage(StorageBase, MigratorMixin):
         safe_sql = " AND ".join(conditions)
         return safe_sql, holders
 
+    def _format_accessible_by(self, accessible_by, prefix):
+        """Format the condition on the ids of the records that are accessible
+        to some principals, as a semi-join on the Access Control Entries of
+        the permission backend.
+
+        The object ids are compared for equality, which uses the primary key
+        of the ``access_control_entries`` table.
+
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values.
+        :rtype: tuple
+        """
+        # WHERE principal IN ();  -- Fails with syntax error.
+        holders = {f"{prefix}_principals": tuple(accessible_by.principals) or (None,)}
+
+        perms_by_pattern = {}
+        for pattern, perm in accessible_by.bound_permissions:
+            # Objects ids without ``*`` (e.g. parents) do not match records.
+            if "*" in pattern:
+                perms_by_pattern.setdefault(pattern, set()).add(perm)
+
+        conditions = []
+        for j, (pattern, perms) in enumerate(perms_by_pattern.items()):
+            uri_prefix, uri_suffix = pattern.rsplit("*", 1)
+            holders[f"{prefix}_prefix_{j}"] = uri_prefix
+            holders[f"{prefix}_suffix_{j}"] = uri_suffix
+            holders[f"{prefix}_perms_{j}"] = tuple(sorted(perms))
+            conditions.append(
+                f"""EXISTS (
+                    SELECT 1
+                      FROM access_control_entries
+                     WHERE object_id = :{prefix}_prefix_{j} || records.id || :{prefix}_suffix_{j}
+                       AND permission IN :{prefix}_perms_{j}
+                       AND principal IN :{prefix}_principals
+                )"""
+            )
+
+        if not conditions:
+            return "FALSE", holders
+        return f"({' OR '.join(conditions)})", holders
+
     def _format_pagination(self, pagination_rules, id_field, modified_field):
         """Format the pagination rules in SQL, with placeholders for
         safe escaping.
@@ -906,6 +1237,10 @@ class Storage(StorageBase, MigratorMixin):
             placeholders to actual values.
         :rtype: tuple
         """
+        keyset = self._format_keyset_pagination(pagination_rules, id_field, modified_field)
+        if keyset is not None:
+            return keyset
+
         rules = []
         placeholders = {}
 
@@ -921,6 +1256,69 @@ class Storage(StorageBase, MigratorMixin):
         safe_sql = " OR ".join([f"({r})" for r in rules])
         return safe_sql, placeholders
 
+    def _format_keyset_pagination(self, pagination_rules, id_field, modified_field):
+        """Format the pagination rules as a single comparison of row values,
+        like ``(a, b) < (:x, :y)`` instead of ``(a < :x) OR (a = :x AND b < :y)``,
+        so that PostgreSQL can serve it with an index range scan.
+
+        This is only possible when the rules were built from a sorting whose
+        directions all match, and when the last record had a value for every
+        sorting field. Since missing fields are sorted last in ascending order,
+        ascending sorts are only supported on the id and modified fields.
+
+        :returns: ``None`` if the rules cannot be formatted as row values, or
+            a SQL string with placeholders and a dict mapping placeholders
+            to actual values.
+        """
+        if len(pagination_rules) < 2:
+            return None
+
+        # Rules look like ``[[a = x, b < y], [a < x]]``.
+        keys = pagination_rules[0]
+        if len(keys) != len(pagination_rules):
+            return None
+        operator = keys[-1].operator
+        if operator not in (COMPARISON.LT, COMPARISON.GT):
+            return None
+        for i, rule in enumerate(pagination_rules):
+            expected = [Filter(f.field, f.value, COMPARISON.EQ) for f in keys[: len(keys) - i]]
+            expected[-1] = Filter(expected[-1].field, expected[-1].value, operator)
+            if list(rule) != expected:
+                return None
+        if any(f.value == MISSING for f in keys):
+            return None
+        columns = (id_field, modified_field)
+        if operator == COMPARISON.GT and any(f.field not in columns for f in keys):
+            return None
+
+        sql_fields = []
+        sql_values = []
+        holders = {}
+        for i, filtr in enumerate(keys):
+            value_holder = f"keyset_value_{i}"
+            if filtr.field == id_field:
+                sql_fields.append("id")
+                sql_values.append(f":{value_holder}")
+                holders[value_holder] = str(filtr.value)
+            elif filtr.field == modified_field:
+                sql_fields.append("last_modified")
+                sql_values.append(f":{value_holder}")
+                holders[value_holder] = filtr.value
+            else:
+                sql_field = "data"
+                for j, subfield in enumerate(filtr.field.split(".")):
+                    # Safely escape field name
+                    field_holder = f"keyset_field_{i}_{j}"
+                    holders[field_holder] = subfield
+                    sql_field += f"->:{field_holder}"
+                sql_fields.append(sql_field)
+                sql_values.append(f"(:{value_holder})::JSONB")
+                holders[value_holder] = self.json.dumps(filtr.value)
+
+        sql_operator = operator.value
+        safe_sql = f"({', '.join(sql_fields)}) {sql_operator} ({', '.join(sql_values)})"
+        return safe_sql, holders
+
     def _format_sorting(self, sorting, id_field, modified_field):
         """Format the sorting in SQL, with placeholders for safe escaping.
 
@@ -958,14 +1356,42 @@ class Storage(StorageBase, MigratorMixin):
         return safe_sql, holders
 
 
+INDEXABLE_OPERATORS = (
+    COMPARISON.EQ,
+    COMPARISON.IN,
+    COMPARISON.LT,
+    COMPARISON.GT,
+    COMPARISON.MIN,
+    COMPARISON.MAX,
+)
+"""Filters operators that can be served by an expression index."""
+
+
+def _field_index_name(parent_id, collection_id, field):
+    # Identifiers are limited to 63 characters in PostgreSQL.
+    digest = hashlib.sha256("\n".join((parent_id, collection_id, field)).encode()).hexdigest()
+    return f"idx_records_field_{digest[:32]}"
+
+
 def load_from_config(config):
     settings = config.get_settings()
     max_fetch_size = int(settings["storage_max_fetch_size"])
     strict = settings.get("storage_strict_json", False)
     readonly = settings.get("readonly", False)
+    count_mode = settings.get("storage_count_mode", COUNT_EXACT)
+    if count_mode not in (COUNT_EXACT, COUNT_ESTIMATED, COUNT_DISABLED):
+        raise ValueError(f"Unknown storage count mode {count_mode!r}")
+    index_advisor = asbool(settings.get("storage_index_advisor", False))
+    statement_cache_size = int(settings.get("storage_statement_cache_size", 0))
     client = create_from_config(config, prefix="storage_")
     return Storage(
-        client=client, max_fetch_size=max_fetch_size, strict_json=strict, readonly=readonly
+        client=client,
+        max_fetch_size=max_fetch_size,
+        strict_json=strict,
+        readonly=readonly,
+        count_mode=count_mode,
+        index_advisor=index_advisor,
+        statement_cache_size=statement_cache_size,
     )
 
 
@@ -1,7 +1,14 @@
 import contextlib
+import itertools
 import logging
+import re
+import threading
+import time
 import warnings
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+
+from pyramid.events import NewRequest
+from pyramid.settings import aslist
 
 from kinto.core.storage import exceptions
 from kinto.core.utils import sqlalchemy
@@ -15,15 +22,30 @@ BLACKLISTED_SETTINGS = [
     "max_size_bytes",
     "prefix",
     "strict_json",
+    "count_mode",
+    "statement_cache_size",
+    "replica_urls",
+    "index_advisor",
+    "cached_backend",
+    "cache_ttl_seconds",
     "hosts",
+    "purge_interval_seconds",
+    "tiered_backend",
+    "tiered_ttl_seconds",
 ]
 
 
 class PostgreSQLClient:
-    def __init__(self, session_factory, commit_manually, invalidate):
+    replica_retry_delay = 30
+    """Number of seconds during which an unavailable replica is not used."""
+
+    def __init__(self, session_factory, commit_manually, invalidate, replicas=None):
         self.session_factory = session_factory
         self.commit_manually = commit_manually
         self.invalidate = invalidate
+        self.replicas = replicas or []
+        self._next_replica = itertools.cycle(range(len(self.replicas)))
+        self._replicas_down = {}
 
     @contextlib.contextmanager
     def connect(self, readonly=False, force_commit=False):
@@ -33,12 +55,26 @@ class PostgreSQLClient:
 
         A COMMIT is performed on the current transaction if everything went
         well. Otherwise transaction is ROLLBACK, and everything cleaned up.
+
+        Read-only connections are pulled from the replicas if any, unless
+        the current transaction has already written on the primary, or was
+        marked with :meth:`stick_to_primary`.
         """
+        if readonly and self.replicas and not self._sticks_to_primary():
+            replica_session = self._replica_session()
+            if replica_session is not None:
+                with self._connect_replica(replica_session) as session:
+                    yield session
+                return
+
         commit_manually = self.commit_manually and not readonly
         session = None
         try:
             # Pull connection from pool.
             session = self.session_factory()
+            if not readonly:
+                # Stick to the primary for the rest of this transaction.
+                session.info["written_transaction"] = session.transaction
             # Start context
             yield session
             if not readonly and not self.commit_manually:
@@ -66,6 +102,164 @@ class PostgreSQLClient:
                 # Give back to pool if commit done manually.
                 session.close()
 
+    @contextlib.contextmanager
+    def connect_detached(self):
+        """
+        Pulls a connection from the pool of the primary, outside of the
+        current transaction, and COMMIT when context is exited.
+        """
+        engine = self.session_factory().get_bind()
+        try:
+            with engine.begin() as conn:
+                yield conn
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error(e, exc_info=True)
+            raise exceptions.BackendError(original=e) from e
+
+    def stick_to_primary(self):
+        """Pull read-only connections from the primary for the rest of the
+        current transaction (e.g. in requests that are going to write).
+        """
+        zope_transaction.get().set_data(self, True)
+
+    def _sticks_to_primary(self):
+        """Return ``True`` if the current transaction has written on the primary,
+        or was marked with :meth:`stick_to_primary`.
+        """
+        session = self.session_factory()
+        if session.info.get("written_transaction") is session.transaction:
+            return True
+        try:
+            return zope_transaction.get().data(self)
+        except KeyError:
+            return False
+
+    def _replica_session(self):
+        """Return a session on the next available replica, or ``None`` if
+        every replica is unavailable.
+        """
+        now = time.time()
+        for _ in self.replicas:
+            index = next(self._next_replica)
+            if self._replicas_down.get(index, 0) > now:
+                continue
+            session = self.replicas[index]()
+            try:
+                # Check out a connection, in order to detect unavailable replicas.
+                session.connection()
+                return session
+            except sqlalchemy.exc.DBAPIError as e:
+                session.close()
+                logger.warning(f"Replica unavailable for {self.replica_retry_delay} seconds: {e}")
+                self._replicas_down[index] = now + self.replica_retry_delay
+        return None
+
+    @contextlib.contextmanager
+    def _connect_replica(self, session):
+        try:
+            yield session
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error(e, exc_info=True)
+            raise exceptions.BackendError(original=e) from e
+        finally:
+            # Read-only: nothing to commit, give back to pool.
+            session.close()
+
+
+class PreparedStatements:
+    """Execute SQL statements as server-side prepared statements, keyed by
+    query shape.
+
+    The SQL text produced by the storage query builder only depends on the
+    structure of the filters, sorting and pagination rules (values are passed
+    as placeholders). Each shape is prepared once per connection with
+    ``PREPARE``, and then run with ``EXECUTE``, so that PostgreSQL does not
+    parse and plan it again on every request.
+
+    Every connection keeps up to `size` statements, and deallocates the least
+    recently used ones. ``0`` disables prepared statements.
+
+    .. note::
+
+        Prepared statements live in the PostgreSQL session, and thus cannot
+        be used behind a pooler that shares sessions between clients (e.g.
+        *pgbouncer* in transaction mode).
+    """
+
+    bind_param = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+    """Named placeholders, as parsed by ``sqlalchemy.text()``."""
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def execute(self, session, sql, placeholders):
+        """Execute the `sql` query with the specified `placeholders` on the
+        connection of `session`, from its prepared statement if any.
+        """
+        positional_sql, values = self._positional(sql, placeholders)
+        if self.size <= 0 or not all(isinstance(v, (str, int, float, type(None))) for v in values):
+            # Arrays (e.g. for JSONB containment) are not coerced to the
+            # types inferred for the statement parameters.
+            return session.execute(sql, placeholders)
+
+        connection = session.connection()
+        statements = connection.info.setdefault("prepared_statements", OrderedDict())
+        names = connection.info.setdefault("prepared_statements_names", itertools.count())
+        name = statements.get(positional_sql)
+        if name is not None:
+            statements.move_to_end(positional_sql)
+            self._count(hit=True)
+        else:
+            self._count(hit=False)
+            name = f"kinto_statement_{next(names)}"
+            connection.execute(sqlalchemy.text(f"PREPARE {name} AS {positional_sql}"))
+            statements[positional_sql] = name
+            if len(statements) > self.size:
+                _, evicted = statements.popitem(last=False)
+                connection.execute(sqlalchemy.text(f"DEALLOCATE {evicted}"))
+
+        if not values:
+            return connection.execute(sqlalchemy.text(f"EXECUTE {name}"))
+        params = ", ".join(f":param_{i}" for i in range(len(values)))
+        arguments = {f"param_{i}": value for i, value in enumerate(values)}
+        return connection.execute(sqlalchemy.text(f"EXECUTE {name}({params})"), arguments)
+
+    def _positional(self, sql, placeholders):
+        """Replace the named placeholders of `sql` by numbered parameters
+        (tuples are expanded, e.g. for ``IN``), and return their values.
+        """
+        numbered = {}
+        values = []
+
+        def number(match):
+            name = match.group(1)
+            if name not in numbered:
+                value = placeholders[name]
+                items = value if isinstance(value, tuple) else (value,)
+                params = [f"${len(values) + i + 1}" for i in range(len(items))]
+                values.extend(items)
+                params = ", ".join(params)
+                numbered[name] = f"({params})" if isinstance(value, tuple) else params
+            return numbered[name]
+
+        return self.bind_param.sub(number, sql), values
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def info(self):
+        """Return the number of statements executed from a prepared statement
+        (hits), and of statements that had to be prepared (misses).
+        """
+        return dict(hits=self.hits, misses=self.misses)
+
 
 # Reuse existing client if same URL.
 _CLIENTS = defaultdict(dict)
@@ -107,6 +301,16 @@ def create_from_config(config, prefix="", with_transaction=True):
     filtered_settings[poolclass_key] = config.maybe_dotted(filtered_settings[poolclass_key])
     engine = sqlalchemy.engine_from_config(filtered_settings, prefix=prefix, url=url)
 
+    # Read-only sessions are load-balanced across replicas, outside the
+    # transaction of the request.
+    replica_urls = aslist(settings.get(prefix + "replica_urls", ""))
+    replicas = [
+        sessionmaker(
+            bind=sqlalchemy.engine_from_config(filtered_settings, prefix=prefix, url=replica_url)
+        )
+        for replica_url in replica_urls
+    ]
+
     # Initialize thread-safe session factory.
     options = {}
     if transaction_per_request:
@@ -116,6 +320,16 @@ def create_from_config(config, prefix="", with_transaction=True):
 
     # Store one client per URI.
     commit_manually = not transaction_per_request
-    client = PostgreSQLClient(session_factory, commit_manually, invalidate)
+    client = PostgreSQLClient(session_factory, commit_manually, invalidate, replicas)
     _CLIENTS[transaction_per_request][url] = client
+
+    if replicas and transaction_per_request:
+        # Requests with unsafe methods read from the primary only, so that their
+        # preconditions and read-modify-write cycles don't suffer replication lag.
+        def on_new_request(event):
+            if event.request.method not in ("GET", "HEAD", "OPTIONS"):
+                client.stick_to_primary()
+
+        config.add_subscriber(on_new_request, NewRequest)
+
     return client
@@ -0,0 +1,62 @@
+--
+-- Number of (non-deleted) records per collection, maintained by trigger
+-- in order to avoid counting the whole collection on every listing.
+--
+CREATE TABLE IF NOT EXISTS counters (
+  parent_id TEXT NOT NULL COLLATE "C",
+  collection_id TEXT NOT NULL COLLATE "C",
+  total BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (parent_id, collection_id)
+);
+
+DROP TRIGGER IF EXISTS tgr_records_counter ON records;
+
+CREATE OR REPLACE FUNCTION bump_counter()
+RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+    target_parent_id TEXT;
+    target_collection_id TEXT;
+BEGIN
+    delta := 0;
+    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+        target_parent_id := NEW.parent_id;
+        target_collection_id := NEW.collection_id;
+        IF NOT NEW.deleted THEN
+            delta := delta + 1;
+        END IF;
+    END IF;
+    IF TG_OP = 'UPDATE' OR TG_OP = 'DELETE' THEN
+        target_parent_id := OLD.parent_id;
+        target_collection_id := OLD.collection_id;
+        IF NOT OLD.deleted THEN
+            delta := delta - 1;
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        INSERT INTO counters (parent_id, collection_id, total)
+        VALUES (target_parent_id, target_collection_id, delta)
+        ON CONFLICT (parent_id, collection_id) DO UPDATE
+        SET total = counters.total + EXCLUDED.total;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tgr_records_counter
+AFTER INSERT OR UPDATE OF deleted OR DELETE ON records
+FOR EACH ROW EXECUTE PROCEDURE bump_counter();
+
+-- Initialize counters from existing records.
+INSERT INTO counters (parent_id, collection_id, total)
+SELECT parent_id, collection_id, COUNT(*)
+  FROM records
+ WHERE NOT deleted
+ GROUP BY parent_id, collection_id
+ON CONFLICT (parent_id, collection_id) DO UPDATE
+SET total = EXCLUDED.total;
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '21');
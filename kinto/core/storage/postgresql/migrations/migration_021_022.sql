@@ -0,0 +1,112 @@
+-- Store timestamps as epoch integers, instead of converting them on every read.
+DROP INDEX IF EXISTS idx_records_last_modified_epoch;
+
+DROP TRIGGER IF EXISTS tgr_records_last_modified ON records;
+
+-- Since the schema version is assumed to be 20 when unknown (see #1460),
+-- only convert the columns that were not converted yet.
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+         WHERE table_name = 'records' AND column_name = 'last_modified') <> 'bigint' THEN
+        -- Microseconds are lost in the conversion: records of the same
+        -- collection stored in the same millisecond would collide on the
+        -- unique index. Rebuild it once the colliding timestamps were bumped.
+        DROP INDEX IF EXISTS idx_records_parent_id_collection_id_last_modified;
+
+        ALTER TABLE records
+            ALTER COLUMN last_modified TYPE BIGINT USING as_epoch(last_modified);
+
+        -- Keep timestamps strictly increasing within each collection, by
+        -- bumping each one to at least 1 msec after the previous one.
+        WITH ranked AS (
+            SELECT id, parent_id, collection_id, last_modified,
+                   row_number() OVER (PARTITION BY parent_id, collection_id
+                                      ORDER BY last_modified, id) AS rank
+              FROM records
+        ),
+        bumped AS (
+            SELECT id, parent_id, collection_id, last_modified,
+                   rank + MAX(last_modified - rank) OVER (PARTITION BY parent_id, collection_id
+                                                          ORDER BY rank) AS bumped_last_modified
+              FROM ranked
+        )
+        UPDATE records
+           SET last_modified = bumped.bumped_last_modified
+          FROM bumped
+         WHERE records.id = bumped.id
+           AND records.parent_id = bumped.parent_id
+           AND records.collection_id = bumped.collection_id
+           AND bumped.bumped_last_modified <> bumped.last_modified;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_records_parent_id_collection_id_last_modified
+            ON records(parent_id, collection_id, last_modified DESC);
+    END IF;
+    IF (SELECT data_type FROM information_schema.columns
+         WHERE table_name = 'timestamps' AND column_name = 'last_modified') <> 'bigint' THEN
+        ALTER TABLE timestamps
+            ALTER COLUMN last_modified TYPE BIGINT USING as_epoch(last_modified);
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+DECLARE
+    previous BIGINT;
+    current BIGINT;
+BEGIN
+    previous := NULL;
+    WITH existing_timestamps AS (
+      -- Timestamp of latest record.
+      (
+        SELECT last_modified
+        FROM records
+        WHERE parent_id = NEW.parent_id
+          AND collection_id = NEW.collection_id
+        ORDER BY last_modified DESC
+        LIMIT 1
+      )
+      -- Timestamp when collection was empty.
+      UNION
+      (
+        SELECT last_modified
+        FROM timestamps
+        WHERE parent_id = NEW.parent_id
+          AND collection_id = NEW.collection_id
+      )
+    )
+    SELECT MAX(last_modified) INTO previous
+      FROM existing_timestamps;
+
+    --
+    -- This bumps the current timestamp to 1 msec in the future if the previous
+    -- timestamp is equal to the current one (or higher if was bumped already).
+    --
+    -- If a bunch of requests from the same user on the same collection
+    -- arrive in the same millisecond, the unicity constraint can raise
+    -- an error (operation is cancelled).
+    -- See https://github.com/mozilla-services/cliquet/issues/25
+    --
+    current := (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT;
+    IF previous IS NOT NULL AND previous >= current THEN
+        current := previous + 1;
+    END IF;
+
+    IF NEW.last_modified IS NULL OR
+       (previous IS NOT NULL AND NEW.last_modified = previous) THEN
+        -- If record does not carry last-modified, or if the one specified
+        -- is equal to previous, assign it to current (i.e. bump it).
+        NEW.last_modified := current;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tgr_records_last_modified
+BEFORE INSERT OR UPDATE OF data ON records
+FOR EACH ROW EXECUTE PROCEDURE bump_timestamp();
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '22');
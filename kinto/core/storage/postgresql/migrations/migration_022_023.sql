@@ -0,0 +1,58 @@
+-- Keep collections clocks in the timestamps table, instead of looking up
+-- the latest record timestamp on every write.
+
+-- Initialize the clock of existing collections.
+INSERT INTO timestamps (parent_id, collection_id, last_modified)
+SELECT parent_id, collection_id, MAX(last_modified)
+  FROM records
+ GROUP BY parent_id, collection_id
+ON CONFLICT (parent_id, collection_id) DO UPDATE
+SET last_modified = GREATEST(timestamps.last_modified, EXCLUDED.last_modified);
+
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+DECLARE
+    previous BIGINT;
+    current BIGINT;
+BEGIN
+    --
+    -- The collection clock is a single row of the timestamps table. Read it
+    -- while locking it (created if missing), so that concurrent writers on the
+    -- same collection wait for each other here, instead of failing on the
+    -- unicity constraint of records timestamps.
+    -- See https://github.com/mozilla-services/cliquet/issues/25
+    --
+    INSERT INTO timestamps (parent_id, collection_id, last_modified)
+    VALUES (NEW.parent_id, NEW.collection_id, 0)
+    ON CONFLICT (parent_id, collection_id) DO UPDATE
+    SET last_modified = timestamps.last_modified
+    RETURNING last_modified INTO previous;
+
+    --
+    -- This bumps the current timestamp to 1 msec in the future if the previous
+    -- timestamp is equal to the current one (or higher if was bumped already).
+    --
+    current := (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT;
+    IF previous >= current THEN
+        current := previous + 1;
+    END IF;
+
+    IF NEW.last_modified IS NULL OR NEW.last_modified = previous THEN
+        -- If record does not carry last-modified, or if the one specified
+        -- is equal to previous, assign it to current (i.e. bump it).
+        NEW.last_modified := current;
+    END IF;
+
+    -- Advance the collection clock.
+    UPDATE timestamps
+       SET last_modified = NEW.last_modified
+     WHERE parent_id = NEW.parent_id
+       AND collection_id = NEW.collection_id
+       AND last_modified < NEW.last_modified;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '23');
@@ -0,0 +1,14 @@
+--
+-- Number of listings using each JSON field in filters or sorting, used to
+-- create expression indexes on the most used ones (see ``kinto indexes``).
+--
+CREATE TABLE IF NOT EXISTS fields_stats (
+  parent_id TEXT NOT NULL COLLATE "C",
+  collection_id TEXT NOT NULL COLLATE "C",
+  field TEXT NOT NULL,
+  hits BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (parent_id, collection_id, field)
+);
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '24');
@@ -31,10 +31,9 @@ CREATE TABLE IF NOT EXISTS records (
     parent_id TEXT COLLATE "C" NOT NULL,
     collection_id TEXT COLLATE "C" NOT NULL,
 
-    -- Timestamp is relevant because adequate semantically.
-    -- Since the HTTP API manipulates integers, it could make sense
-    -- to replace the timestamp columns type by integer.
-    last_modified TIMESTAMP NOT NULL,
+    -- Epoch in milliseconds, as manipulated by the HTTP API. Being
+    -- stored natively, it can be compared and sorted without conversion.
+    last_modified BIGINT NOT NULL,
 
     -- JSONB, 2x faster than JSON.
     data JSONB NOT NULL DEFAULT '{}'::JSONB,
@@ -45,14 +44,16 @@ CREATE TABLE IF NOT EXISTS records (
 );
 CREATE UNIQUE INDEX IF NOT EXISTS idx_records_parent_id_collection_id_last_modified
     ON records(parent_id, collection_id, last_modified DESC);
-CREATE INDEX IF NOT EXISTS idx_records_last_modified_epoch
-    ON records(as_epoch(last_modified));
 
 
+--
+-- Collections clocks: highest timestamp ever assigned in each collection,
+-- advanced by the records trigger below.
+--
 CREATE TABLE IF NOT EXISTS timestamps (
   parent_id TEXT NOT NULL COLLATE "C",
   collection_id TEXT NOT NULL COLLATE "C",
-  last_modified TIMESTAMP NOT NULL,
+  last_modified BIGINT NOT NULL,
   PRIMARY KEY (parent_id, collection_id)
 );
 
@@ -64,53 +65,44 @@ DROP TRIGGER IF EXISTS tgr_records_last_modified ON records;
 CREATE OR REPLACE FUNCTION bump_timestamp()
 RETURNS trigger AS $$
 DECLARE
-    previous TIMESTAMP;
-    current TIMESTAMP;
+    previous BIGINT;
+    current BIGINT;
 BEGIN
-    previous := NULL;
-    WITH existing_timestamps AS (
-      -- Timestamp of latest record.
-      (
-        SELECT last_modified
-        FROM records
-        WHERE parent_id = NEW.parent_id
-          AND collection_id = NEW.collection_id
-        ORDER BY last_modified DESC
-        LIMIT 1
-      )
-      -- Timestamp when collection was empty.
-      UNION
-      (
-        SELECT last_modified
-        FROM timestamps
-        WHERE parent_id = NEW.parent_id
-          AND collection_id = NEW.collection_id
-      )
-    )
-    SELECT MAX(last_modified) INTO previous
-      FROM existing_timestamps;
+    --
+    -- The collection clock is a single row of the timestamps table. Read it
+    -- while locking it (created if missing), so that concurrent writers on the
+    -- same collection wait for each other here, instead of failing on the
+    -- unicity constraint of records timestamps.
+    -- See https://github.com/mozilla-services/cliquet/issues/25
+    --
+    INSERT INTO timestamps (parent_id, collection_id, last_modified)
+    VALUES (NEW.parent_id, NEW.collection_id, 0)
+    ON CONFLICT (parent_id, collection_id) DO UPDATE
+    SET last_modified = timestamps.last_modified
+    RETURNING last_modified INTO previous;
 
     --
     -- This bumps the current timestamp to 1 msec in the future if the previous
     -- timestamp is equal to the current one (or higher if was bumped already).
     --
-    -- If a bunch of requests from the same user on the same collection
-    -- arrive in the same millisecond, the unicity constraint can raise
-    -- an error (operation is cancelled).
-    -- See https://github.com/mozilla-services/cliquet/issues/25
-    --
-    current := clock_timestamp();
-    IF previous IS NOT NULL AND previous >= current THEN
-        current := previous + INTERVAL '1 milliseconds';
+    current := (EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT;
+    IF previous >= current THEN
+        current := previous + 1;
     END IF;
 
-    IF NEW.last_modified IS NULL OR
-       (previous IS NOT NULL AND as_epoch(NEW.last_modified) = as_epoch(previous)) THEN
+    IF NEW.last_modified IS NULL OR NEW.last_modified = previous THEN
         -- If record does not carry last-modified, or if the one specified
         -- is equal to previous, assign it to current (i.e. bump it).
         NEW.last_modified := current;
     END IF;
 
+    -- Advance the collection clock.
+    UPDATE timestamps
+       SET last_modified = NEW.last_modified
+     WHERE parent_id = NEW.parent_id
+       AND collection_id = NEW.collection_id
+       AND last_modified < NEW.last_modified;
+
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -119,6 +111,69 @@ CREATE TRIGGER tgr_records_last_modified
 BEFORE INSERT OR UPDATE OF data ON records
 FOR EACH ROW EXECUTE PROCEDURE bump_timestamp();
 
+--
+-- Number of (non-deleted) records per collection, maintained by trigger
+-- in order to avoid counting the whole collection on every listing.
+--
+CREATE TABLE IF NOT EXISTS counters (
+  parent_id TEXT NOT NULL COLLATE "C",
+  collection_id TEXT NOT NULL COLLATE "C",
+  total BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (parent_id, collection_id)
+);
+
+DROP TRIGGER IF EXISTS tgr_records_counter ON records;
+
+CREATE OR REPLACE FUNCTION bump_counter()
+RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+    target_parent_id TEXT;
+    target_collection_id TEXT;
+BEGIN
+    delta := 0;
+    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+        target_parent_id := NEW.parent_id;
+        target_collection_id := NEW.collection_id;
+        IF NOT NEW.deleted THEN
+            delta := delta + 1;
+        END IF;
+    END IF;
+    IF TG_OP = 'UPDATE' OR TG_OP = 'DELETE' THEN
+        target_parent_id := OLD.parent_id;
+        target_collection_id := OLD.collection_id;
+        IF NOT OLD.deleted THEN
+            delta := delta - 1;
+        END IF;
+    END IF;
+
+    IF delta <> 0 THEN
+        INSERT INTO counters (parent_id, collection_id, total)
+        VALUES (target_parent_id, target_collection_id, delta)
+        ON CONFLICT (parent_id, collection_id) DO UPDATE
+        SET total = counters.total + EXCLUDED.total;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tgr_records_counter
+AFTER INSERT OR UPDATE OF deleted OR DELETE ON records
+FOR EACH ROW EXECUTE PROCEDURE bump_counter();
+
+--
+-- Number of listings using each JSON field in filters or sorting, used to
+-- create expression indexes on the most used ones (see ``kinto indexes``).
+--
+CREATE TABLE IF NOT EXISTS fields_stats (
+  parent_id TEXT NOT NULL COLLATE "C",
+  collection_id TEXT NOT NULL COLLATE "C",
+  field TEXT NOT NULL,
+  hits BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (parent_id, collection_id, field)
+);
+
 --
 -- Metadata table
 --
@@ -131,4 +186,4 @@ INSERT INTO metadata (name, value) VALUES ('created_at', NOW()::TEXT);
 
 -- Set storage schema version.
 -- Should match ``kinto.core.storage.postgresql.PostgreSQL.schema_version``
-INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '20');
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '24');
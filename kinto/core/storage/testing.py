@@ -219,6 +219,35 @@ class BaseTestStorage:
         self.assertIn(self.modified_field, retrieved)
         self.assertGreater(retrieved[self.modified_field], stored[self.modified_field])
 
+    def test_update_many_creates_and_overwrites_records(self):
+        stored = self.create_record()
+        records = [{**self.record, "id": stored["id"], "foo": "baz"}, {**self.record, "id": "abc"}]
+        updated = self.storage.update_many(records=records, **self.storage_kw)
+        self.assertEqual([r["id"] for r in updated], [stored["id"], "abc"])
+        self.assertEqual(updated[0]["foo"], "baz")
+        self.assertGreater(updated[0][self.modified_field], stored[self.modified_field])
+        self.assertGreater(updated[1][self.modified_field], updated[0][self.modified_field])
+
+        retrieved, count = self.storage.get_all(**self.storage_kw)
+        self.assertEqual(count, 2)
+        self.assertEqual({r["id"]: r for r in retrieved}, {r["id"]: r for r in updated})
+
+    def test_update_many_stores_the_last_of_duplicated_ids(self):
+        records = [{"id": "abc", "number": 1}, {"id": "abc", "number": 2}]
+        updated = self.storage.update_many(records=records, **self.storage_kw)
+        self.assertEqual(len(updated), 2)
+        self.assertGreater(updated[1][self.modified_field], updated[0][self.modified_field])
+        retrieved = self.storage.get(object_id="abc", **self.storage_kw)
+        self.assertEqual(retrieved, updated[1])
+
+    def test_update_many_restores_deleted_records(self):
+        stored = self.create_record()
+        self.storage.delete(object_id=stored["id"], **self.storage_kw)
+        self.storage.update_many(records=[stored], **self.storage_kw)
+        retrieved, count = self.storage.get_all(**self.storage_kw)
+        self.assertEqual(count, 1)
+        self.assertEqual(retrieved[0]["id"], stored["id"])
+
     def test_delete_works_properly(self):
         stored = self.create_record()
         self.storage.delete(object_id=stored["id"], **self.storage_kw)
@@ -1251,6 +1280,40 @@ class DeletedRecordsTest:
         self.assertEqual(count, 0)
         self.assertEqual(len(records), 1)
 
+    def test_purge_deleted_can_be_limited_by_chunks(self):
+        for _ in range(5):
+            self.create_record()
+        self.storage.delete_all(**self.storage_kw)
+        num_removed = self.storage.purge_deleted(limit=3, **self.storage_kw)
+        self.assertEqual(num_removed, 3)
+        num_removed = self.storage.purge_deleted(limit=3, **self.storage_kw)
+        self.assertEqual(num_removed, 2)
+        records, _ = self.storage.get_all(include_deleted=True, **self.storage_kw)
+        self.assertEqual(len(records), 0)
+
+    def test_purge_deleted_does_not_remove_live_records(self):
+        record = self.create_record()
+        deleted = self.create_record()
+        self.storage.delete(object_id=deleted["id"], **self.storage_kw)
+        num_removed = self.storage.purge_deleted(**self.storage_kw)
+        self.assertEqual(num_removed, 1)
+        records, _ = self.storage.get_all(include_deleted=True, **self.storage_kw)
+        self.assertEqual([r["id"] for r in records], [record["id"]])
+
+    def test_purge_deleted_can_remove_live_records(self):
+        self.create_record(parent_id="abc", collection_id="c")
+        deleted = self.create_record(parent_id="abc", collection_id="c")
+        self.create_record(parent_id="efg", collection_id="c")
+        self.storage.delete(parent_id="abc", collection_id="c", object_id=deleted["id"])
+        num_removed = self.storage.purge_deleted(
+            parent_id="ab*", collection_id=None, with_live=True
+        )
+        self.assertEqual(num_removed, 2)
+        records, _ = self.storage.get_all(parent_id="abc", collection_id="c", include_deleted=True)
+        self.assertEqual(records, [])
+        _, count = self.storage.get_all(parent_id="efg", collection_id="c")
+        self.assertEqual(count, 1)
+
     #
     # Sorting
     #
@@ -1536,6 +1599,32 @@ class DeletedRecordsTest:
                         sort_by_secret_data(real_records), sort_by_secret_data(records)
                     )
 
+    def test_get_all_paginates_descending_sorts_with_missing_values(self):
+        for i in range(10):
+            record = {"flavor": f"flavor-{i % 4}"} if i % 3 else {}
+            self.create_record(record)
+
+        sorting = [Sort("flavor", -1), Sort("last_modified", -1)]
+        expected, _ = self.storage.get_all(sorting=sorting, **self.storage_kw)
+
+        LT, EQ = utils.COMPARISON.LT, utils.COMPARISON.EQ
+        records = []
+        pagination = None
+        while len(records) < len(expected):
+            page, _ = self.storage.get_all(
+                sorting=sorting, limit=3, pagination_rules=pagination, **self.storage_kw
+            )
+            self.assertTrue(page)
+            records.extend(page)
+            # Same rules as ``Resource._build_pagination_rules``.
+            flavor = page[-1].get("flavor", MISSING)
+            last_modified = page[-1]["last_modified"]
+            pagination = [
+                [Filter("flavor", flavor, EQ), Filter("last_modified", last_modified, LT)],
+                [Filter("flavor", flavor, LT)],
+            ]
+        self.assertEqual(records, expected)
+
     def test_delete_all_supports_pagination_rules(self):
         for i in range(6):
             self.create_record({"foo": i})
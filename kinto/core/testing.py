@@ -10,6 +10,7 @@ from pyramid.url import parse_url_overrides
 
 from kinto.core import DEFAULT_SETTINGS
 from kinto.core import statsd
+from kinto.core.authorization import settings_principals
 from kinto.core.storage import generators
 from kinto.core.utils import sqlalchemy, memcache, follow_subrequest, encode64
 
@@ -28,6 +29,7 @@ class DummyRequest(mock.MagicMock):
         self.upath_info = "/v0/"
         self.registry = mock.MagicMock(settings={**DEFAULT_SETTINGS})
         self.registry.id_generators = defaultdict(generators.UUID4)
+        self.registry.settings_principals = settings_principals(self.registry.settings)
         self.GET = {}
         self.headers = {}
         self.errors = cornice_errors.Errors()
@@ -38,6 +40,7 @@ class DummyRequest(mock.MagicMock):
         self.prefixed_principals = self.effective_principals + [self.prefixed_userid]
         self.json = {}
         self.validated = {}
+        self.bound_data = {}
         self.log_context = lambda **kw: kw
         self.matchdict = {}
         self.response = mock.MagicMock(headers={})
@@ -1,13 +1,20 @@
 import logging
+import threading
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 
 import colander
+import transaction
 from cornice.validators import colander_validator
 from pyramid import httpexceptions
+from pyramid.interfaces import IRoutesMapper
 from pyramid.security import NO_PERMISSION_REQUIRED
 
 from kinto.core import errors
 from kinto.core import Service
+from kinto.core.authorization import prefetch_permissions
 from kinto.core.errors import ErrorSchema
+from kinto.core.events import EventCollector
 from kinto.core.utils import merge_dicts, build_request, build_response
 from kinto.core.resource.viewset import CONTENT_TYPES
 
@@ -16,6 +23,48 @@ subrequest_logger = logging.getLogger("subrequest.summary")
 
 valid_http_method = colander.OneOf(("GET", "HEAD", "DELETE", "TRACE", "POST", "PUT", "PATCH"))
 
+_executor_lock = threading.Lock()
+
+
+class _SubrequestBoundData(MutableMapping):
+    """Bound data of a subrequest run concurrently, shared with the batch
+    request except for its resource events, which are merged in order once
+    every subrequest is over.
+    """
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.events = EventCollector()
+
+    def __getitem__(self, key):
+        if key == "resource_events":
+            return self.events
+        return self.shared[key]
+
+    def __setitem__(self, key, value):
+        if key == "resource_events":
+            self.events = value
+        else:
+            self.shared[key] = value
+
+    def __delitem__(self, key):
+        if key == "resource_events":
+            raise KeyError(key)
+        del self.shared[key]
+
+    def __iter__(self):
+        yield "resource_events"
+        yield from (key for key in self.shared if key != "resource_events")
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def setdefault(self, key, default=None):
+        if key == "resource_events":
+            return self.events
+        # Atomic on dicts, unlike the default implementation.
+        return self.shared.setdefault(key, default)
+
 
 def string_values(node, cstruct):
     """Validate that a ``colander.Mapping`` only has strings in its values.
@@ -132,34 +181,137 @@ def post_batch(request):
 
     responses = []
 
-    for subrequest_spec in requests:
-        subrequest = build_request(request, subrequest_spec)
+    subrequests = [build_request(request, subrequest_spec) for subrequest_spec in requests]
+
+    # Check the permissions of read-only subrequests with a single query.
+    prefetch_permissions(request, subrequests)
 
+    # Run the leading read-only subrequests concurrently, and the others in sequence.
+    parallel = _parallel_subrequests(request, subrequests)
+    results = _run_parallel_subrequests(request, parallel)
+    if any(resp.status_code == 409 for resp, _ in results):
+        _abort_batch_transaction(request)
+    for subrequest in subrequests[len(parallel) :]:
+        resp, followed = _run_subrequest(request, subrequest)
+        if resp.status_code == 409:
+            _abort_batch_transaction(request)
+        results.append((resp, followed))
+
+    for subrequest, (resp, followed) in zip(subrequests, results):
         log_context = {
             **request.log_context(),
             "path": subrequest.path,
             "method": subrequest.method,
         }
-        try:
-            # Invoke subrequest without individual transaction.
-            resp, subrequest = request.follow_subrequest(subrequest, use_tweens=False)
-        except httpexceptions.HTTPException as e:
-            # Since some request in the batch failed, we need to stop the parent request
-            # through Pyramid's transaction manager. 5XX errors are already caught by
-            # pyramid_tm's commit_veto
-            # https://github.com/Kinto/kinto/issues/624
-            if e.status_code == 409:
-                request.tm.abort()
-
-            if e.content_type == "application/json":
-                resp = e
-            else:
-                # JSONify raw Pyramid errors.
-                resp = errors.http_error(e)
-
         subrequest_logger.info("subrequest.summary", extra=log_context)
 
-        dict_resp = build_response(resp, subrequest)
+        dict_resp = build_response(resp, followed)
         responses.append(dict_resp)
 
     return {"responses": responses}
+
+
+def _run_subrequest(request, subrequest):
+    """Invoke `subrequest` without individual transaction.
+
+    :returns: the response and the followed subrequest.
+    :rtype: tuple
+    """
+    try:
+        resp, subrequest = request.follow_subrequest(subrequest, use_tweens=False)
+    except httpexceptions.HTTPException as e:
+        if e.content_type == "application/json":
+            resp = e
+        else:
+            # JSONify raw Pyramid errors.
+            resp = errors.http_error(e)
+    return resp, subrequest
+
+
+def _abort_batch_transaction(request):
+    """Since some request in the batch failed, we need to stop the parent request
+    through Pyramid's transaction manager. 5XX errors are already caught by
+    pyramid_tm's commit_veto
+    https://github.com/Kinto/kinto/issues/624
+
+    The transaction manager is bound to the thread of the batch request, hence
+    this must not be called from the threads of the batch executor.
+    """
+    request.tm.abort()
+
+
+def _parallel_subrequests(request, subrequests):
+    """Return the leading subrequests that can run concurrently, outside
+    the transaction of the batch.
+
+    Only reads of resources are considered, since they have no side effect
+    (unlike the default bucket for example). Subrequests that follow a write
+    must see it, and thus run in sequence.
+    """
+    max_workers = int(request.registry.settings["batch_max_workers"])
+    mapper = request.registry.queryUtility(IRoutesMapper)
+    if max_workers < 2 or not IRoutesMapper.providedBy(mapper):
+        return []
+
+    parallel = []
+    for subrequest in subrequests:
+        if subrequest.method not in ("GET", "HEAD"):
+            break
+        route = mapper(subrequest)["route"]
+        services = getattr(request.registry, "cornice_services", {})
+        service = services.get(route.pattern) if route is not None else None
+        if getattr(service, "resource", None) is None:
+            break
+        parallel.append(subrequest)
+    return parallel if len(parallel) > 1 else []
+
+
+def _run_parallel_subrequests(request, subrequests):
+    """Run `subrequests` in the threads of the batch executor, each with its
+    own transaction, and return their results in order.
+    """
+    if not subrequests:
+        return []
+
+    for subrequest in subrequests:
+        subrequest.bound_data = _SubrequestBoundData(request.bound_data)
+
+    executor = _get_executor(request.registry)
+    futures = [
+        executor.submit(_run_subrequest_in_transaction, request, subrequest)
+        for subrequest in subrequests
+    ]
+    results = [future.result() for future in futures]
+
+    collector = request.bound_data.setdefault("resource_events", EventCollector())
+    for subrequest in subrequests:
+        events = subrequest.bound_data.events.event_dict
+        for key, (payload, impacted, event_request) in events.items():
+            collector.add_event(*key, payload, impacted, event_request)
+    return results
+
+
+def _run_subrequest_in_transaction(request, subrequest):
+    transaction.begin()
+    try:
+        result = _run_subrequest(request, subrequest)
+    except Exception:
+        transaction.abort()
+        raise
+    resp, _ = result
+    if resp.status_code >= 500:
+        transaction.abort()
+    else:
+        transaction.commit()
+    return result
+
+
+def _get_executor(registry):
+    """Return the threads pool shared by the batch requests of the process."""
+    with _executor_lock:
+        executor = getattr(registry, "batch_executor", None)
+        if executor is None:
+            max_workers = int(registry.settings["batch_max_workers"])
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            registry.batch_executor = executor
+    return executor
@@ -21,8 +21,8 @@ def account_check(username, password, request):
 
     # Username and password have been verified previously. No need to compare hashes
     if cache_result == hashed_password:
-        # Refresh the cache TTL.
-        cache.expire(cache_key, cache_ttl)
+        # Refresh the cache TTL (the value is known, no need to read it again).
+        cache.set(cache_key, hashed_password, ttl=cache_ttl)
         return True
 
     # Back to standard procedure
@@ -2,7 +2,6 @@ import colander
 from pyramid import httpexceptions
 from pyramid.decorator import reify
 from pyramid.security import Authenticated, Everyone
-from pyramid.settings import aslist
 from pyramid.events import subscriber
 
 from kinto.views import NameGenerator
@@ -44,10 +43,10 @@ class Account(resource.ShareableResource):
 
     def __init__(self, request, context):
         # Store if current user is administrator (before accessing get_parent_id())
-        allowed_from_settings = request.registry.settings.get("account_write_principals", [])
-        context.is_administrator = (
-            len(set(aslist(allowed_from_settings)) & set(request.prefixed_principals)) > 0
-        )
+        settings_principals = request.registry.settings_principals
+        allowed_from_settings = settings_principals.get(("account", "write"), frozenset())
+        principals = request.prefixed_principals
+        context.is_administrator = not allowed_from_settings.isdisjoint(principals)
         # Shortcut to check if current is anonymous (before get_parent_id()).
         context.is_anonymous = Authenticated not in request.effective_principals
 
@@ -87,7 +87,8 @@ def on_resource_changed(event):
     read_principals.update(collection_perms.get("read", []))
     read_principals.update(collection_perms.get("write", []))
 
-    # Create a history entry for each impacted record.
+    # Prepare a history entry for each impacted record.
+    entries = []
     for (uri, target) in targets:
         obj_id = target["id"]
         # Prepare the history entry attributes.
@@ -98,22 +99,29 @@ def on_resource_changed(event):
         eventattrs[f"{resource_name}_id"] = obj_id
         eventattrs["uri"] = uri
         attrs = dict(
+            id=storage.id_generator(),
             date=datetime.now().isoformat(),
             target={"data": target, "permissions": perms},
             **eventattrs,
         )
-
-        # Create a record for the 'history' resource, whose parent_id is
-        # the bucket URI (c.f. views.py).
-        # Note: this will be rolledback if the transaction is rolledback.
-        entry = storage.create(parent_id=bucket_uri, collection_id="history", record=attrs)
-
+        entries.append((attrs, perms))
+
+    # Create the records for the 'history' resource at once, whose parent_id is
+    # the bucket URI (c.f. views.py). On batch requests, events are grouped and
+    # this writes the history of every subrequest in one operation.
+    # Note: this will be rolledback if the transaction is rolledback.
+    storage.update_many(
+        parent_id=bucket_uri, collection_id="history", records=[attrs for (attrs, _) in entries]
+    )
+
+    entries_perms = {}
+    for (attrs, perms) in entries:
         # The read permission on the newly created history entry is the union
         # of the record permissions with the one from bucket and collection.
         entry_principals = set(read_principals)
         entry_principals.update(perms.get("read", []))
         entry_principals.update(perms.get("write", []))
-        entry_perms = {"read": list(entry_principals)}
         # /buckets/{id}/history is the URI for the list of history entries.
-        entry_perm_id = f"/buckets/{bucket_id}/history/{entry['id']}"
-        permission.replace_object_permissions(entry_perm_id, entry_perms)
+        entry_perm_id = f"/buckets/{bucket_id}/history/{attrs['id']}"
+        entries_perms[entry_perm_id] = {"read": list(entry_principals)}
+    permission.replace_objects_permissions(entries_perms)
@@ -40,7 +40,8 @@ def on_buckets_deleted(event):
         # and descending children objects (eg. records).
         for pattern in (bucket_uri, bucket_uri + "/*"):
             storage.delete_all(parent_id=pattern, collection_id=None, with_deleted=False)
-            # Remove remaining tombstones too.
-            storage.purge_deleted(parent_id=pattern, collection_id=None)
+            # Remove remaining tombstones too, and the objects beyond the
+            # maximum number of objects deleted by ``delete_all()``.
+            storage.purge_deleted(parent_id=pattern, collection_id=None, with_live=True)
             # Remove related permissions
             permission.delete_object_permissions(pattern)
@@ -55,5 +55,5 @@ def on_collections_deleted(event):
             event.request, "collection", bucket_id=bucket_id, id=collection["id"]
         )
         storage.delete_all(collection_id=None, parent_id=parent_id, with_deleted=False)
-        storage.purge_deleted(collection_id=None, parent_id=parent_id)
+        storage.purge_deleted(collection_id=None, parent_id=parent_id, with_live=True)
         permission.delete_object_permissions(parent_id + "/*")
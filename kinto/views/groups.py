@@ -83,10 +83,10 @@ def on_groups_changed(event):
         new_members = new_record_members - existing_record_members
         removed_members = existing_record_members - new_record_members
 
-        for member in new_members:
-            # Add the group to the member principal.
-            permission_backend.add_user_principal(member, group_uri)
+        # Add the group to the new members principals.
+        if new_members:
+            permission_backend.add_user_principals(new_members, group_uri)
 
-        for member in removed_members:
-            # Remove the group from the member principal.
-            permission_backend.remove_user_principal(member, group_uri)
+        # Remove the group from the removed members principals.
+        if removed_members:
+            permission_backend.remove_user_principals(removed_members, group_uri)
@@ -1,15 +1,16 @@
 import colander
-from pyramid.settings import aslist
 
-from kinto.authorization import PERMISSIONS_INHERITANCE_TREE
+from kinto.authorization import PERMISSIONS_INHERITANCE_TREE, descending_permissions_tree
 from kinto.core import utils as core_utils, resource
 from kinto.core.storage import Sort
 from kinto.core.storage.memory import extract_record_set
+from kinto.core.storage.utils import paginated
 
 
-def allowed_from_settings(settings, principals):
+def allowed_from_settings(settings_principals, principals):
     """Returns every permissions allowed from settings for the current user.
-    :param settings dict: app settings
+    :param settings_principals dict: principals allowed from settings, by
+        resource name and permission (see ``registry.settings_principals``)
     :param principals list: list of principals of current user
     :rtype: dict
 
@@ -22,15 +23,13 @@ def allowed_from_settings(settings, principals):
 
     XXX: This helper will be useful for Kinto/kinto#894
     """
-    perms_settings = {k: aslist(v) for k, v in settings.items() if k.endswith("_principals")}
     from_settings = {}
-    for key, allowed_principals in perms_settings.items():
-        resource_name, permission, _ = key.split("_")
+    for (resource_name, permission), allowed_principals in settings_principals.items():
         # Keep the known permissions only.
         if resource_name not in PERMISSIONS_INHERITANCE_TREE.keys():
             continue
         # Keep the permissions of the current user only.
-        if not bool(set(principals) & set(allowed_principals)):
+        if allowed_principals.isdisjoint(principals):
             continue
         # ``collection_create_principals`` means ``collection:create`` in bucket.
         if permission == "create":
@@ -67,15 +66,8 @@ class PermissionsModel:
         include_deleted=False,
         parent_id=None,
     ):
-        # Invert the permissions inheritance tree.
-        perms_descending_tree = {}
-        for on_resource, tree in PERMISSIONS_INHERITANCE_TREE.items():
-            for obtained_perm, obtained_from in tree.items():
-                for from_resource, perms in obtained_from.items():
-                    for perm in perms:
-                        perms_descending_tree.setdefault(from_resource, {}).setdefault(
-                            perm, {}
-                        ).setdefault(on_resource, set()).add(obtained_perm)
+        # Inverted permissions inheritance tree.
+        perms_descending_tree = descending_permissions_tree()
 
         # Obtain current principals.
         principals = self.request.prefixed_principals
@@ -85,43 +77,57 @@ class PermissionsModel:
         perms_by_object_uri = backend.get_accessible_objects(principals)
 
         # Check settings for every allowed resources.
-        from_settings = allowed_from_settings(self.request.registry.settings, principals)
+        settings_principals = self.request.registry.settings_principals
+        from_settings = allowed_from_settings(settings_principals, principals)
 
         # Add additional resources and permissions defined in settings/plugins
-        for root_perm in from_settings.get("root", []):
-            resource_name, _ = root_perm.split(":")
+        root_perms = from_settings.get("root", set())
+        for root_perm in root_perms:
             perms_by_object_uri.setdefault("/", set()).add(root_perm)
-            perms_descending_tree.setdefault("root", {}).update({root_perm: {"root": {root_perm}}})
 
         # Expand permissions obtained from backend with the object URIs that
         # correspond to permissions allowed from settings.
+        # Resource name and matchdict of these objects are already known.
+        known_objects = {}
         allowed_resources = {"bucket", "collection", "group"} & set(from_settings.keys())
         if allowed_resources:
             storage = self.request.registry.storage
-            every_bucket, _ = storage.get_all(parent_id="", collection_id="bucket")
+            sorting = [Sort("id", 1)]
+            every_bucket = paginated(
+                storage, collection_id="bucket", parent_id="", sorting=sorting
+            )
             for bucket in every_bucket:
                 bucket_uri = "/buckets/{id}".format_map(bucket)
-                for res in allowed_resources:
-                    resource_perms = from_settings[res]
-                    # Bucket is always fetched.
-                    if res == "bucket":
-                        perms_by_object_uri.setdefault(bucket_uri, set()).update(resource_perms)
-                        continue
-                    # Fetch bucket collections and groups.
-                    # XXX: wrong approach: query in a loop!
-                    every_subobjects, _ = storage.get_all(parent_id=bucket_uri, collection_id=res)
+                if "bucket" in allowed_resources:
+                    known_objects[bucket_uri] = ("bucket", {"id": bucket["id"]})
+                    perms_by_object_uri.setdefault(bucket_uri, set()).update(
+                        from_settings["bucket"]
+                    )
+                # XXX: wrong approach: query in a loop!
+                for res in allowed_resources - {"bucket"}:
+                    every_subobjects = paginated(
+                        storage, collection_id=res, parent_id=bucket_uri, sorting=sorting
+                    )
                     for subobject in every_subobjects:
                         subobj_uri = bucket_uri + f"/{res}s/{subobject['id']}"
-                        perms_by_object_uri.setdefault(subobj_uri, set()).update(resource_perms)
+                        matchdict = {"bucket_id": bucket["id"], "id": subobject["id"]}
+                        known_objects[subobj_uri] = (res, matchdict)
+                        perms_by_object_uri.setdefault(subobj_uri, set()).update(
+                            from_settings[res]
+                        )
 
         entries = []
         for object_uri, perms in perms_by_object_uri.items():
-            try:
-                # Obtain associated res from object URI
-                resource_name, matchdict = core_utils.view_lookup(self.request, object_uri)
-            except ValueError:
-                # Skip permissions entries that are not linked to an object URI
-                continue
+            if object_uri in known_objects:
+                resource_name, matchdict = known_objects[object_uri]
+                matchdict = {**matchdict}
+            else:
+                try:
+                    # Obtain associated res from object URI
+                    resource_name, matchdict = core_utils.view_lookup(self.request, object_uri)
+                except ValueError:
+                    # Skip permissions entries that are not linked to an object URI
+                    continue
 
             # For consistency with event payloads, if resource has an id,
             # prefix it with its resource name
@@ -136,6 +142,9 @@ class PermissionsModel:
             # Expand implicit permissions using descending tree.
             permissions = set(perms)
             for perm in perms:
+                if resource_name == "root" and perm in root_perms:
+                    # Root permissions from settings do not grant others.
+                    continue
                 obtained = perms_descending_tree[resource_name][perm]
                 # Related to same resource only and not every sub-objects.
                 # (e.g "bucket:write" gives "bucket:read" but not "group:read")
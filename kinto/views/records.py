@@ -100,6 +100,41 @@ class Record(resource.ShareableResource):
         self._handle_cache_expires(self.request.response)
         return result
 
+    def delete(self):
+        result = super().delete()
+        self._purge_expired_tombstones()
+        return result
+
+    def collection_delete(self):
+        result = super().collection_delete()
+        self._purge_expired_tombstones()
+        return result
+
+    def _purge_expired_tombstones(self):
+        """If a ``record_tombstones_retention_seconds`` setting is defined for
+        the parent collection, then the tombstones older than this retention
+        are purged, by chunks of ``record_tombstones_purge_batch_size``.
+        """
+        setting = "record_tombstones_retention_seconds"
+        by_collection = f"{self.bucket_id}.{self.collection_id}.{setting}"
+        by_bucket = f"{self.bucket_id}.{setting}"
+        settings = self.request.registry.settings
+        for s in (by_collection, by_bucket, setting):
+            retention = settings.get(s)
+            if retention is not None:
+                break
+        else:
+            return
+
+        before = utils.msec_time() - int(retention) * 1000
+        self.model.storage.purge_deleted(
+            collection_id=self.model.collection_id,
+            parent_id=self.model.parent_id,
+            before=before,
+            limit=int(settings["record_tombstones_purge_batch_size"]),
+            auth=self.model.auth,
+        )
+
     def _handle_cache_expires(self, response):
         """If the parent collection defines a ``cache_expires`` attribute,
         then cache-control response headers are sent.
@@ -0,0 +1,39 @@
+"""Compare the expansion of permissions from the LRU with their expansion
+from the compiled tree (about 0.2µs vs 3µs per call, vs 13µs before the
+tree was compiled).
+
+Run with ``python tests/benchmark_authorization.py``.
+"""
+import timeit
+
+from kinto import authorization
+
+
+OBJECT_URIS = [
+    "/buckets/blog",
+    "/buckets/blog/collections/articles",
+    "/buckets/blog/collections/articles/records",
+    "/buckets/blog/collections/articles/records/article1",
+]
+PERMISSIONS = ("read", "write")
+NUMBER = 2000
+
+
+def expand_all(cached):
+    for object_uri in OBJECT_URIS:
+        for permission in PERMISSIONS:
+            if not cached:
+                authorization._cached_inherited_permissions.cache_clear()
+            authorization._inherited_permissions(object_uri, permission)
+
+
+def main():
+    calls = NUMBER * len(OBJECT_URIS) * len(PERMISSIONS)
+    for cached in (False, True):
+        duration = min(timeit.repeat(lambda: expand_all(cached), number=NUMBER, repeat=5))
+        label = "cached" if cached else "compiled"
+        print(f"{label}: {duration / calls * 1e6:.2f}µs per call")
+
+
+if __name__ == "__main__":
+    main()
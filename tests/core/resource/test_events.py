@@ -352,6 +352,16 @@ class BatchEventsTest(BaseEventTest, unittest.TestCase):
         self.app.post_json("/batch", body, headers=self.headers)
         self.assertEqual(len(self.events), 3)
 
+    def test_read_events_of_concurrent_subrequests_are_merged_in_order(self):
+        body = {
+            "defaults": {"method": "GET"},
+            "requests": [{"path": "/mushrooms"}, {"path": "/psilos"}, {"path": "/mushrooms"}],
+        }
+        self.app.post_json("/batch", body, headers=self.headers)
+        self.assertEqual(len(self.events), 2)
+        self.assertEqual(self.events[0].payload["resource_name"], "mushroom")
+        self.assertEqual(self.events[1].payload["resource_name"], "psilo")
+
     def test_events_are_not_sent_if_subrequest_fails(self):
         patch = mock.patch.object(self.storage, "delete_all", side_effect=BackendError("boom"))
         patch.start()
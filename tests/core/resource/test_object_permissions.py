@@ -157,6 +157,26 @@ class SpecifyRecordPermissionTest(PermissionTest):
         self.assertNotIn("read", result["permissions"])
         self.assertEqual(sorted(result["permissions"]["write"]), ["basicauth:bob", "jean-louis"])
 
+    def test_permissions_are_not_read_from_backend_on_post(self):
+        self.resource.request.method = "POST"
+        self.resource.context.object_uri = "/articles"
+        self.resource.request.validated["body"] = {"data": {}, "permissions": {"read": ["jean"]}}
+        with mock.patch.object(self.permission, "get_objects_permissions") as mocked:
+            result = self.resource.collection_post()
+        self.assertFalse(mocked.called)
+        self.assertEqual(result["permissions"], {"read": ["jean"], "write": ["basicauth:bob"]})
+
+    def test_permissions_are_not_read_again_from_backend_on_patch(self):
+        self.resource.request.validated["body"] = {"permissions": {"write": ["jean-louis"]}}
+        self.resource.request.method = "PATCH"
+        get_objects_permissions = self.permission.get_objects_permissions
+        with mock.patch.object(
+            self.permission, "get_objects_permissions", wraps=get_objects_permissions
+        ) as mocked:
+            self.resource.patch()
+        # Existing record, and current permissions to merge with the new ones.
+        self.assertEqual(mocked.call_count, 2)
+
     def test_412_errors_do_not_put_permission_in_record(self):
         self.resource.request.validated["header"] = {"If-Match": 1234567}  # invalid
         try:
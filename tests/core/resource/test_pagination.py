@@ -75,6 +75,18 @@ class PaginationTest(BasePaginationTest):
         self.assertIn("_limit", queryparams)
         self.assertIn("_token", queryparams)
 
+    def test_total_records_is_omitted_if_storage_does_not_count(self):
+        self.storage.count_mode = "disabled"
+        self.validated["querystring"] = {"_limit": 5}
+        self.resource.collection_get()
+        self.assertNotIn("Total-Records", self.last_response.headers)
+
+    def test_next_page_url_is_given_if_storage_does_not_count(self):
+        self.storage.count_mode = "disabled"
+        self.validated["querystring"] = {"_limit": 10}
+        self.resource.collection_get()
+        self.assertIn("Next-Page", self.last_response.headers)
+
     def test_next_page_url_gives_distinct_records(self):
         self.validated["querystring"] = {"_limit": 10}
         results1 = self.resource.collection_get()
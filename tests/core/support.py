@@ -117,7 +117,7 @@ class PostgreSQLTest(BaseWebTest):
 
     def run_failing_post(self):
         patch = mock.patch.object(
-            self.permission, "add_principal_to_ace", side_effect=BackendError("boom")
+            self.permission, "replace_objects_permissions", side_effect=BackendError("boom")
         )
         self.addCleanup(patch.stop)
         patch.start()
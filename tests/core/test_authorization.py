@@ -3,8 +3,14 @@ from unittest import mock
 from pyramid.request import Request
 
 from kinto.core import utils
-from kinto.core.authorization import RouteFactory, AuthorizationPolicy, groupfinder
-from kinto.core.storage import exceptions as storage_exceptions
+from kinto.core.authorization import (
+    RouteFactory,
+    AuthorizationPolicy,
+    groupfinder,
+    settings_principals,
+)
+from kinto.core.permission import PermissionBase
+from kinto.core.storage import AccessibleBy, exceptions as storage_exceptions
 from kinto.core.testing import DummyRequest, unittest
 
 
@@ -104,6 +110,7 @@ class RouteFactoryTest(unittest.TestCase):
 
     def test_fetch_shared_records_uses_pattern_if_on_collection(self):
         request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = False
         request.route_path.return_value = "/v1/buckets/%2A"
         service = mock.MagicMock()
         service.type = "collection"
@@ -120,6 +127,7 @@ class RouteFactoryTest(unittest.TestCase):
 
     def test_fetch_shared_records_uses_get_bound_permission_callback(self):
         request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = False
         service = mock.MagicMock()
         request.route_path.return_value = "/v1/buckets/%2A"
         service.type = "collection"
@@ -140,6 +148,7 @@ class RouteFactoryTest(unittest.TestCase):
 
     def test_fetch_shared_records_sets_shared_ids_from_results(self):
         request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = False
         context = RouteFactory(request)
         request.registry.permission.get_accessible_objects.return_value = {
             "/obj/1": ["read", "write"],
@@ -150,6 +159,7 @@ class RouteFactoryTest(unittest.TestCase):
 
     def test_fetch_shared_records_sets_shared_ids_if_empty(self):
         request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = False
         context = RouteFactory(request)
         request.registry.permission.get_accessible_objects.return_value = {}
 
@@ -157,16 +167,165 @@ class RouteFactoryTest(unittest.TestCase):
 
         self.assertEqual(context.shared_ids, [])
 
+    def test_fetch_shared_records_returns_filter_if_storage_supports_it(self):
+        request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = True
+        request.registry.permission.has_accessible_objects.return_value = True
+        context = RouteFactory(request)
+        context._object_id_match = "/buckets/*"
+
+        context.fetch_shared_records("read", ["userid"], None)
+
+        request.registry.permission.get_accessible_objects.assert_not_called()
+        request.registry.permission.has_accessible_objects.assert_called_with(
+            ["userid"], [("/buckets/*", "read")], with_children=False
+        )
+        self.assertEqual(context.shared_ids, AccessibleBy(["userid"], [("/buckets/*", "read")]))
+
+    def test_fetch_shared_records_sets_shared_ids_if_nothing_is_accessible(self):
+        request = DummyRequest()
+        request.registry.storage.supports_accessible_by.return_value = True
+        request.registry.permission.has_accessible_objects.return_value = False
+        context = RouteFactory(request)
+        context._object_id_match = "/buckets/*"
+
+        context.fetch_shared_records("read", ["userid"], None)
+
+        self.assertEqual(context.shared_ids, [])
+
     def test_permits_takes_route_factory_allowed_principals_into_account_for_object_creation(self):
         request = DummyRequest()
         context = RouteFactory(request)
         context._check_permission.return_value = False
         context.resource_name = "book"
         context.required_permission = "book:create"
-        context._settings = {"book_create_principals": "fxa:user"}
+        context._settings_principals = {("book", "create"): frozenset(["fxa:user"])}
         self.assertTrue(context.check_permission(["fxa:user"], None))
 
 
+class SettingsPrincipalsTest(unittest.TestCase):
+    def test_principals_are_parsed_by_resource_and_permission(self):
+        parsed = settings_principals(
+            {
+                "bucket_create_principals": "system.Authenticated account:admin",
+                "account_write_principals": ["account:admin"],
+                "some_resource_read_principals": "fxa:user",
+                "bucket_write_principals": "",
+                "kinto.bucket_read_principals": "fxa:user",
+                "principals": "fxa:user",
+                "readonly": False,
+            }
+        )
+        self.assertEqual(
+            dict(parsed),
+            {
+                ("bucket", "create"): frozenset(["system.Authenticated", "account:admin"]),
+                ("account", "write"): frozenset(["account:admin"]),
+                ("some_resource", "read"): frozenset(["fxa:user"]),
+            },
+        )
+
+    def test_parsed_principals_cannot_be_modified(self):
+        parsed = settings_principals({"bucket_create_principals": "fxa:user"})
+        with self.assertRaises(TypeError):
+            parsed[("bucket", "read")] = frozenset(["fxa:user"])
+
+    def test_route_factory_does_not_parse_settings(self):
+        request = DummyRequest()
+        request.registry.settings = {"bucket_create_principals": "fxa:user"}
+        request.registry.settings_principals = settings_principals(request.registry.settings)
+        context = RouteFactory(request)
+        context.resource_name = "bucket"
+        with mock.patch("kinto.core.authorization.aslist") as mocked:
+            self.assertTrue(context.check_permission(["fxa:user"], [("/buckets/a", "create")]))
+        self.assertFalse(mocked.called)
+
+
+class PermissionDecisionsCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.request = DummyRequest()
+        self.request.current_resource_name = "article"
+        self.request.registry.permission.writes_count = 0
+        self.request.registry.permission.check_permission.return_value = True
+        self.bound_perms = [("/articles/1", "read"), ("/articles/1", "write")]
+
+    def test_permission_backend_is_queried_once_per_request(self):
+        context = RouteFactory(self.request)
+        self.assertTrue(context.check_permission(["a", "b"], self.bound_perms))
+        # Same principals and permissions in a different order.
+        self.assertTrue(context.check_permission(["b", "a"], self.bound_perms[::-1]))
+        self.assertEqual(self.request.registry.permission.check_permission.call_count, 1)
+
+    def test_decisions_are_shared_by_contexts_of_the_same_request(self):
+        RouteFactory(self.request).check_permission(["a"], self.bound_perms)
+        RouteFactory(self.request).check_permission(["a"], self.bound_perms)
+        self.assertEqual(self.request.registry.permission.check_permission.call_count, 1)
+
+    def test_decisions_depend_on_principals_and_permissions(self):
+        context = RouteFactory(self.request)
+        context.check_permission(["a"], self.bound_perms)
+        context.check_permission(["b"], self.bound_perms)
+        context.check_permission(["a"], self.bound_perms[:1])
+        self.assertEqual(self.request.registry.permission.check_permission.call_count, 3)
+
+    def test_decisions_are_invalidated_when_permissions_are_modified(self):
+        context = RouteFactory(self.request)
+        context.check_permission(["a"], self.bound_perms)
+        self.request.registry.permission.writes_count += 1
+        context.check_permission(["a"], self.bound_perms)
+        self.assertEqual(self.request.registry.permission.check_permission.call_count, 2)
+
+    def test_missing_decisions_are_queried_at_once(self):
+        other_perms = [("/articles/2", "read")]
+        backend = self.request.registry.permission
+        backend.check_permissions.return_value = [False, True]
+        context = RouteFactory(self.request)
+        context.check_permission(["a"], self.bound_perms)
+
+        allowed = context._cached_check_permissions(
+            ["a"], [self.bound_perms, other_perms, [("/articles/3", "read")], other_perms]
+        )
+
+        self.assertEqual(allowed, [True, False, True, False])
+        backend.check_permissions.assert_called_once_with(
+            ["a"], [other_perms, [("/articles/3", "read")]]
+        )
+        self.assertFalse(context.check_permission(["a"], other_perms))
+        self.assertEqual(backend.check_permission.call_count, 1)
+
+    def test_decisions_are_not_cached_if_backend_does_not_count_writes(self):
+        class UncountedPermission(PermissionBase):
+            """Like third-party backends, written before writes were counted."""
+
+            def __init__(self):
+                self.acls = {}
+
+            def check_permission(self, principals, bound_permissions):
+                return any(
+                    not set(principals).isdisjoint(self.acls.get(obj, {}).get(perm, ()))
+                    for obj, perm in bound_permissions
+                )
+
+            def replace_object_permissions(self, object_id, permissions):
+                self.acls[object_id] = permissions
+
+        backend = UncountedPermission()
+        backend.replace_object_permissions("/articles/1", {"read": {"a"}})
+        self.request.registry.permission = backend
+        context = RouteFactory(self.request)
+        self.assertTrue(context.check_permission(["a"], self.bound_perms))
+        backend.replace_object_permissions("/articles/1", {"read": set()})
+        self.assertFalse(context.check_permission(["a"], self.bound_perms))
+
+    def test_hits_and_misses_are_sent_to_statsd(self):
+        context = RouteFactory(self.request)
+        context.check_permission(["a"], self.bound_perms)
+        context.check_permission(["a"], self.bound_perms)
+        statsd = self.request.registry.statsd
+        statsd.count.assert_any_call("authorization.decisions.misses")
+        statsd.count.assert_any_call("authorization.decisions.hits")
+
+
 class AuthorizationPolicyTest(unittest.TestCase):
     def setUp(self):
         self.authz = AuthorizationPolicy()
@@ -244,7 +403,7 @@ class AuthorizationPolicyTest(unittest.TestCase):
     def test_permits_takes_route_factory_allowed_principals_into_account(self):
         self.context.resource_name = "record"
         self.context.required_permission = "create"
-        self.context._settings = {"record_create_principals": "fxa:user"}
+        self.context._settings_principals = {("record", "create"): frozenset(["fxa:user"])}
         allowed = self.authz.permits(self.context, self.principals, "dynamic")
         self.context._check_permission.assert_not_called()
         self.assertTrue(allowed)
@@ -2,12 +2,15 @@ import time
 import unittest
 from unittest import mock
 
+from pyramid.exceptions import ConfigurationError
+
 from kinto.core.utils import sqlalchemy, memcache
 from kinto.core.cache import (
     CacheBase,
     memory as memory_backend,
     memcached as memcached_backend,
     postgresql as postgresql_backend,
+    tiered as tiered_backend,
 )
 from kinto.core.cache.testing import CacheTest
 from kinto.core.testing import skip_if_no_postgresql, skip_if_no_memcached
@@ -26,6 +29,9 @@ class CacheBaseTest(unittest.TestCase):
             (self.cache.get, ""),
             (self.cache.set, "", "", 42),
             (self.cache.delete, ""),
+            (self.cache.get_many, [""]),
+            (self.cache.set_many, {"": ""}, 42),
+            (self.cache.delete_many, [""]),
         ]
         for call in calls:
             self.assertRaises(NotImplementedError, *call)
@@ -39,8 +45,7 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
         backend_prefix = CacheTest.get_backend_prefix(self, prefix)
 
         # Share the store between both client for tests.
-        backend_prefix._ttl = self.cache._ttl
-        backend_prefix._store = self.cache._store
+        backend_prefix._stripes = self.cache._stripes
 
         return backend_prefix
 
@@ -55,28 +60,62 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
 
     def test_clean_expired_expires_items(self):
         self.cache.set("foobar", "toto", 0.01)
-        assert "foobar" in self.cache._store
-        assert "foobar" in self.cache._ttl
-        assert "foobar" in self.cache._created_at
+        stripe = self.cache._get_stripe("foobar")
+        assert "foobar" in stripe.store
+        assert "foobar" in stripe.ttl
         time.sleep(0.02)
-        retrieved = self.cache._clean_expired()
-        assert "foobar" not in self.cache._store
-        assert "foobar" not in self.cache._ttl
-        assert "foobar" not in self.cache._created_at
+        retrieved = self.cache._clean_expired(stripe)
+        assert "foobar" not in stripe.store
+        assert "foobar" not in stripe.ttl
+        assert stripe.size == 0
         self.assertIsNone(retrieved)
 
+    def test_clean_expired_skips_outdated_expirations(self):
+        self.cache.set("foobar", "toto", 0.01)
+        self.cache.expire("foobar", 42)
+        time.sleep(0.02)
+        assert self.cache.get("foobar") == "toto"
+
+    def test_expirations_heap_does_not_grow_with_updates(self):
+        for x in range(1000):
+            self.cache.set("foobar", "toto", 42)
+        stripe = self.cache._get_stripe("foobar")
+        assert len(stripe.expirations) <= 2 * len(stripe.ttl) + 64
+
+    def test_expire_ignores_unknown_keys(self):
+        self.cache.expire("foobar", 42)
+        assert self.cache.ttl("foobar") == -1
+
     def test_add_over_quota_clean_oversized_items(self):
+        self.cache.stripes = 1
+        self.cache.flush()
         for x in range(100):
             # Each entry is 70 bytes
             self.cache.set("foo{0:03d}".format(x), "toto", 42)
-            time.sleep(0.001)
-        assert self.cache.get("foo000") == "toto"
-        # This should delete the 2 first entries
+        # This should delete the 21 least recently used entries
         self.cache.set("foobar", "tata", 42)
         assert self.cache._quota == 7000 - 70 * 20
-        assert self.cache.get("foo000") is None
+        assert self.cache.get("foo020") is None
+        assert self.cache.get("foo021") == "toto"
         assert self.cache.get("foobar") == "tata"
 
+    def test_recently_read_items_are_not_evicted(self):
+        self.cache.stripes = 1
+        self.cache.flush()
+        for x in range(100):
+            self.cache.set("foo{0:03d}".format(x), "toto", 42)
+        assert self.cache.get("foo000") == "toto"
+        self.cache.set("foobar", "tata", 42)
+        assert self.cache.get("foo000") == "toto"
+        assert self.cache.get("foo001") is None
+
+    def test_quota_is_shared_among_stripes(self):
+        for x in range(1000):
+            self.cache.set("foo{0:03d}".format(x), "toto", 42)
+        # Stripes are cleaned before inserting, hence one entry of margin.
+        for stripe in self.cache._stripes:
+            assert stripe.size < 7000 / len(self.cache._stripes) + 70
+
     def test_size_quota_can_be_set_to_zero(self):
         before = self.cache.max_size_bytes
         self.cache.max_size_bytes = 0
@@ -85,6 +124,91 @@ class MemoryCacheTest(CacheTest, unittest.TestCase):
         assert self.cache.get("foobar") == "tata"
 
 
+class TieredCacheTest(CacheTest, unittest.TestCase):
+    backend = tiered_backend
+    settings = {
+        "cache_prefix": "",
+        "cache_max_size_bytes": 7000,
+        "cache_tiered_backend": "kinto.core.cache.memory",
+        "cache_tiered_ttl_seconds": 5,
+    }
+
+    def get_backend_prefix(self, prefix):
+        backend_prefix = CacheTest.get_backend_prefix(self, prefix)
+
+        # Share both tiers between both client for tests.
+        backend_prefix.local._stripes = self.cache.local._stripes
+        backend_prefix.backend._stripes = self.cache.backend._stripes
+
+        return backend_prefix
+
+    def test_backend_error_is_raised_anywhere(self):
+        pass
+
+    def test_ping_returns_false_if_unavailable(self):
+        pass
+
+    def test_ping_logs_error_if_unavailable(self):
+        pass
+
+    def test_tiered_backend_setting_is_mandatory(self):
+        settings = {**self.settings, "cache_tiered_backend": ""}
+        with self.assertRaises(ConfigurationError):
+            self.backend.load_from_config(self._get_config(settings=settings))
+
+    def test_tiered_backend_cannot_be_tiered(self):
+        settings = {**self.settings, "cache_tiered_backend": "kinto.core.cache.tiered"}
+        with self.assertRaises(ConfigurationError):
+            self.backend.load_from_config(self._get_config(settings=settings))
+
+    def test_values_are_read_from_memory_once_fetched(self):
+        self.cache.backend.set("foobar", "toto", 42)
+        self.assertEqual(self.cache.get("foobar"), "toto")
+        with mock.patch.object(self.cache.backend, "get_many") as mocked:
+            self.assertEqual(self.cache.get("foobar"), "toto")
+            self.assertFalse(mocked.called)
+
+    def test_values_are_kept_in_memory_for_a_short_time(self):
+        self.cache.local_ttl = 0.01
+        self.cache.set("foobar", "toto", 42)
+        self.cache.backend.set("foobar", "tata", 42)
+        self.assertEqual(self.cache.get("foobar"), "toto")
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get("foobar"), "tata")
+
+    def test_writes_and_deletions_go_through_both_tiers(self):
+        self.cache.set_many({"foo": "a", "bar": "b"}, 42)
+        self.assertEqual(self.cache.local.get_many(["foo", "bar"]), ["a", "b"])
+        self.assertEqual(self.cache.backend.get_many(["foo", "bar"]), ["a", "b"])
+        self.assertEqual(self.cache.delete("foo"), "a")
+        self.assertIsNone(self.cache.local.get("foo"))
+        self.assertIsNone(self.cache.backend.get("foo"))
+
+    def test_expire_removes_the_value_from_memory(self):
+        self.cache.set("foobar", "toto", 42)
+        self.cache.expire("foobar", 10)
+        self.assertIsNone(self.cache.local.get("foobar"))
+        self.assertGreater(self.cache.ttl("foobar"), 5)
+
+    def test_hits_are_counted_by_tier(self):
+        self.cache.backend.set_many({"foo": "a", "bar": "b"}, 42)
+        self.cache.get_many(["foo", "unknown"])
+        self.cache.get_many(["foo", "bar"])
+        self.assertEqual(self.cache.hits, {"l1": 1, "l2": 2, "miss": 1})
+        self.assertEqual(self.cache.hit_ratios(), {"l1": 0.25, "l2": 0.5})
+
+    def test_hit_ratios_are_zero_without_reads(self):
+        self.assertEqual(self.cache.hit_ratios(), {"l1": 0.0, "l2": 0.0})
+
+    def test_hits_are_sent_to_statsd(self):
+        self.cache.statsd = mock.MagicMock()
+        self.cache.set("foobar", "toto", 42)
+        self.cache.get("foobar")
+        self.cache.get("unknown")
+        self.cache.statsd.count.assert_any_call("cache.tiered.l1")
+        self.cache.statsd.count.assert_any_call("cache.tiered.miss")
+
+
 @skip_if_no_memcached
 class MemcachedCacheTest(CacheTest, unittest.TestCase):
     backend = memcached_backend
@@ -125,3 +249,47 @@ class PostgreSQLCacheTest(CacheTest, unittest.TestCase):
         self.client_error_patcher = mock.patch.object(
             self.cache.client, "session_factory", side_effect=sqlalchemy.exc.SQLAlchemyError
         )
+
+    def count_entries(self):
+        with self.cache.client.connect(readonly=True) as conn:
+            return conn.execute("SELECT COUNT(*) AS total FROM cache;").fetchone()["total"]
+
+    def test_get_does_not_delete_expired_entries(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("foobar"))
+        self.assertEqual(self.count_entries(), 1)
+
+    def test_expired_entries_are_not_returned_by_ttl_or_expire(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.cache.expire("foobar", 42)
+        self.assertEqual(self.cache.ttl("foobar"), -1)
+        self.assertIsNone(self.cache.get("foobar"))
+
+    def test_set_purges_expired_entries(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.cache._next_purge = 0
+        self.cache.set("foo", "bar", 42)
+        self.assertEqual(self.count_entries(), 1)
+
+    def test_purge_is_throttled(self):
+        self.cache.set("foobar", "toto", 0.01)
+        time.sleep(0.02)
+        self.cache.set("foo", "bar", 42)
+        self.assertEqual(self.count_entries(), 2)
+
+    def test_purge_expired_deletes_by_batches(self):
+        self.cache.purge_batch_size = 2
+        for x in range(3):
+            self.cache.set(f"foo{x}", "toto", 0.01)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.purge_expired(), 2)
+        self.assertEqual(self.cache.purge_expired(), 1)
+        self.assertEqual(self.count_entries(), 0)
+
+    def test_purge_interval_can_be_configured(self):
+        settings = {**self.settings, "cache_purge_interval_seconds": "0"}
+        cache = self.backend.load_from_config(self._get_config(settings=settings))
+        self.assertEqual(cache.purge_interval, 0)
@@ -8,6 +8,7 @@ from pyramid.exceptions import ConfigurationError
 
 import kinto.core
 from kinto.core import initialization
+from kinto.core.cache import tiered as tiered_cache
 from kinto.core.testing import unittest
 
 
@@ -279,6 +280,13 @@ class StatsDConfigurationTest(unittest.TestCase):
         c = initialization.setup_statsd(self.config)
         c.watch_execution_time.assert_any_call({}, prefix="backend")
 
+    def test_statsd_is_set_on_tiered_cache(self):
+        self.config.registry.cache = tiered_cache.Cache(
+            local=mock.MagicMock(), backend=mock.MagicMock(), local_ttl=5, cache_prefix=""
+        )
+        c = initialization.setup_statsd(self.config)
+        self.assertEqual(self.config.registry.cache.statsd, c)
+
     def test_statsd_is_set_on_storage(self):
         c = initialization.setup_statsd(self.config)
         c.watch_execution_time.assert_any_call({}, prefix="backend")
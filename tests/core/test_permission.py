@@ -1,9 +1,15 @@
 import unittest
 from unittest import mock
 
+import transaction
+
+from pyramid.exceptions import ConfigurationError
+
+from kinto.core.cache import memory as memory_cache
 from kinto.core.utils import sqlalchemy
 from kinto.core.permission import (
     PermissionBase,
+    cached as cached_backend,
     memory as memory_backend,
     postgresql as postgresql_backend,
 )
@@ -48,6 +54,182 @@ class MemoryPermissionTest(PermissionTest, unittest.TestCase):
     def test_ping_logs_error_if_unavailable(self):
         pass
 
+    def test_indexes_are_cleaned_when_aces_are_removed(self):
+        self.permission.add_principal_to_ace("/url/a", "write", "user1")
+        self.permission.replace_object_permissions("/url/b", {"read": ["user1", "user2"]})
+        self.permission.remove_principal_from_ace("/url/a", "write", "user1")
+        self.permission.delete_object_permissions("/url/b")
+        self.assertEqual(self.permission._aces, {})
+        self.assertEqual(self.permission._principals_aces, {})
+        self.assertEqual(self.permission._object_ids, [])
+
+    def test_many_objects_can_be_deleted_by_pattern(self):
+        for i in range(100):
+            self.permission.add_principal_to_ace(f"/url/a/id/{i}", "write", "user1")
+            self.permission.add_principal_to_ace(f"/url/b/id/{i}", "write", "user1")
+        self.permission.delete_object_permissions("/url/a/*")
+        self.assertEqual(len(self.permission._object_ids), 100)
+        self.assertEqual(len(self.permission.get_accessible_objects(["user1"])), 100)
+
+    def test_accessible_objects_by_prefix_or_by_principals_are_the_same(self):
+        for i in range(10):
+            self.permission.add_principal_to_ace(f"/url/a/id/{i}", "write", f"user{i}")
+        for i in range(100):
+            self.permission.add_principal_to_ace(f"/url/b/id/{i}", "write", "user1")
+        bound_perms = [("/url/a/id/*", "write")]
+        # Few ACEs for user3: its ACEs are scanned.
+        result = self.permission.get_accessible_objects(["user3"], bound_perms)
+        self.assertEqual(result, {"/url/a/id/3": {"write"}})
+        # Many ACEs for user1: the object ids starting with the prefix are scanned.
+        result = self.permission.get_accessible_objects(["user1"], bound_perms)
+        self.assertEqual(result, {"/url/a/id/1": {"write"}})
+
+    def test_patterns_special_characters_are_escaped(self):
+        self.permission.add_principal_to_ace("/url/a.b", "write", "user1")
+        self.permission.add_principal_to_ace("/url/axb", "write", "user1")
+        self.permission.delete_object_permissions("/url/a.*")
+        self.assertEqual(
+            self.permission.get_accessible_objects(["user1"]), {"/url/axb": {"write"}}
+        )
+
+
+class CachedPermissionTest(PermissionTest, unittest.TestCase):
+    backend = cached_backend
+    settings = {
+        "permission_cached_backend": "kinto.core.permission.memory",
+        "permission_cache_ttl_seconds": 3600,
+    }
+
+    def _get_config(self):
+        config = super()._get_config()
+        config.registry.cache = memory_cache.Cache(cache_prefix="", cache_max_size_bytes=524_288)
+        return config
+
+    def test_backend_error_is_raised_anywhere(self):
+        pass
+
+    def test_ping_returns_false_if_unavailable(self):
+        pass
+
+    def test_ping_logs_error_if_unavailable(self):
+        pass
+
+    def test_load_from_config_requires_a_cache_backend(self):
+        config = super()._get_config()
+        with self.assertRaises(ConfigurationError):
+            cached_backend.load_from_config(config)
+
+    def test_load_from_config_requires_a_wrapped_backend(self):
+        config = self._get_config()
+        config.add_settings({"permission_cached_backend": ""})
+        with self.assertRaises(ConfigurationError):
+            cached_backend.load_from_config(config)
+
+    def test_object_permissions_are_read_from_cache(self):
+        self.permission.add_principal_to_ace("/buckets/a", "read", "alice")
+        self.assertTrue(self.permission.check_permission(["alice"], [("/buckets/a", "read")]))
+        with mock.patch.object(self.permission.backend, "get_objects_permissions") as mocked:
+            self.assertTrue(self.permission.check_permission(["alice"], [("/buckets/a", "read")]))
+            self.assertEqual(
+                self.permission.get_object_permissions("/buckets/a"), {"read": {"alice"}}
+            )
+            self.assertFalse(mocked.called)
+
+    def test_user_principals_are_read_from_cache(self):
+        self.permission.add_user_principal("alice", "group")
+        self.assertEqual(self.permission.get_user_principals("alice"), {"group"})
+        with mock.patch.object(self.permission.backend, "get_user_principals") as mocked:
+            self.assertEqual(self.permission.get_user_principals("alice"), {"group"})
+            self.assertFalse(mocked.called)
+
+    def test_changes_invalidate_the_whole_bucket_only(self):
+        self.permission.add_principal_to_ace("/buckets/a/groups/g", "read", "alice")
+        self.permission.add_principal_to_ace("/buckets/b", "read", "alice")
+        self.permission.get_objects_permissions(["/buckets/a/groups/g", "/buckets/b"])
+
+        self.permission.replace_object_permissions("/buckets/a", {"write": ["bob"]})
+
+        with mock.patch.object(
+            self.permission.backend, "get_objects_permissions", return_value=[{}]
+        ) as mocked:
+            self.permission.get_objects_permissions(["/buckets/a/groups/g", "/buckets/b"])
+            mocked.assert_called_with(["/buckets/a/groups/g"])
+
+    def test_acls_of_several_objects_are_read_from_cache_at_once(self):
+        objects_ids = ["/buckets/a", "/buckets/a/groups/g", "/buckets/b"]
+        self.permission.get_objects_permissions(objects_ids)
+        with mock.patch.object(
+            self.permission.cache, "get_many", wraps=self.permission.cache.get_many
+        ) as mocked:
+            self.permission.get_objects_permissions(objects_ids)
+            # Once for the versions, once for the ACLs.
+            self.assertEqual(mocked.call_count, 2)
+
+    def test_authenticated_principals_changes_invalidate_every_user(self):
+        self.assertEqual(self.permission.get_user_principals("alice"), set())
+        self.permission.add_user_principal("system.Authenticated", "group")
+        self.assertEqual(self.permission.get_user_principals("alice"), {"group"})
+
+    def test_principals_changes_of_several_users_invalidate_them_only(self):
+        self.permission.get_user_principals("alice")
+        self.permission.get_user_principals("bob")
+        self.permission.add_user_principals(["alice"], "group")
+        with mock.patch.object(
+            self.permission.backend, "get_user_principals", return_value=set()
+        ) as mocked:
+            self.permission.get_user_principals("alice")
+            self.permission.get_user_principals("bob")
+            mocked.assert_called_once_with("alice")
+
+    def test_principals_changes_of_many_users_invalidate_every_user(self):
+        user_ids = [f"user{i}" for i in range(cached_backend.MAX_USERS_INVALIDATIONS + 1)]
+        self.permission.get_user_principals("alice")
+        with mock.patch.object(self.permission.cache, "delete") as mocked:
+            self.permission.add_user_principals(user_ids, "group")
+            self.assertFalse(mocked.called)
+        self.assertEqual(self.permission.get_user_principals("user1"), {"group"})
+        self.permission.remove_user_principals(user_ids, "group")
+        self.assertEqual(self.permission.get_user_principals("user1"), set())
+
+    def test_cache_is_invalidated_again_when_transaction_is_committed(self):
+        with mock.patch.object(self.permission.cache, "set") as mocked:
+            self.permission.add_principal_to_ace("/buckets/a", "read", "alice")
+            self.assertEqual(mocked.call_count, 1)
+            transaction.commit()
+            self.assertEqual(mocked.call_count, 2)
+
+    def test_acls_read_before_transaction_is_aborted_are_not_read_again(self):
+        self.permission.add_principal_to_ace("/buckets/a", "write", "mallory")
+        self.permission.get_object_permission_principals("/buckets/a", "write")
+        transaction.abort()
+        backend = self.permission.backend
+        with mock.patch.object(
+            backend, "get_objects_permissions", wraps=backend.get_objects_permissions
+        ) as mocked:
+            self.permission.get_object_permission_principals("/buckets/a", "write")
+            mocked.assert_called_with(["/buckets/a"])
+
+    def test_cache_is_invalidated_again_when_savepoint_is_rolled_back(self):
+        savepoint = transaction.savepoint()
+        self.permission.add_principal_to_ace("/buckets/a", "read", "alice")
+        with mock.patch.object(self.permission.cache, "set") as mocked:
+            savepoint.rollback()
+            self.assertEqual(mocked.call_count, 1)
+
+    def test_stale_acls_are_not_read_when_versions_are_evicted(self):
+        self.permission.add_principal_to_ace("/buckets/a", "read", "alice")
+        self.permission.get_object_permissions("/buckets/a")
+        self.permission.cache.delete("permission:version:/buckets/a")
+        self.permission.cache.delete("permission:version")
+        self.permission.get_object_permissions("/buckets/a")
+        # Permissions change while the versions are evicted again.
+        self.permission.backend.add_principal_to_ace("/buckets/a", "read", "bob")
+        self.permission.cache.delete("permission:version:/buckets/a")
+        self.permission.cache.delete("permission:version")
+        self.assertEqual(
+            self.permission.get_object_permissions("/buckets/a"), {"read": {"alice", "bob"}}
+        )
+
 
 @skip_if_no_postgresql
 class PostgreSQLPermissionTest(PermissionTest, unittest.TestCase):
@@ -67,3 +249,51 @@ class PostgreSQLPermissionTest(PermissionTest, unittest.TestCase):
                 side_effect=sqlalchemy.exc.SQLAlchemyError,
             )
         ]
+
+    def count_aces(self):
+        with self.permission.client.connect(readonly=True) as conn:
+            return conn.execute("SELECT COUNT(*) FROM access_control_entries;").scalar()
+
+    def defer_in_transaction(self, objects_permissions):
+        # Permissions are deferred only if the client commits on requests end.
+        self.addCleanup(transaction.abort)
+        with mock.patch.object(self.permission.client, "commit_manually", False):
+            self.permission.defer_objects_permissions(objects_permissions)
+
+    def test_deferred_permissions_are_written_at_once_on_commit(self):
+        self.defer_in_transaction({"/url/a/id/1": {"write": ["user1"]}})
+        self.defer_in_transaction({"/url/a/id/2": {"write": ["user2"], "read": ["user1"]}})
+        self.assertEqual(self.count_aces(), 0)
+
+        replace = self.permission.replace_objects_permissions
+        with mock.patch.object(
+            self.permission, "replace_objects_permissions", wraps=replace
+        ) as mocked:
+            transaction.commit()
+        mocked.assert_called_once_with(
+            {
+                "/url/a/id/1": {"write": ["user1"]},
+                "/url/a/id/2": {"write": ["user2"], "read": ["user1"]},
+            }
+        )
+        self.assertEqual(self.count_aces(), 3)
+
+    def test_deferred_permissions_are_discarded_on_abort(self):
+        self.defer_in_transaction({"/url/a/id/1": {"write": ["user1"]}})
+        transaction.abort()
+        transaction.commit()
+        self.assertEqual(self.count_aces(), 0)
+
+    def test_deferred_permissions_are_written_before_reading_them(self):
+        self.defer_in_transaction({"/url/a/id/1": {"write": ["user1"]}})
+
+        self.permission.get_object_permissions("/url/a/id/2")
+        self.permission.check_permission({"user1"}, [("/url/a/id/2", "write")])
+        self.assertEqual(self.count_aces(), 0)
+
+        self.permission.check_permission({"user1"}, [("/url/a/id/1", "write")])
+        self.assertEqual(self.count_aces(), 1)
+
+    def test_permissions_are_not_deferred_without_transaction(self):
+        self.permission.defer_objects_permissions({"/url/a/id/1": {"write": ["user1"]}})
+        self.assertEqual(self.count_aces(), 1)
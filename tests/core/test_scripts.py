@@ -149,3 +149,75 @@ class RebuildQuotasTest(unittest.TestCase):
             code = scripts.rebuild_quotas({"registry": self.registry})
             assert code == 0
             mocked.assert_called_with(self.registry.storage, dry_run=False)
+
+
+class IndexesTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = mock.MagicMock()
+        self.registry.settings = {}
+
+    def test_indexes_in_read_only_display_an_error(self):
+        with mock.patch("kinto.core.scripts.logger") as mocked:
+            self.registry.settings["readonly"] = "true"
+            code = scripts.indexes({"registry": self.registry}, create=True)
+            assert code == 51
+            mocked.error.assert_any_call("Cannot manage indexes while in readonly mode.")
+
+    def test_indexes_with_other_backends_display_an_error(self):
+        self.registry.storage = object()
+        with mock.patch("kinto.core.scripts.logger") as mocked:
+            code = scripts.indexes({"registry": self.registry})
+            assert code == 52
+            mocked.error.assert_any_call(
+                "Indexes can only be managed with the PostgreSQL storage backend."
+            )
+
+    def test_indexes_shows_fields_stats(self):
+        stat = dict(parent_id="/buckets/a", collection_id="c", field="f", hits=3, index=None)
+        self.registry.storage.get_fields_stats.return_value = [stat]
+        with mock.patch("kinto.core.scripts.logger") as mocked:
+            code = scripts.indexes({"registry": self.registry}, limit=5)
+            assert code == 0
+            mocked.info.assert_called_with("/buckets/a/c f: 3 hits (not indexed)")
+        self.registry.storage.get_fields_stats.assert_called_with(limit=5)
+
+    def test_indexes_creates_and_drops_indexes(self):
+        storage = self.registry.storage
+        storage.create_fields_indexes.return_value = ["idx_a"]
+        storage.drop_fields_indexes.return_value = ["idx_a"]
+        with mock.patch("kinto.core.scripts.logger") as mocked:
+            scripts.indexes({"registry": self.registry}, create=True, limit=2, dry_run=True)
+            storage.create_fields_indexes.assert_called_with(limit=2, dry_run=True)
+            mocked.info.assert_called_with("Index idx_a created.")
+
+            scripts.indexes({"registry": self.registry}, drop=True)
+            storage.drop_fields_indexes.assert_called_with(dry_run=False)
+            mocked.info.assert_called_with("Index idx_a dropped.")
+
+
+class PurgeTombstonesTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = mock.MagicMock()
+        self.registry.settings = {}
+
+    def test_purge_in_read_only_display_an_error(self):
+        with mock.patch("kinto.core.scripts.logger") as mocked:
+            self.registry.settings["readonly"] = "true"
+            code = scripts.purge_tombstones({"registry": self.registry}, older_than=7)
+            assert code == 61
+            mocked.error.assert_any_call("Cannot purge tombstones while in readonly mode.")
+
+    def test_purge_deletes_tombstones_by_batches_and_commits_each(self):
+        self.registry.storage.purge_deleted.side_effect = [2, 2, 1]
+        with mock.patch("kinto.core.scripts.current_transaction") as transaction:
+            with mock.patch("kinto.core.scripts.utils.msec_time", return_value=10 * 86400000):
+                with mock.patch("kinto.core.scripts.logger") as mocked:
+                    code = scripts.purge_tombstones(
+                        {"registry": self.registry}, older_than=3, batch_size=2
+                    )
+        assert code == 0
+        assert transaction.commit.call_count == 3
+        self.registry.storage.purge_deleted.assert_called_with(
+            collection_id=None, parent_id="*", before=7 * 86400000, limit=2
+        )
+        mocked.info.assert_called_with("5 tombstone(s) older than 3 day(s) were purged.")
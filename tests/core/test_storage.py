@@ -4,7 +4,8 @@ import pytest
 
 from kinto.core.utils import COMPARISON, sqlalchemy
 from kinto.core.storage import generators, memory, postgresql, exceptions, StorageBase
-from kinto.core.storage import Filter, Sort, MISSING
+from kinto.core.storage import AccessibleBy, Filter, Sort, MISSING
+from kinto.core.permission import memory as memory_permission, postgresql as postgresql_permission
 from kinto.core.storage.testing import StorageTest
 from kinto.core.storage.utils import paginated
 from kinto.core.testing import unittest, skip_if_no_postgresql
@@ -98,6 +99,19 @@ class MemoryStorageTest(StorageTest, unittest.TestCase):
     def test_backend_error_provides_original_exception(self):
         pass
 
+    def test_get_all_does_not_count_if_disabled_in_settings(self):
+        config = self._get_config(settings={**self.settings, "storage_count_mode": "disabled"})
+        storage = self.backend.load_from_config(config)
+        storage.create(record={}, **self.storage_kw)
+        records, count = storage.get_all(**self.storage_kw)
+        self.assertEqual(len(records), 1)
+        self.assertIsNone(count)
+
+    def test_unknown_count_mode_raises_at_load(self):
+        config = self._get_config(settings={**self.settings, "storage_count_mode": "roughly"})
+        with self.assertRaises(ValueError):
+            self.backend.load_from_config(config)
+
     def test_raises_backend_error_if_error_occurs_on_client(self):
         pass
 
@@ -162,6 +176,22 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
         self.assertEqual(count, 4)
         self.assertEqual(len(results), 2)
 
+    def test_purge_deleted_with_live_removes_records_beyond_max_fetch_size(self):
+        for i in range(5):
+            self.create_record({"number": i})
+
+        settings = {**self.settings, "storage_max_fetch_size": 2}
+        limited = self.backend.load_from_config(self._get_config(settings=settings))
+
+        # Like when a collection is deleted.
+        parent_id = self.storage_kw["parent_id"]
+        limited.delete_all(parent_id=parent_id, collection_id=None, with_deleted=False)
+        limited.purge_deleted(parent_id=parent_id, collection_id=None, with_live=True)
+
+        records, count = limited.get_all(include_deleted=True, **self.storage_kw)
+        self.assertEqual(records, [])
+        self.assertEqual(count, 0)
+
     def test_number_of_fetched_records_is_per_page(self):
         for i in range(10):
             self.create_record({"number": i})
@@ -176,6 +206,172 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
         self.assertEqual(count, 10)
         self.assertEqual(len(results), 2)
 
+    def test_supports_accessible_by_if_permission_backend_shares_its_client(self):
+        settings = {"permission_url": self.settings["storage_url"]}
+        permission = postgresql_permission.load_from_config(self._get_config(settings=settings))
+        self.assertTrue(self.storage.supports_accessible_by(permission))
+        self.assertFalse(self.storage.supports_accessible_by(memory_permission.Permission()))
+
+    def test_get_all_can_filter_records_accessible_by_principals(self):
+        settings = {"permission_url": self.settings["storage_url"]}
+        permission = postgresql_permission.load_from_config(self._get_config(settings=settings))
+        permission.initialize_schema()
+        self.addCleanup(permission.flush)
+        records = [self.create_record({"number": i}) for i in range(4)]
+        permission.add_principal_to_ace(f"/articles/{records[0]['id']}", "read", "alice")
+        permission.add_principal_to_ace(f"/articles/{records[1]['id']}", "write", "bob")
+        permission.add_principal_to_ace(f"/articles/{records[2]['id']}", "read", "bob")
+        permission.add_principal_to_ace(f"/articles/{records[3]['id']}/sub", "read", "bob")
+        permission.add_principal_to_ace(f"/other/{records[3]['id']}", "read", "bob")
+
+        accessible = AccessibleBy(
+            ["system.Everyone", "bob"],
+            [("/articles", "write"), ("/articles/*", "write"), ("/articles/*", "read")],
+        )
+        filters = [Filter("id", accessible, COMPARISON.IN)]
+        results, count = self.storage.get_all(filters=filters, **self.storage_kw)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(r["number"] for r in results), [1, 2])
+
+    def test_delete_all_can_filter_records_accessible_by_principals(self):
+        settings = {"permission_url": self.settings["storage_url"]}
+        permission = postgresql_permission.load_from_config(self._get_config(settings=settings))
+        permission.initialize_schema()
+        self.addCleanup(permission.flush)
+        records = [self.create_record({"number": i}) for i in range(3)]
+        permission.add_principal_to_ace(f"/articles/{records[1]['id']}", "write", "bob")
+
+        accessible = AccessibleBy(["bob"], [("/articles/*", "write")])
+        filters = [Filter("id", accessible, COMPARISON.IN)]
+        deleted = self.storage.delete_all(filters=filters, **self.storage_kw)
+
+        self.assertEqual([r["id"] for r in deleted], [records[1]["id"]])
+
+    def test_accessible_by_without_pattern_matches_nothing(self):
+        self.create_record()
+        accessible = AccessibleBy(["bob"], [("/articles", "write")])
+        filters = [Filter("id", accessible, COMPARISON.IN)]
+        results, count = self.storage.get_all(filters=filters, **self.storage_kw)
+        self.assertEqual(results, [])
+
+    def test_records_writes_advance_the_collection_clock_row(self):
+        for i in range(3):
+            record = self.create_record({"number": i})
+        self.storage.delete(object_id=record["id"], **self.storage_kw)
+        self.storage.purge_deleted(**self.storage_kw)
+
+        with self.storage.client.connect() as conn:
+            query = "SELECT last_modified FROM timestamps WHERE collection_id = 'test';"
+            clock = conn.execute(query).fetchone()["last_modified"]
+        self.assertGreater(clock, record["last_modified"])
+        self.assertEqual(self.storage.collection_timestamp(**self.storage_kw), clock)
+
+    def test_pagination_rules_of_descending_sorts_use_row_values(self):
+        rules = [
+            [Filter("flavor", "mint", COMPARISON.EQ), Filter("last_modified", 42, COMPARISON.LT)],
+            [Filter("flavor", "mint", COMPARISON.LT)],
+        ]
+        sql, holders = self.storage._format_pagination(rules, "id", "last_modified")
+        expected = (
+            "(data->:keyset_field_0_0, last_modified) "
+            "< ((:keyset_value_0)::JSONB, :keyset_value_1)"
+        )
+        self.assertEqual(sql, expected)
+        self.assertEqual(holders["keyset_value_0"], '"mint"')
+
+    def test_pagination_rules_with_missing_values_are_not_row_values(self):
+        rules = [
+            [Filter("flavor", MISSING, COMPARISON.EQ), Filter("last_modified", 42, COMPARISON.LT)],
+            [Filter("flavor", MISSING, COMPARISON.LT)],
+        ]
+        sql, _ = self.storage._format_pagination(rules, "id", "last_modified")
+        self.assertIn(" OR ", sql)
+
+    def test_pagination_rules_of_ascending_sorts_use_row_values_on_columns_only(self):
+        rules = [
+            [Filter("id", "abc", COMPARISON.EQ), Filter("last_modified", 42, COMPARISON.GT)],
+            [Filter("id", "abc", COMPARISON.GT)],
+        ]
+        sql, _ = self.storage._format_pagination(rules, "id", "last_modified")
+        self.assertEqual(sql, "(id, last_modified) > (:keyset_value_0, :keyset_value_1)")
+
+        rules[0][0] = Filter("flavor", "mint", COMPARISON.EQ)
+        rules[1][0] = Filter("flavor", "mint", COMPARISON.GT)
+        sql, _ = self.storage._format_pagination(rules, "id", "last_modified")
+        self.assertIn(" OR ", sql)
+
+    def test_fields_are_not_counted_by_default(self):
+        self.storage.fields_stats_flush_size = 1
+        self.storage.get_all(filters=[Filter("flavor", "mint", COMPARISON.EQ)], **self.storage_kw)
+        self.assertEqual(self.storage.get_fields_stats(), [])
+
+    def test_fields_used_in_filters_and_sorting_are_counted(self):
+        settings = {**self.settings, "storage_index_advisor": "true"}
+        storage = self.backend.load_from_config(self._get_config(settings=settings))
+        storage.fields_stats_flush_size = 3
+        filters = [Filter("flavor", "mint", COMPARISON.EQ), Filter("id", "a", COMPARISON.EQ)]
+        sorting = [Sort("size.height", 1), Sort("last_modified", -1)]
+        storage.get_all(filters=filters, sorting=sorting, **self.storage_kw)
+        storage.get_all(filters=filters[:1], **self.storage_kw)
+
+        stats = storage.get_fields_stats()
+        self.assertEqual(
+            [(s["field"], s["hits"], s["index"]) for s in stats],
+            [("flavor", 2, None), ("size.height", 1, None)],
+        )
+
+    def test_fields_stats_are_written_outside_of_the_current_transaction(self):
+        self.storage.index_advisor = True
+        self.storage.fields_stats_flush_size = 1
+        client = self.storage.client
+        with mock.patch.object(client, "connect", wraps=client.connect) as mocked:
+            self.storage.get_all(sorting=[Sort("flavor", 1)], **self.storage_kw)
+
+        self.assertTrue(all(kwargs.get("readonly") for _, kwargs in mocked.call_args_list))
+        self.assertEqual(self.storage.get_fields_stats()[0]["hits"], 1)
+
+    def test_fields_stats_write_errors_do_not_fail_listings(self):
+        self.storage.index_advisor = True
+        self.storage.fields_stats_flush_size = 1
+        error = exceptions.BackendError("Connection refused.")
+        with mock.patch.object(self.storage.client, "connect_detached", side_effect=error):
+            self.storage.get_all(sorting=[Sort("flavor", 1)], **self.storage_kw)
+        self.assertEqual(self.storage.get_fields_stats(), [])
+
+    def test_expression_indexes_are_created_for_most_used_fields(self):
+        self.storage.index_advisor = True
+        self.storage.fields_stats_flush_size = 1
+        for _ in range(2):
+            self.storage.get_all(sorting=[Sort("flavor", 1)], **self.storage_kw)
+        self.storage.get_all(sorting=[Sort("size", 1)], **self.storage_kw)
+
+        planned = self.storage.create_fields_indexes(limit=1, dry_run=True)
+        self.assertIsNone(self.storage.get_fields_stats()[0]["index"])
+        created = self.storage.create_fields_indexes(limit=1)
+        self.assertEqual(planned, created)
+        try:
+            self.assertEqual(len(created), 1)
+            stats = self.storage.get_fields_stats()
+            self.assertEqual(stats[0]["index"], created[0])
+            self.assertIsNone(stats[1]["index"])
+
+            # The planner matches the index expression of filters.
+            with self.storage.client.connect() as conn:
+                conn.execute("SET LOCAL enable_seqscan = off;")
+                plan = conn.execute(
+                    """
+                EXPLAIN SELECT * FROM records
+                 WHERE parent_id = :parent_id AND collection_id = :collection_id
+                   AND data->:field = :value;
+                """,
+                    dict(field="flavor", value='"mint"', **self.storage_kw),
+                ).fetchall()
+            self.assertIn(created[0], " ".join(row[0] for row in plan))
+        finally:
+            self.assertEqual(self.storage.drop_fields_indexes(), created)
+        self.assertIsNone(self.storage.get_fields_stats()[0]["index"])
+
     def test_connection_is_rolledback_if_error_occurs(self):
         with self.storage.client.connect() as conn:
             query = "DELETE FROM records WHERE collection_id = 'genre';"
@@ -184,13 +380,13 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
         try:
             with self.storage.client.connect() as conn:
                 query = """
-                INSERT INTO records VALUES ('rock-and-roll', 'music', 'genre', NOW(), '{}', FALSE);
+                INSERT INTO records VALUES ('rock-and-roll', 'music', 'genre', 1546300800000, '{}', FALSE);
                 """
                 conn.execute(query)
                 conn.commit()
 
                 query = """
-                INSERT INTO records VALUES ('jazz', 'music', 'genre', NOW(), '{}', FALSE);
+                INSERT INTO records VALUES ('jazz', 'music', 'genre', 1546300800000, '{}', FALSE);
                 """
                 conn.execute(query)
 
@@ -235,11 +431,11 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
                 conn.execute(
                     """
                 INSERT INTO records
-                VALUES ('rock-and-roll', 'music', 'genre', NOW(), '{}', FALSE);
+                VALUES ('rock-and-roll', 'music', 'genre', 1546300800000, '{}', FALSE);
                 """
                 )
                 # Go into a failing integrity constraint.
-                query = "INSERT INTO timestamps VALUES ('a', 'b', NOW());"
+                query = "INSERT INTO timestamps VALUES ('a', 'b', 1546300800000);"
                 conn.execute(query)
                 conn.execute(query)
                 conn.commit()
@@ -256,6 +452,80 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
             )
         self.assertEqual(result.rowcount, 0)
 
+    def test_count_is_read_from_counters_table_without_filters(self):
+        for i in range(3):
+            self.create_record({"number": i})
+        with self.storage.client.connect() as conn:
+            conn.execute("UPDATE counters SET total = 42;")
+
+        _, count = self.storage.get_all(**self.storage_kw)
+        self.assertEqual(count, 42)
+        _, count = self.storage.get_all(
+            filters=[Filter("number", 1, COMPARISON.MIN)], **self.storage_kw
+        )
+        self.assertEqual(count, 2)
+
+    def test_counters_are_maintained_on_create_update_delete_and_purge(self):
+        def counter():
+            query = """
+            SELECT total FROM counters
+             WHERE parent_id = :parent_id AND collection_id = :collection_id;
+            """
+            with self.storage.client.connect() as conn:
+                result = conn.execute(query, self.storage_kw)
+                return result.fetchone()["total"]
+
+        records = [self.create_record({"number": i}) for i in range(4)]
+        self.assertEqual(counter(), 4)
+        self.storage.update(object_id=records[0]["id"], record={"a": 1}, **self.storage_kw)
+        self.assertEqual(counter(), 4)
+        self.storage.delete(object_id=records[0]["id"], **self.storage_kw)
+        self.assertEqual(counter(), 3)
+        self.storage.create(record={"id": records[0]["id"]}, **self.storage_kw)
+        self.assertEqual(counter(), 4)
+        self.storage.delete(object_id=records[1]["id"], with_deleted=False, **self.storage_kw)
+        self.assertEqual(counter(), 3)
+        self.storage.delete_all(limit=2, **self.storage_kw)
+        self.assertEqual(counter(), 1)
+        self.storage.purge_deleted(**self.storage_kw)
+        with self.storage.client.connect() as conn:
+            result = conn.execute("SELECT COUNT(*) AS total FROM records WHERE NOT deleted;")
+            self.assertEqual(counter(), result.fetchone()["total"])
+
+    def test_count_ignores_filters_if_estimated_in_settings(self):
+        for i in range(3):
+            self.create_record({"number": i})
+        settings = {**self.settings, "storage_count_mode": "estimated"}
+        storage = self.backend.load_from_config(self._get_config(settings=settings))
+
+        _, count = storage.get_all(
+            filters=[Filter("number", 1, COMPARISON.MIN)], **self.storage_kw
+        )
+        self.assertEqual(count, 3)
+
+    def test_get_all_does_not_count_if_disabled_in_settings(self):
+        for i in range(3):
+            self.create_record({"number": i})
+        settings = {**self.settings, "storage_count_mode": "disabled"}
+        storage = self.backend.load_from_config(self._get_config(settings=settings))
+
+        records, count = storage.get_all(limit=2, **self.storage_kw)
+        self.assertEqual(len(records), 2)
+        self.assertIsNone(count)
+
+    def test_count_from_counters_is_an_integer(self):
+        for i in range(3):
+            self.create_record({"number": i})
+
+        _, count = self.storage.get_all(**self.storage_kw)
+        self.assertEqual(count, 3)
+        self.assertIs(type(count), int)
+
+    def test_unknown_count_mode_raises_at_load(self):
+        settings = {**self.settings, "storage_count_mode": "roughly"}
+        with self.assertRaises(ValueError):
+            self.backend.load_from_config(self._get_config(settings=settings))
+
     def test_conflicts_handled_correctly(self):
         config = self._get_config()
         storage = self.backend.load_from_config(config)
@@ -271,6 +541,55 @@ class PostgreSQLStorageTest(StorageTest, unittest.TestCase):
                 )
 
 
+@skip_if_no_postgresql
+class PreparedStatementsPostgreSQLStorageTest(PostgreSQLStorageTest):
+    settings = {**PostgreSQLStorageTest.settings, "storage_statement_cache_size": 2}
+
+    def prepared_statements(self):
+        with self.storage.client.connect(readonly=True) as conn:
+            result = conn.execute("SELECT statement FROM pg_prepared_statements;")
+            return [row["statement"] for row in result.fetchall()]
+
+    def test_statements_of_the_same_shape_are_prepared_once(self):
+        self.create_record({"number": 1})
+        self.storage.statements.hits = self.storage.statements.misses = 0
+        for number in range(3):
+            filters = [Filter("number", number, COMPARISON.GT)]
+            self.storage.get_all(filters=filters, **self.storage_kw)
+        self.assertEqual(self.storage.statements.info(), {"hits": 2, "misses": 1})
+
+    def test_statements_are_executed_with_their_values(self):
+        for number in range(3):
+            self.create_record({"number": number})
+        filters = [Filter("number", (0, 2), COMPARISON.IN)]
+        records, count = self.storage.get_all(filters=filters, **self.storage_kw)
+        self.assertEqual(sorted(r["number"] for r in records), [0, 2])
+        self.assertEqual(count, 2)
+
+    def test_least_recently_used_statements_are_deallocated(self):
+        def get_all(operator):
+            filters = [Filter("number", 1, operator)]
+            self.storage.get_all(filters=filters, **self.storage_kw)
+
+        for operator in (COMPARISON.EQ, COMPARISON.GT, COMPARISON.LT):
+            get_all(operator)
+        self.assertEqual(len(self.prepared_statements()), 2)
+
+        self.storage.statements.hits = self.storage.statements.misses = 0
+        get_all(COMPARISON.LT)
+        get_all(COMPARISON.EQ)
+        self.assertEqual(self.storage.statements.info(), {"hits": 1, "misses": 1})
+        self.assertEqual(len(self.prepared_statements()), 2)
+
+    def test_statements_with_arrays_are_not_prepared(self):
+        self.create_record({"tags": ["a", "b"]})
+        self.storage.statements.hits = self.storage.statements.misses = 0
+        filters = [Filter("tags", ["b", "c"], COMPARISON.CONTAINS_ANY)]
+        records, _ = self.storage.get_all(filters=filters, **self.storage_kw)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(self.storage.statements.info(), {"hits": 0, "misses": 0})
+
+
 class PaginatedTest(unittest.TestCase):
     def setUp(self):
         self.storage = mock.Mock()
@@ -7,7 +7,7 @@ from pyramid import testing
 
 from kinto.core.cache import postgresql as postgresql_cache
 from kinto.core.permission import postgresql as postgresql_permission
-from kinto.core.storage import postgresql as postgresql_storage
+from kinto.core.storage import Sort, postgresql as postgresql_storage
 from kinto.core.storage.postgresql.migrator import MigratorMixin
 from kinto.core.testing import skip_if_no_postgresql
 
@@ -100,6 +100,8 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         DROP TABLE IF EXISTS records CASCADE;
         DROP TABLE IF EXISTS deleted CASCADE;
         DROP TABLE IF EXISTS metadata CASCADE;
+        DROP TABLE IF EXISTS counters CASCADE;
+        DROP TABLE IF EXISTS timestamps CASCADE;
         DROP FUNCTION IF EXISTS resource_timestamp(VARCHAR, VARCHAR);
         DROP FUNCTION IF EXISTS collection_timestamp(VARCHAR, VARCHAR);
         DROP FUNCTION IF EXISTS bump_timestamp();
@@ -237,6 +239,8 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         # Only the record remains.
         assert len(records) == 1
         assert count == 1
+        # Its timestamp was converted to epoch.
+        assert records[0]["last_modified"] == 123456
 
     def test_migration_18_merges_tombstones(self):
         self._delete_everything()
@@ -284,6 +288,49 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         assert count == 1
         assert records[0]["drink"] == "mate"
 
+    def test_migration_22_bumps_timestamps_of_the_same_millisecond(self):
+        self._delete_everything()
+        last_version = postgresql_storage.Storage.schema_version
+
+        self._load_schema("schema/postgresql-storage-11.sql")
+        # Schema 11 is essentially the same as schema 17
+        postgresql_storage.Storage.schema_version = 17
+        with self.storage.client.connect() as conn:
+            conn.execute(
+                """
+            UPDATE metadata SET value = '17'
+            WHERE name = 'storage_schema_version';
+            """
+            )
+
+        # Microseconds timestamps, that fall in the same milliseconds.
+        insert_query = """
+        INSERT INTO records (id, parent_id, collection_id, data, last_modified)
+        VALUES (:id, 'jean-louis', 'test', '{}', (:last_modified)::TIMESTAMP)
+        """
+        timestamps = [
+            ("a", "2018-11-20 10:00:00.000100"),
+            ("b", "2018-11-20 10:00:00.000200"),
+            ("c", "2018-11-20 10:00:00.000300"),
+            ("d", "2018-11-20 10:00:00.001100"),
+            ("e", "2018-11-20 10:00:00.010000"),
+        ]
+        with self.storage.client.connect() as conn:
+            for record_id, last_modified in timestamps:
+                conn.execute(insert_query, dict(id=record_id, last_modified=last_modified))
+
+        # Execute the 021 to 022 migration (and others)
+        postgresql_storage.Storage.schema_version = last_version
+        self.storage.initialize_schema()
+
+        records, _ = self.storage.get_all("test", "jean-louis", sorting=[Sort("id", 1)])
+        epoch = 1542708000000
+        self.assertEqual([r["last_modified"] - epoch for r in records], [0, 1, 2, 3, 10])
+
+        # The collection clock is above the bumped timestamps.
+        r = self.storage.create("test", "jean-louis", {})
+        self.assertGreater(r["last_modified"], epoch + 10)
+
 
 @skip_if_no_postgresql
 class PostgresqlPermissionMigrationTest(unittest.TestCase):
@@ -1,10 +1,14 @@
 import colander
+import threading
 import uuid
 import unittest
 from unittest import mock
 
+from pyramid import httpexceptions
 from pyramid.response import Response
 
+from kinto.core import errors
+from kinto.core.views import batch as batch_views
 from kinto.core.views.batch import BatchPayloadSchema, batch as batch_service
 from kinto.core.testing import DummyRequest
 from kinto.core.utils import json
@@ -133,6 +137,82 @@ class BatchViewTest(BaseWebTest, unittest.TestCase):
         record = response["body"]["data"]
         self.assertEqual(record["name"], "Trompette de la mort")
 
+    def subrequests_threads(self, body):
+        threads = []
+        run_subrequest = batch_views._run_subrequest
+
+        def recorded(request, subrequest):
+            threads.append((subrequest.method, threading.get_ident()))
+            return run_subrequest(request, subrequest)
+
+        with mock.patch.object(batch_views, "_run_subrequest", side_effect=recorded):
+            resp = self.app.post_json("/batch", body, headers=self.headers)
+        return resp.json["responses"], threads
+
+    def test_read_only_subrequests_run_concurrently_in_order(self):
+        ids = []
+        for name in ("a", "b", "c"):
+            resp = self.app.post_json("/mushrooms", {"data": {"name": name}}, headers=self.headers)
+            ids.append(resp.json["data"]["id"])
+        body = {"requests": [{"path": f"/mushrooms/{id_}"} for id_ in ids]}
+        responses, threads = self.subrequests_threads(body)
+        self.assertEqual([r["body"]["data"]["id"] for r in responses], ids)
+        self.assertNotIn(threading.get_ident(), [thread for _, thread in threads])
+
+    def test_subrequests_after_a_write_run_in_sequence(self):
+        record_url = "/mushrooms/{}".format(uuid.uuid4())
+        body = {
+            "requests": [
+                {"path": "/mushrooms"},
+                {"path": "/mushrooms"},
+                {"method": "PUT", "path": record_url, "body": {"data": {"name": "a"}}},
+                {"path": record_url},
+            ]
+        }
+        responses, threads = self.subrequests_threads(body)
+        self.assertEqual(responses[3]["body"]["data"]["name"], "a")
+        main_thread = threading.get_ident()
+        self.assertEqual([thread == main_thread for _, thread in threads][2:], [True, True])
+        self.assertNotIn(main_thread, [thread for _, thread in threads][:2])
+
+    def test_single_read_only_subrequest_runs_in_sequence(self):
+        body = {"requests": [{"path": "/mushrooms"}]}
+        _, threads = self.subrequests_threads(body)
+        self.assertEqual(threads, [("GET", threading.get_ident())])
+
+    def test_subrequests_of_other_views_run_in_sequence(self):
+        body = {"requests": [{"path": "/"}, {"path": "/mushrooms"}]}
+        _, threads = self.subrequests_threads(body)
+        self.assertEqual([thread for _, thread in threads], [threading.get_ident()] * 2)
+
+    def test_concurrent_subrequests_can_be_disabled(self):
+        app = self.make_app(settings={"batch_max_workers": 1})
+        body = {"requests": [{"path": "/mushrooms"}, {"path": "/mushrooms"}]}
+        with mock.patch.object(batch_views, "_run_subrequest_in_transaction") as mocked:
+            app.post_json("/batch", body, headers=self.headers)
+        self.assertFalse(mocked.called)
+
+    def test_internal_errors_of_concurrent_subrequests_make_the_batch_fail(self):
+        body = {"requests": [{"path": "/mushrooms"}, {"path": "/mushrooms"}]}
+        with mock.patch.object(self.storage, "get_all", side_effect=AttributeError):
+            self.app.post_json("/batch", body, headers=self.headers, status=500)
+
+    def test_conflicts_of_concurrent_subrequests_abort_the_batch_from_its_thread(self):
+        threads = []
+
+        def conflict(request, subrequest):
+            return errors.http_error(httpexceptions.HTTPConflict()), subrequest
+
+        def aborted(request):
+            threads.append(threading.get_ident())
+
+        body = {"requests": [{"path": "/mushrooms"}, {"path": "/mushrooms"}]}
+        with mock.patch.object(batch_views, "_run_subrequest", side_effect=conflict):
+            with mock.patch.object(batch_views, "_abort_batch_transaction", side_effect=aborted):
+                resp = self.app.post_json("/batch", body, headers=self.headers)
+        self.assertEqual([r["status"] for r in resp.json["responses"]], [409, 409])
+        self.assertEqual(threads, [threading.get_ident()])
+
     def test_400_error_message_is_forwarded(self):
         headers = {**self.headers, "If-Match": '"*"'}
         request = {
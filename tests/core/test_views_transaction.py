@@ -135,7 +135,9 @@ class TransactionCacheTest(PostgreSQLTest, unittest.TestCase):
             self.cache.set("test-cache", "a value", ttl=100)
             raise BackendError("boom")
 
-        patch = mock.patch.object(self.permission, "add_principal_to_ace", wraps=cache_and_fails)
+        patch = mock.patch.object(
+            self.permission, "replace_objects_permissions", wraps=cache_and_fails
+        )
         self.addCleanup(patch.stop)
         patch.start()
 
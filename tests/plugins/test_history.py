@@ -6,6 +6,7 @@ from unittest import mock
 from pyramid import testing
 
 from kinto import main as kinto_main
+from kinto.core.authorization import settings_principals
 from kinto.core.testing import get_user_headers, skip_if_no_statsd
 
 from .. import support
@@ -571,9 +572,9 @@ class PermissionsTest(HistoryWebTest):
         assert len(entries) == 6  # everything.
 
     def test_read_permission_can_be_given_to_anybody_via_settings(self):
-        with mock.patch.dict(
-            self.app.app.registry.settings, [("history_read_principals", "system.Everyone")]
-        ):
+        registry = self.app.app.registry
+        settings = {**registry.settings, "history_read_principals": "system.Everyone"}
+        with mock.patch.object(registry, "settings_principals", settings_principals(settings)):
             resp = self.app.get("/buckets/test/history", headers=get_user_headers("tartan:pion"))
             entries = resp.json["data"]
             assert len(entries) == 6  # everything.
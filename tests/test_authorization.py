@@ -1,5 +1,8 @@
+from unittest import mock
+
 from kinto.core.testing import unittest
 
+from kinto import authorization
 from kinto.authorization import _resource_endpoint, _relative_object_uri, _inherited_permissions
 
 
@@ -197,3 +200,48 @@ class PermissionInheritanceTest(unittest.TestCase):
         attachment = "/buckets/bid/collections/cid/records/rid/attachment"
         permissions = _inherited_permissions(attachment, "read")
         self.assertIn(("/buckets/bid/collections/cid/records/rid", "read"), permissions)
+
+
+class CompiledInheritanceTreeTest(unittest.TestCase):
+    record_uri = "/buckets/bid/collections/cid/records/rid"
+
+    def tearDown(self):
+        super().tearDown()
+        authorization.compile_inheritance_tree()
+
+    def test_inherited_permissions_are_copies(self):
+        permissions = _inherited_permissions(self.record_uri, "read")
+        permissions.append(("/", "write"))
+        self.assertNotIn(("/", "write"), _inherited_permissions(self.record_uri, "read"))
+
+    def test_inherited_permissions_are_expanded_once(self):
+        authorization._cached_inherited_permissions.cache_clear()
+        for _ in range(3):
+            _inherited_permissions(self.record_uri, "read")
+        cache_info = authorization._cached_inherited_permissions.cache_info()
+        self.assertEqual(cache_info.misses, 1)
+        self.assertEqual(cache_info.hits, 2)
+
+    def test_compiled_tree_is_not_rebuilt_on_expansion(self):
+        authorization.compile_inheritance_tree()
+        with mock.patch.object(
+            authorization, "compile_inheritance_tree", wraps=authorization.compile_inheritance_tree
+        ) as mocked:
+            _inherited_permissions(self.record_uri, "read")
+            _inherited_permissions(self.record_uri, "write")
+        self.assertFalse(mocked.called)
+
+    def test_unknown_permissions_raise_key_error(self):
+        self.assertRaises(KeyError, _inherited_permissions, self.record_uri, "destroy")
+
+    def test_descending_tree_gives_obtained_permissions(self):
+        tree = authorization.descending_permissions_tree()
+        self.assertEqual(tree["bucket"]["read"]["bucket"], {"read", "read:attributes"})
+        self.assertIn("write", tree["bucket"]["write"]["record"])
+
+    def test_tree_modifications_are_taken_into_account_once_compiled(self):
+        tree = {"bucket": {"write": {"bucket": ["write"]}}}
+        with mock.patch.dict(authorization.PERMISSIONS_INHERITANCE_TREE, tree, clear=True):
+            authorization.compile_inheritance_tree()
+            permissions = _inherited_permissions(self.record_uri, "read")
+        self.assertEqual(permissions, [])
@@ -207,6 +207,46 @@ class TestMain(unittest.TestCase):
             assert res == mock.sentinel.reb_quo_code
             assert reb_quo.call_count == 1
 
+    def test_cli_indexes_run_indexes_script(self):
+        with mock.patch("kinto.__main__.scripts.indexes") as indexes:
+            indexes.return_value = mock.sentinel.indexes_code
+            res = main(
+                [
+                    "init",
+                    "--ini",
+                    TEMP_KINTO_INI,
+                    "--backend",
+                    "memory",
+                    "--cache-backend",
+                    "memory",
+                ]
+            )
+            assert res == 0
+            res = main(["indexes", "--ini", TEMP_KINTO_INI, "--create", "--limit", "3"])
+            assert res == mock.sentinel.indexes_code
+            _, kwargs = indexes.call_args
+            assert kwargs == dict(create=True, drop=False, limit=3, dry_run=False)
+
+    def test_cli_purge_tombstones_run_purge_tombstones_script(self):
+        with mock.patch("kinto.__main__.scripts.purge_tombstones") as purge:
+            purge.return_value = mock.sentinel.purge_code
+            res = main(
+                [
+                    "init",
+                    "--ini",
+                    TEMP_KINTO_INI,
+                    "--backend",
+                    "memory",
+                    "--cache-backend",
+                    "memory",
+                ]
+            )
+            assert res == 0
+            res = main(["purge-tombstones", "--ini", TEMP_KINTO_INI, "--older-than", "30"])
+            assert res == mock.sentinel.purge_code
+            _, kwargs = purge.call_args
+            assert kwargs == dict(older_than=30, batch_size=1000)
+
     def test_cli_start_runs_pserve(self):
         with mock.patch("kinto.__main__.pserve.main") as mocked_pserve:
             res = main(
@@ -1,4 +1,6 @@
 import unittest
+from unittest import mock
+
 from kinto.core.errors import ERRORS
 from kinto.core.testing import FormattedErrorMixin
 
@@ -216,6 +218,23 @@ class GroupManagementTest(BaseWebTest, unittest.TestCase):
         self.assertEqual(self.permission.get_user_principals("natim"), set())
         self.assertEqual(self.permission.get_user_principals("mat"), {group_url})
 
+    def test_group_members_changes_are_written_at_once(self):
+        self.create_group("beers", "moderators", ["natim", "mat"])
+        group_url = "/buckets/beers/groups/moderators"
+        group = {"data": {"members": ["mat", "alice", "bob"]}}
+        with mock.patch.object(
+            self.permission, "add_user_principals", wraps=self.permission.add_user_principals
+        ) as added:
+            with mock.patch.object(
+                self.permission,
+                "remove_user_principals",
+                wraps=self.permission.remove_user_principals,
+            ) as removed:
+                self.app.put_json(group_url, group, headers=self.headers, status=200)
+        added.assert_called_once_with({"alice", "bob"}, group_url)
+        removed.assert_called_once_with({"natim"}, group_url)
+        self.assertEqual(self.permission.get_user_principals("bob"), {group_url})
+
     def test_groups_can_be_created_after_deletion(self):
         self.create_group("beers", "moderators")
         group_url = "/buckets/beers/groups/moderators"
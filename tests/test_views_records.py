@@ -1,5 +1,6 @@
 import json
 import re
+import time
 import unittest
 from unittest import mock
 
@@ -67,6 +68,46 @@ class RecordsViewTest(BaseWebTest, unittest.TestCase):
             self.app.post_json("/batch", batch, headers=self.headers)
             self.assertEqual(patched.call_count, 1)
 
+    def test_records_permissions_are_checked_at_once_in_batch(self):
+        records_ids = [self.record["id"]]
+        for i in range(4):
+            resp = self.app.post_json(self.collection_url, MINIMALIST_RECORD, headers=self.headers)
+            records_ids.append(resp.json["data"]["id"])
+        batch = {
+            "requests": [
+                {"method": "GET", "path": self._record_url.format(record_id)}
+                for record_id in records_ids
+            ]
+        }
+
+        permission = self.app.app.registry.permission
+        check_one = mock.patch.object(
+            permission, "check_permission", wraps=permission.check_permission
+        )
+        check_many = mock.patch.object(
+            permission, "check_permissions", wraps=permission.check_permissions
+        )
+        with check_one as patched_one, check_many as patched_many:
+            resp = self.app.post_json("/batch", batch, headers=self.headers)
+
+        self.assertEqual([r["status"] for r in resp.json["responses"]], [200] * 5)
+        self.assertFalse(patched_one.called)
+        self.assertEqual(patched_many.call_count, 1)
+
+    def test_permissions_of_writes_or_other_users_are_not_checked_in_advance(self):
+        other_headers = get_user_headers("tartanpion")
+        batch = {
+            "requests": [
+                {"method": "GET", "path": self.record_url, "headers": other_headers},
+                {"method": "PATCH", "path": self.record_url, "body": MINIMALIST_RECORD},
+            ]
+        }
+        permission = self.app.app.registry.permission
+        with mock.patch.object(permission, "check_permissions") as mocked:
+            resp = self.app.post_json("/batch", batch, headers=self.headers)
+        self.assertEqual([r["status"] for r in resp.json["responses"]], [403, 200])
+        self.assertFalse(mocked.called)
+
     def test_individual_collections_can_be_deleted(self):
         resp = self.app.get(self.collection_url, headers=self.headers)
         self.assertEqual(len(resp.json["data"]), 1)
@@ -376,3 +417,63 @@ class RecordsViewFilterTest(BaseWebTest, unittest.TestCase):
         response = self.app.get(query, headers=self.headers)
         assert len(response.json["data"]) == 1
         assert response.json["data"][0]["id"] == "strawberry"
+
+
+class RecordsTombstonesRetentionTest(BaseWebTest, unittest.TestCase):
+
+    collection_url = "/buckets/beers/collections/barley/records"
+
+    @classmethod
+    def get_app_settings(cls, extras=None):
+        settings = super().get_app_settings(extras)
+        settings["record_tombstones_retention_seconds"] = "3600"
+        settings["beers.barley.record_tombstones_retention_seconds"] = "0"
+        settings["record_tombstones_purge_batch_size"] = "10"
+        return settings
+
+    def setUp(self):
+        super().setUp()
+        self.app.put_json("/buckets/beers", MINIMALIST_BUCKET, headers=self.headers)
+        self.app.put_json(
+            "/buckets/beers/collections/barley", MINIMALIST_COLLECTION, headers=self.headers
+        )
+
+    def create_and_delete_record(self):
+        resp = self.app.post_json(self.collection_url, MINIMALIST_RECORD, headers=self.headers)
+        record_url = f"{self.collection_url}/{resp.json['data']['id']}"
+        self.app.delete(record_url, headers=self.headers)
+        return resp.json["data"]
+
+    def test_expired_tombstones_are_purged_on_deletion(self):
+        first = self.create_and_delete_record()
+        time.sleep(0.002)
+        second = self.create_and_delete_record()
+        time.sleep(0.002)
+        self.app.delete(self.collection_url, headers=self.headers)
+
+        resp = self.app.get(self.collection_url + "?_since=0", headers=self.headers)
+        ids = [r["id"] for r in resp.json["data"]]
+        self.assertNotIn(first["id"], ids)
+        self.assertNotIn(second["id"], ids)
+
+    def test_purge_is_limited_to_the_collection_and_batch_size(self):
+        storage = self.app.app.registry.storage
+        with mock.patch.object(storage, "purge_deleted", return_value=0) as mocked:
+            self.create_and_delete_record()
+        _, kwargs = mocked.call_args
+        self.assertEqual(kwargs["collection_id"], "record")
+        self.assertEqual(kwargs["parent_id"], "/buckets/beers/collections/barley")
+        self.assertEqual(kwargs["limit"], 10)
+
+    def test_global_retention_is_used_for_other_collections(self):
+        self.app.put_json(
+            "/buckets/beers/collections/hops", MINIMALIST_COLLECTION, headers=self.headers
+        )
+        self.collection_url = "/buckets/beers/collections/hops/records"
+        record = self.create_and_delete_record()
+        time.sleep(0.002)
+        self.create_and_delete_record()
+
+        resp = self.app.get(self.collection_url + "?_since=0", headers=self.headers)
+        ids = [r["id"] for r in resp.json["data"]]
+        self.assertIn(record["id"], ids)